@@ -2,6 +2,8 @@ from __future__ import annotations
 import httpx
 from typing import List, Dict, Any, Optional, TYPE_CHECKING
 
+from ..infra.image_encoding import image_media_type
+
 if TYPE_CHECKING:
     from ..infra.stats import MessageStats
 
@@ -55,6 +57,7 @@ class TelegramClient:
         reply_to_message_id: int | None = None,
     ) -> int | None:
         data: dict = {"chat_id": chat_id}
+        media_type = image_media_type(photo)
         if caption:
             data["caption"] = caption
         if message_thread_id is not None:
@@ -66,7 +69,7 @@ class TelegramClient:
             r = await client.post(
                 f"{self.base}/sendPhoto",
                 data=data,
-                files={"photo": ("chart.png", photo, "image/png")},
+                files={"photo": (f"chart.{media_type.split('/')[1]}", photo, media_type)},
             )
             r.raise_for_status()
             if self._stats is not None:
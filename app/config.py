@@ -1,7 +1,7 @@
 
 from __future__ import annotations
 
-from typing import Dict, List
+from typing import Any, Dict, List
 from pydantic_settings import BaseSettings
 import yaml
 import os
@@ -33,6 +33,8 @@ class Settings(BaseSettings):
     CLAUDE_MODEL: str = "claude-sonnet-4-6"
     CLAUDE_MAX_TOKENS: int = 1024
     BRIEFING_MODEL: str = "claude-haiku-4-5-20251001"  # 市场简报用，独立于图表分析模型
+    ANALYSIS_CONCURRENCY: int = 2   # 图表分析同时进行的 Claude 调用数
+    ANALYSIS_QUEUE_MAX: int = 20    # 排队上限，超出时该图表不附分析
 
     def topic_name_map(self) -> Dict[int | None, str]:
         mapping: Dict[int | None, str] = {None: "Direct"}
@@ -65,6 +67,61 @@ class Settings(BaseSettings):
     CHART_15M_BARS: int = 150 # 15m：固定显示根数
     CHART_3M_BARS: int = 120  # 3m：固定显示根数
 
+    CHART_RENDER_WORKERS: int = 2  # 渲染进程数，0 = 在事件循环进程内渲染
+    CHART_PNG_CACHE_MAX_MB: float = 16.0  # 已渲染图表缓存上限（LRU）
+    CHART_PANEL_SOFT_DEADLINE_SEC: float = 8.0  # 多图子图拉取软截止：到时用已就绪的子图出图，缺失子图在标题注明
+    # 推送出图调度：同时进行的出图数上限，其余按优先级（周期越大越先 + 话题偏移）排队
+    CHART_RENDER_MAX_CONCURRENT: int = 4
+    CHART_TOPIC_PRIORITY: Dict[str, int] = {"entry": -2}  # TG_TOPIC_ 后缀 → 优先级偏移（负数 = 更优先）
+    # 出图开始截止时间（秒，按推送最大周期）：排队超时仍未开始则只发文字
+    CHART_RENDER_DEADLINE_SEC: Dict[str, float] = {"1D": 30.0, "4h": 25.0, "1h": 20.0, "15m": 12.0, "3m": 8.0}
+    # 按负载自动降级出图画质（全部子图 → 减少子图 → 降低 dpi → 单个子图 → 只发文字）
+    CHART_QUALITY_ADAPTIVE: bool = True
+    CHART_QUALITY_LATENCY_MS: List[float] = [3000.0, 5000.0, 8000.0]  # 进程池最近渲染耗时中位数（不含K线拉取）超过各阈值依次降一档
+    CJK_FONT_CACHE_PATH: str = "data/cjk_font.json"  # CJK 字体路径缓存（按字体 mtime 校验；空字符串 = 每次启动扫描）
+    # 图表编码（按话题）：key 为 "default" 或 TG_TOPIC_ 后缀（如 "4h"），话题未给出的字段沿用 default
+    # 字段：format (png / png_optimized / png_palette / jpeg / webp)、dpi、max_width、max_height、
+    #       tight（False = 固定边距，省一次布局计算）、quality（jpeg/webp）、target_bytes
+    # 例：CHART_ENCODE_PROFILES='{"default": {"format": "png_palette", "tight": false}, "4h": {"format": "png"}}'
+    CHART_ENCODE_PROFILES: Dict[str, Dict[str, Any]] = {"default": {"format": "png", "dpi": 150, "tight": True}}
+
+    # 画图 K 线缓存
+    KLINE_CACHE_MAX_MB: float = 32.0    # 内存上限，超出按 LRU 淘汰
+    KLINE_CACHE_LIVE_TTL: float = 10.0  # 未收盘K线视为最新的秒数（不跨越收盘时间）
+
+    # Binance K线推流（可选）：持续更新K线缓存，出图无需请求 REST
+    KLINE_STREAM_ENABLED: bool = False
+    KLINE_STREAM_URL: str = "wss://fstream.binance.com/stream"
+    KLINE_STREAM_MAX_STREAMS: int = 200  # 每条连接的订阅路数（Binance 合约上限 200）
+    KLINE_STREAM_STALE_SEC: float = 30.0  # 超过该秒数未收到推流，缓存回退 REST
+
+    # 收盘预取：15m/1h/4h/1D 收盘后预取 1h 及以上处于 IN/WARM 的标的的子图K线
+    PREFETCH_ENABLED: bool = True
+    PREFETCH_DELAY_SEC: float = 2.0     # 收盘后延迟（秒），等交易所完成收盘K线
+    PREFETCH_CONCURRENCY: int = 4       # 同时预取的子图数
+    PREFETCH_MAX_SYMBOLS: int = 30
+
+    # 磁盘 OHLCV 归档（Binance / yfinance K线，重启后免重新下载长历史；空字符串 = 关闭）
+    OHLCV_ARCHIVE_DIR: str = "data/ohlcv"
+    OHLCV_ARCHIVE_YF_TTL: float = 60.0  # yfinance 归档在该秒数内拉取过则直接读取，不再下载
+
+    # EMA 增量状态（重启后免重新拉长历史）
+    INDICATOR_STATE_PATH: str = "data/indicator_state.npz"
+    INDICATOR_PERSIST_INTERVAL: float = 300.0  # 写盘间隔（秒）
+
+    # Binance REST 共享连接池
+    BINANCE_HTTP_MAX_CONNECTIONS: int = 20
+    BINANCE_HTTP_MAX_KEEPALIVE: int = 10
+    BINANCE_HTTP_KEEPALIVE_EXPIRY: float = 60.0  # 空闲连接保留秒数
+    BINANCE_HTTP_TIMEOUT: float = 10.0
+    BINANCE_HTTP2: bool = True                   # 需安装 h2（httpx[http2]），否则回退 HTTP/1.1
+
+    # Binance 请求权重调度（合约 IP 限额 2400/分钟）
+    BINANCE_WEIGHT_LIMIT_1M: int = 2400
+    BINANCE_WEIGHT_BACKGROUND_SHARE: float = 0.6  # 后台轮询/回补最多使用的比例，其余留给推送出图
+    BINANCE_WEIGHT_PUSH_MAX_WAIT: float = 10.0  # 推送请求最长等待（秒），超时放弃（画图降级）
+    BINANCE_WEIGHT_BACKGROUND_MAX_WAIT: float = 60.0
+
     # Logging
     LOG_PATH: str = "logs/app.log"
     LOG_MAX_BYTES: int = 10 * 1024 * 1024
@@ -23,6 +23,26 @@ class LevelState(str, Enum):
     OUT = "out"
 
 
+class Transition(str, Enum):
+    NONE = "none"            # IN/OUT 状态未变
+    ENTER_IN = "enter_in"    # 进入超买/超卖区
+    EXIT_WARM = "exit_warm"  # 离开 IN，开始 WARM 计时
+
+
+@dataclass(frozen=True)
+class IntervalTransition:
+    """update_interval 的返回值：单次更新在两个方向上的状态迁移。"""
+    oversold: Transition = Transition.NONE
+    overbought: Transition = Transition.NONE
+
+    def for_side(self, side: Side) -> Transition:
+        return self.oversold if side == Side.OVERSOLD else self.overbought
+
+    @property
+    def changed(self) -> bool:
+        return self.oversold != Transition.NONE or self.overbought != Transition.NONE
+
+
 @dataclass(frozen=True)
 class IntervalSignal:
     interval: str
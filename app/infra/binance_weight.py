@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Mapping
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# 请求优先级：推送路径（出图）优先于后台轮询 / 回补
+PUSH = 0
+BACKGROUND = 1
+
+_priority: ContextVar[int] = ContextVar("binance_priority", default=PUSH)
+
+# 推送请求可用到上限的比例（留少量余量给服务端计数与本地估计的偏差）
+_PUSH_SHARE = 0.95
+
+# 因推送请求排队而等待的后台请求，重新检查的间隔（秒）
+_BACKGROUND_POLL_SEC = 1.0
+
+# 418/429 未带 Retry-After 时的默认封禁时长（秒）
+_DEFAULT_RETRY_AFTER = 60.0
+
+
+@contextmanager
+def background_priority() -> Iterator[None]:
+    """块内（及其中创建的 task）发出的 Binance 请求按后台优先级排队。"""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    """当前上下文的请求优先级（PUSH / BACKGROUND）。"""
+    return _priority.get()
+
+
+def klines_weight(limit: int) -> int:
+    """Binance 合约 /fapi/v1/klines 的请求权重。"""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+class WeightGovernor:
+    """
+    Binance REST 请求权重调度（按分钟窗口，与 X-MBX-USED-WEIGHT-1m 对齐）：
+
+    - 发请求前按权重预占额度；响应头中的已用权重为准（取与本地估计的较大值）；
+    - 后台请求只能用到 background_share × limit，且有推送请求在等待时让行；
+    - 418 / 429 按 Retry-After 暂停全部请求；
+    - 等待超过 max_wait 的请求放弃（调用方降级），不再硬发触发封禁。
+    """
+
+    def __init__(self, limit: int, background_share: float, push_max_wait: float, background_max_wait: float):
+        self._limit = limit
+        self._background_limit = limit * background_share
+        self._max_wait = {PUSH: push_max_wait, BACKGROUND: background_max_wait}
+        self._window = 0
+        self._used = 0
+        self._banned_until = 0.0
+        self._push_waiting = 0
+
+        self.server_used = 0   # 最近一次响应头中的已用权重
+        self.waits = {PUSH: 0, BACKGROUND: 0}
+        self.rejected = {PUSH: 0, BACKGROUND: 0}
+        self.bans = 0
+        self.max_wait_ms = 0.0
+
+    def _roll(self, now: float) -> None:
+        window = int(now // 60)
+        if window != self._window:
+            self._window = window
+            self._used = 0
+
+    def _blocked_for(self, cost: int, priority: int, now: float) -> float:
+        """需要再等待的秒数；0 表示可立即发出。"""
+        if now < self._banned_until:
+            return self._banned_until - now
+        if priority == BACKGROUND and self._push_waiting:
+            return _BACKGROUND_POLL_SEC
+        cap = self._limit * _PUSH_SHARE if priority == PUSH else self._background_limit
+        if self._used + cost <= cap:
+            return 0.0
+        return 60 - now % 60  # 等到下一个分钟窗口
+
+    async def acquire(self, cost: int) -> bool:
+        """预占 cost 权重；等待超时返回 False。"""
+        priority = _priority.get()
+        t0 = time.monotonic()
+        deadline = t0 + self._max_wait[priority]
+        waited = False
+        if priority == PUSH:
+            self._push_waiting += 1
+        try:
+            while True:
+                now = time.time()
+                self._roll(now)
+                delay = self._blocked_for(cost, priority, now)
+                if delay <= 0:
+                    self._used += cost
+                    if waited:
+                        self.max_wait_ms = max(self.max_wait_ms, (time.monotonic() - t0) * 1000)
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected[priority] += 1
+                    return False
+                if not waited:
+                    waited = True
+                    self.waits[priority] += 1
+                await asyncio.sleep(min(delay, remaining))
+        finally:
+            if priority == PUSH:
+                self._push_waiting -= 1
+
+    def observe(self, status_code: int, headers: Mapping[str, str]) -> None:
+        """根据响应更新已用权重；418 / 429 时按 Retry-After 暂停。"""
+        now = time.time()
+        self._roll(now)
+        used = headers.get("x-mbx-used-weight-1m")
+        if used is not None and used.isdigit():
+            self.server_used = int(used)
+            self._used = max(self._used, self.server_used)
+        if status_code in (418, 429):
+            try:
+                retry_after = float(headers.get("retry-after", _DEFAULT_RETRY_AFTER))
+            except ValueError:
+                retry_after = _DEFAULT_RETRY_AFTER
+            self._banned_until = max(self._banned_until, now + retry_after)
+            self.bans += 1
+            logger.warning(f"[BinanceWeight] HTTP {status_code}，暂停 Binance 请求 {retry_after:.0f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        self._roll(now)
+        return {
+            "limit": self._limit,
+            "used": self._used,
+            "remaining": max(self._limit - self._used, 0),
+            "server_used": self.server_used,
+            "push_waits": self.waits[PUSH],
+            "background_waits": self.waits[BACKGROUND],
+            "push_rejected": self.rejected[PUSH],
+            "background_rejected": self.rejected[BACKGROUND],
+            "max_wait_ms": self.max_wait_ms,
+            "bans": self.bans,
+            "ban_remaining_s": max(self._banned_until - now, 0.0),
+        }
+
+
+# Binance 合约 REST 共享的权重调度器（图表、衰竭轮询、推流回补共用）
+binance_weight = WeightGovernor(
+    limit=settings.BINANCE_WEIGHT_LIMIT_1M,
+    background_share=settings.BINANCE_WEIGHT_BACKGROUND_SHARE,
+    push_max_wait=settings.BINANCE_WEIGHT_PUSH_MAX_WAIT,
+    background_max_wait=settings.BINANCE_WEIGHT_BACKGROUND_MAX_WAIT,
+)
+
+
+def binance_weight_stats() -> Dict[str, Any]:
+    return binance_weight.stats()
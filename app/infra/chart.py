@@ -1,35 +1,67 @@
 from __future__ import annotations
 
 import asyncio
+import dataclasses
 import io
+import json
 import logging
 import math
 import os
+import threading
+import time
+from collections import deque
 from typing import TYPE_CHECKING, Optional
 
-import httpx
-
 if TYPE_CHECKING:
     from ..adapters.tg_client import TelegramClient
-    from ..services.chart_analysis import ChartAnalysisService
+    from .render_pool import RenderPool
+    from .indicator_store import IndicatorStore
+    from ..services.analysis_queue import AnalysisQueue
     from .stats import MessageStats
+    from PIL import Image
 
-from ..config import settings
+import numpy as np
+
+from ..config import settings, get_universe, get_us_stock_symbols
+from .indicators import ema
+from .binance_weight import binance_weight, current_priority, klines_weight
+from .http_pool import binance_client
+from .image_encoding import (
+    EncodedImage, EncodeProfile, apply_fixed_margins, encode_figure, encode_image,
+)
+from .kline_cache import KlineCache, decode_klines, df_to_array
+from .kline_stream import KlineStream, StreamSub
+from .ohlcv_archive import OhlcvArchive, resample_ohlcv
+from .png_cache import PngCache
+from .render_pool import PanelJob, RenderJob, run_render_job
+from .quality_ladder import QUALITY_LADDER, QualityStep, choose_quality_level, reduce_panels
+from .render_scheduler import RenderDeadlineMissed, RenderScheduler
+from .topic_sequencer import TopicSequencer
 
 logger = logging.getLogger(__name__)
 
-# 按 topic_id 隔离的话题锁：同一 topic 的文字+图片串行发送，不同 topic 并发
-_topic_locks: dict[int, asyncio.Lock] = {}
+# 按 topic_id 隔离的发送顺序：同一 topic 的推送按进入顺序发送，出图并发；不同 topic 互不影响
+_topic_sequencers: dict[int, TopicSequencer] = {}
 
-# Claude 图表分析集成
-_analysis_svc: Optional["ChartAnalysisService"] = None
+# Claude 图表分析集成（后台队列，推送路径只入队）
+_analysis_queue: Optional["AnalysisQueue"] = None
 _analysis_enabled: bool = False
 _msg_stats: Optional["MessageStats"] = None
 
+# 渲染进程池（lifespan 中启动；未注册时在当前进程渲染）
+_render_pool: Optional["RenderPool"] = None
+
+# EMA 增量状态（lifespan 中加载；未注册时每次按长窗口全量计算）
+_indicator_store: Optional["IndicatorStore"] = None
+
 
-def register_analysis(svc: "ChartAnalysisService") -> None:
-    global _analysis_svc
-    _analysis_svc = svc
+def register_analysis_queue(queue: Optional["AnalysisQueue"]) -> None:
+    global _analysis_queue
+    _analysis_queue = queue
+
+
+def analysis_queue_stats() -> Optional[dict]:
+    return _analysis_queue.stats() if _analysis_queue is not None else None
 
 
 def register_stats(stats: "MessageStats") -> None:
@@ -37,6 +69,24 @@ def register_stats(stats: "MessageStats") -> None:
     _msg_stats = stats
 
 
+def register_render_pool(pool: Optional["RenderPool"]) -> None:
+    global _render_pool
+    _render_pool = pool
+
+
+def register_indicator_store(store: Optional["IndicatorStore"]) -> None:
+    global _indicator_store
+    _indicator_store = store
+
+
+def get_indicator_store() -> Optional["IndicatorStore"]:
+    return _indicator_store
+
+
+def render_pool_stats() -> Optional[dict]:
+    return _render_pool.stats() if _render_pool is not None else None
+
+
 def set_analysis_enabled(enabled: bool) -> None:
     global _analysis_enabled
     _analysis_enabled = enabled
@@ -72,129 +122,243 @@ _INTERNAL_TO_BINANCE_IV: dict[str, str] = {
 }
 
 
-async def _fetch_klines(symbol: str, interval: str, limit: int) -> Optional[list]:
-    """从Binance合约REST接口获取K线。symbol不存在（美股等）返回None，出错也返回None。"""
+# 进行中的 K 线请求：(symbol, interval, limit, start_time, priority) → Task
+# bar 收盘时多条推送路径往往在几毫秒内请求同一组 K 线，并发的相同请求共享同一次 HTTP 调用；
+# 只在同一优先级内合并：共享任务按发起者的优先级申请权重，推送请求不能挂在后台任务上等待后台额度
+_inflight_klines: dict[tuple, asyncio.Task] = {}
+_kline_fetch_counts: dict[str, int] = {"requests": 0, "coalesced": 0}
+
+
+def kline_fetch_stats() -> dict:
+    return dict(_kline_fetch_counts)
+
+
+async def _fetch_klines(
+    symbol: str, interval: str, limit: int, start_time: Optional[int] = None,
+) -> Optional[np.ndarray]:
+    """
+    从Binance合约REST接口获取K线，float64 [n, 6]（open_ms, O, H, L, C, V）。
+    symbol不存在（美股等）返回None，出错也返回None。
+    start_time（毫秒）给定时从该时间起拉取，用于增量更新。
+    与正在进行的相同优先级的相同请求合并（single-flight），返回的数组由各调用方共享，只读。
+    """
+    key = (symbol.upper(), interval, limit, start_time, current_priority())
+    _kline_fetch_counts["requests"] += 1
+    task = _inflight_klines.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_request_klines(symbol, interval, limit, start_time))
+        _inflight_klines[key] = task
+        task.add_done_callback(
+            lambda t: _inflight_klines.pop(key, None) if _inflight_klines.get(key) is t else None
+        )
+    else:
+        _kline_fetch_counts["coalesced"] += 1
+    # shield：某个调用方被取消（如 wait_for 超时）不影响其他等待者
+    return await asyncio.shield(task)
+
+
+async def _request_klines(
+    symbol: str, interval: str, limit: int, start_time: Optional[int],
+) -> Optional[np.ndarray]:
     binance_symbol = _TV_TO_BINANCE.get(symbol.upper(), symbol.upper())
+    params = {"symbol": binance_symbol, "interval": interval, "limit": limit}
+    if start_time is not None:
+        params["startTime"] = start_time
+    if not await binance_weight.acquire(klines_weight(limit)):
+        logger.info(f"[Chart] Binance 请求权重不足，放弃请求: {symbol}/{interval}")
+        return None
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            r = await client.get(
-                BINANCE_FUTURES_KLINES,
-                params={"symbol": binance_symbol, "interval": interval, "limit": limit},
-            )
-            if r.status_code in (400, 404):
-                logger.info(f"[Chart] Binance无此合约品种: {symbol}")
-                return None
-            if r.status_code == 451:
-                logger.info(f"[Chart] Binance地区限制(451): {symbol}，跳过画图")
-                return None
-            r.raise_for_status()
-            data = r.json()
-            if not isinstance(data, list) or len(data) == 0:
-                return None
-            return data
+        r = await binance_client().get(BINANCE_FUTURES_KLINES, params=params)
+        binance_weight.observe(r.status_code, r.headers)
+        if r.status_code in (418, 429):
+            return None
+        if r.status_code in (400, 404):
+            logger.info(f"[Chart] Binance无此合约品种: {symbol}")
+            return None
+        if r.status_code == 451:
+            logger.info(f"[Chart] Binance地区限制(451): {symbol}，跳过画图")
+            return None
+        r.raise_for_status()
+        # 响应体直接解码为数组，不经 r.json() 生成 n×12 个 Python 对象
+        data = decode_klines(r.content)
+        if data is None or len(data) == 0:
+            return None
+        _kline_cache.record_response_size(len(r.content), len(data))
+        return data
     except Exception:
         logger.warning(f"[Chart] Binance K线获取失败: {symbol}/{interval}", exc_info=True)
         return None
 
 
-def _binance_to_df(klines: list) -> "pd.DataFrame":
-    """将 Binance K线列表转为标准 OHLCV DataFrame（index=DatetimeIndex UTC）。"""
-    import pandas as pd
-    df = pd.DataFrame(klines, columns=[
-        "Open_time", "Open", "High", "Low", "Close", "Volume",
-        "Close_time", "Quote_vol", "Trades", "Taker_base", "Taker_quote", "Ignore",
-    ])
-    df["Open_time"] = pd.to_datetime(df["Open_time"], unit="ms", utc=True)
-    df.set_index("Open_time", inplace=True)
-    for col in ["Open", "High", "Low", "Close", "Volume"]:
-        df[col] = df[col].astype(float)
-    return df[["Open", "High", "Low", "Close", "Volume"]]
+# 画图用 K 线缓存（按 bar 收盘对齐失效 + startTime 增量刷新）
+_kline_cache = KlineCache(
+    max_bytes=int(settings.KLINE_CACHE_MAX_MB * 1024 * 1024),
+    live_ttl=settings.KLINE_CACHE_LIVE_TTL,
+    fetch=lambda symbol, interval, limit, start_time: _fetch_klines(symbol, interval, limit, start_time),
+    stream_ttl=settings.KLINE_STREAM_STALE_SEC,
+)
 
+# 磁盘 OHLCV 归档（lifespan 中注册；未注册时 yfinance 每次全量下载）
+_ohlcv_archive: Optional[OhlcvArchive] = None
 
-def _compute_ema(prices: list[float], period: int) -> list[float]:
-    """计算EMA序列，前period-1个值填nan。"""
-    result = [math.nan] * len(prices)
-    if len(prices) < period:
-        return result
-    k = 2.0 / (period + 1)
-    ema = sum(prices[:period]) / period
-    result[period - 1] = ema
-    for i in range(period, len(prices)):
-        ema = prices[i] * k + ema * (1.0 - k)
-        result[i] = ema
-    return result
-
-
-def _yfinance_fetch_sync(symbol: str, interval: str, limit: int) -> Optional["pd.DataFrame"]:
+# K线推流（KLINE_STREAM_ENABLED 时由 lifespan 启动）
+_kline_stream: Optional[KlineStream] = None
+
+
+def kline_cache_stats() -> dict:
+    return _kline_cache.stats()
+
+
+def register_ohlcv_archive(archive: Optional[OhlcvArchive]) -> None:
+    """注册 OHLCV 归档：画图 Binance K线缓存与 yfinance 拉取共用。"""
+    global _ohlcv_archive
+    _ohlcv_archive = archive
+    _kline_cache.archive = archive
+
+
+def get_ohlcv_archive() -> Optional[OhlcvArchive]:
+    return _ohlcv_archive
+
+
+async def fetch_binance_ohlcv(symbol: str, interval: str, limit: int) -> Optional[np.ndarray]:
+    """
+    Binance K线（经K线缓存 / OHLCV 归档），float64 [n, 6]，只读；interval 为项目内周期。
+    末根可能是未收盘K线。
     """
-    同步版 yfinance 拉取，在 executor 中运行。
-    interval: "1h" / "4h"（由 1h resample 合成）/ "1D"。
+    binance_iv = _INTERNAL_TO_BINANCE_IV.get(interval, interval)
+    return await _kline_cache.get(symbol, binance_iv, settings.INTERVAL_SECONDS[interval], limit)
+
+
+def kline_stream_stats() -> Optional[dict]:
+    return _kline_stream.stats() if _kline_stream is not None else None
+
+
+def kline_stream_subs() -> list[StreamSub]:
+    """universe 中加密品种（Binance 合约）× 可画图周期 → 推流订阅列表。"""
+    skip = set(get_us_stock_symbols()) | set(_TV_TO_YFINANCE)
+    subs = []
+    for symbol, intervals in get_universe().items():
+        if symbol in skip or not symbol.endswith("USDT"):
+            continue
+        for iv in intervals:
+            params = _panel_params(iv)
+            if params is None:
+                continue
+            subs.append(StreamSub(
+                symbol=symbol,
+                interval=_INTERNAL_TO_BINANCE_IV.get(iv, iv),
+                interval_sec=settings.INTERVAL_SECONDS[iv],
+                limit=params[2],
+                stream_symbol=_TV_TO_BINANCE.get(symbol, symbol),
+            ))
+    return subs
+
+
+def create_kline_stream() -> KlineStream:
+    """创建写入画图K线缓存的推流并注册（供 /stats 展示）。"""
+    global _kline_stream
+    _kline_stream = KlineStream(
+        url=settings.KLINE_STREAM_URL,
+        cache=_kline_cache,
+        subscriptions=kline_stream_subs,
+        max_streams=settings.KLINE_STREAM_MAX_STREAMS,
+    )
+    return _kline_stream
+
+
+def _compute_ema(prices: list[float], period: int) -> list[float]:
+    """计算EMA序列，前period-1个值填nan。列表接口，计算由 indicators.ema 完成。"""
+    return ema(np.asarray(prices, dtype=np.float64), period).tolist()
+
+
+# yfinance 周期：4h 由 1h 聚合
+_YF_BASE_INTERVAL: dict[str, str] = {"1D": "1d", "1h": "1h", "4h": "1h", "15m": "15m"}
 
-    days_needed 换算逻辑：
+_YF_ARCHIVE_SOURCE = "yfinance"
+_DAY_MS = 86400 * 1000
+
+
+def _yf_days_needed(interval: str, limit: int) -> int:
+    """
+    limit 根K线所需的日历天数：
       - 1D：1根=1交易日，交易日≈日历天×5/7，所以 limit×(7/5) 个日历天
       - 1h：美股约每交易日6根1h，换算到交易日后再×(7/5)得日历天
       - 4h：先拉 limit×4 根 1h，再 resample，天数同 1h 逻辑
     """
-    import yfinance as yf
-    import pandas as pd
-    import datetime
-
-    yf_symbol = _TV_TO_YFINANCE.get(symbol.upper(), symbol.upper())
-
     if interval == "1D":
-        days_needed = math.ceil(limit * 7 / 5) + 30
-        yf_interval = "1d"
-        resample_to = None
-    elif interval == "4h":
-        days_needed = min(math.ceil(limit * 4 / 6 * 7 / 5) + 30, 728)
-        yf_interval = "1h"
-        resample_to = "4h"
-    elif interval == "15m":
-        days_needed = min(limit // 26 + 5, 59)  # yfinance 15m 限60天，美股~26根/交易日
-        yf_interval = "15m"
-        resample_to = None
-    elif interval == "3m":
-        return None  # yfinance 不支持 3m
-    else:  # 1h
-        days_needed = min(math.ceil(limit / 6 * 7 / 5) + 30, 728)
-        yf_interval = "1h"
-        resample_to = None
+        return math.ceil(limit * 7 / 5) + 30
+    if interval == "4h":
+        return min(math.ceil(limit * 4 / 6 * 7 / 5) + 30, 728)
+    if interval == "15m":
+        return min(limit // 26 + 5, 59)  # yfinance 15m 限60天，美股~26根/交易日
+    return min(math.ceil(limit / 6 * 7 / 5) + 30, 728)
+
 
-    start = datetime.datetime.now(tz=datetime.timezone.utc) - datetime.timedelta(days=days_needed)
+def _yf_download(yf_symbol: str, yf_interval: str, start_ms: float) -> Optional[np.ndarray]:
+    """yfinance 下载 start_ms 起的K线 → float64 [n, 6]；出错返回 None，无数据返回空数组。"""
+    import yfinance as yf
+    import pandas as pd
 
     try:
-        ticker = yf.Ticker(yf_symbol)
-        df = ticker.history(interval=yf_interval, start=start)
+        df = yf.Ticker(yf_symbol).history(interval=yf_interval, start=pd.Timestamp(start_ms, unit="ms", tz="UTC"))
     except Exception:
         return None
-
     if df is None or df.empty:
-        return None
-
+        return np.empty((0, 6))
     if df.index.tz is None:
         df.index = df.index.tz_localize("UTC")
     else:
         df.index = df.index.tz_convert("UTC")
-    df.index.name = "Open_time"
+    return df_to_array(df.astype({c: float for c in ("Open", "High", "Low", "Close", "Volume")}))
 
-    df = df[["Open", "High", "Low", "Close", "Volume"]].copy().astype(float)
 
-    if resample_to:
-        df = df.resample(resample_to).agg({
-            "Open": "first",
-            "High": "max",
-            "Low": "min",
-            "Close": "last",
-            "Volume": "sum",
-        }).dropna(subset=["Open", "Close"])
+def _yfinance_fetch_sync(symbol: str, interval: str, limit: int) -> Optional[np.ndarray]:
+    """
+    同步版 yfinance 拉取，在 executor 中运行，返回 float64 [n, 6]。
+    interval: "1h" / "4h"（由 1h resample 合成）/ "1D" / "15m"。
 
-    if df.empty:
-        return None
+    已注册 OHLCV 归档时：归档覆盖不足 _yf_days_needed 天时全量下载；
+    否则 OHLCV_ARCHIVE_YF_TTL 内拉取过直接读归档（不下载），过期则只从归档末根起增量下载。
+    """
+    yf_interval = _YF_BASE_INTERVAL.get(interval)
+    if yf_interval is None:
+        return None  # yfinance 不支持 3m
 
-    return df.tail(limit)
+    yf_symbol = _TV_TO_YFINANCE.get(symbol.upper(), symbol.upper())
+    start_ms = time.time() * 1000 - _yf_days_needed(interval, limit) * _DAY_MS
+    rows_needed = limit * 4 if interval == "4h" else limit  # 每个 4h 桶至少 1 根 1h
+
+    archive = _ohlcv_archive
+    if archive is None:
+        arr = _yf_download(yf_symbol, yf_interval, start_ms)
+    else:
+        key = (_YF_ARCHIVE_SOURCE, yf_symbol, yf_interval)
+        arr = archive.read(*key)
+        age = archive.age(*key)
+        if arr is None or arr[0, 0] > start_ms + 7 * _DAY_MS:
+            fetched = _yf_download(yf_symbol, yf_interval, start_ms)            # 覆盖不足：全量
+        elif age is not None and age < settings.OHLCV_ARCHIVE_YF_TTL:
+            fetched = None
+        else:
+            fetched = _yf_download(yf_symbol, yf_interval, max(arr[-1, 0], start_ms))  # 从末根增量
+        if fetched is not None:
+            if len(fetched):
+                archive.append(*key, fetched)
+            else:
+                archive.touch(*key)
+            arr = archive.read(*key)
+        elif arr is not None and age is not None and age >= settings.OHLCV_ARCHIVE_YF_TTL:
+            logger.info(f"[Chart] yfinance 下载失败，使用归档数据: {symbol}/{interval}")
+
+    if arr is None or not len(arr):
+        return None
+    arr = arr[-rows_needed:]
+    if interval == "4h":
+        arr = resample_ohlcv(arr, 4 * 3600 * 1000)
+    return arr[-limit:]
 
 
-async def _fetch_klines_yfinance(symbol: str, interval: str, limit: int) -> Optional["pd.DataFrame"]:
+async def _fetch_klines_yfinance(symbol: str, interval: str, limit: int) -> Optional[np.ndarray]:
     """yfinance 拉取的异步包装，在线程池中执行同步调用。"""
     loop = asyncio.get_event_loop()
     try:
@@ -206,15 +370,50 @@ async def _fetch_klines_yfinance(symbol: str, interval: str, limit: int) -> Opti
 
 _CJK_FONT_LOADED = False
 _cjk_font_prop = None   # FontProperties(fname=...) 供 _draw_chart 直接设到 Text 对象上
+_cjk_font_lock = threading.Lock()   # lifespan 中在线程里预加载，与首次出图可能并发
 
 _CJK_KEYWORDS = ("noto", "cjk", "wqy", "simhei", "simsun")
 
-def _ensure_cjk_font() -> None:
-    global _CJK_FONT_LOADED, _cjk_font_prop
-    if _CJK_FONT_LOADED:
+_CJK_KNOWN_PATHS = (
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
+)
+
+
+def _read_cjk_font_cache() -> Optional[str]:
+    """缓存文件中的字体路径；文件不存在、字体已删除或 mtime 变化（字体更新）时返回 None。"""
+    path = settings.CJK_FONT_CACHE_PATH
+    if not path:
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            cached = json.load(f)
+        if os.path.getmtime(cached["path"]) == cached["mtime"]:
+            return cached["path"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _write_cjk_font_cache(font_path: str) -> None:
+    path = settings.CJK_FONT_CACHE_PATH
+    if not path:
         return
+    try:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"path": font_path, "mtime": os.path.getmtime(font_path)}, f)
+        os.replace(tmp, path)   # 渲染进程可能同时读取
+    except OSError:
+        logger.warning(f"[Chart] CJK字体缓存写入失败: {path}", exc_info=True)
+
+
+def _scan_cjk_font() -> Optional[str]:
+    """扫描系统字体查找 CJK 字体（耗时数秒）。"""
     import matplotlib.font_manager as fm
-    import matplotlib.pyplot as plt
 
     cjk_path: Optional[str] = None
     cjk_fallback: Optional[str] = None
@@ -237,94 +436,113 @@ def _ensure_cjk_font() -> None:
 
     # Step 2：系统扫描没找到时，尝试已知路径并手动注册
     if cjk_path is None:
-        for p in [
-            "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
-            "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
-            "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
-        ]:
+        for p in _CJK_KNOWN_PATHS:
             if os.path.exists(p):
                 fm.fontManager.addfont(p)
                 cjk_path = p
                 break
+    return cjk_path
 
-    plt.rcParams["axes.unicode_minus"] = False
-    _CJK_FONT_LOADED = True
 
-    if cjk_path is None:
-        logger.warning("[Chart] 未找到任何CJK字体，中文将显示为方块")
+def _ensure_cjk_font() -> None:
+    global _CJK_FONT_LOADED, _cjk_font_prop
+    if _CJK_FONT_LOADED:
         return
+    with _cjk_font_lock:
+        if _CJK_FONT_LOADED:
+            return
+        import matplotlib.font_manager as fm
+        import matplotlib.pyplot as plt
+
+        # 字体路径缓存在文件中（按字体文件 mtime 校验），重启后无需再扫描全部系统字体
+        cjk_path = _read_cjk_font_cache()
+        if cjk_path is None:
+            cjk_path = _scan_cjk_font()
+            if cjk_path is not None:
+                _write_cjk_font_cache(cjk_path)
+
+        plt.rcParams["axes.unicode_minus"] = False
+
+        if cjk_path is None:
+            _CJK_FONT_LOADED = True
+            logger.warning("[Chart] 未找到任何CJK字体，中文将显示为方块")
+            return
+
+        # 存 FontProperties(fname=...) 供 _draw_chart 直接注入到 Text 对象，
+        # 绕过 matplotlib 按名称查找字体时可能回落到 DejaVu Sans 的问题
+        _cjk_font_prop = fm.FontProperties(fname=cjk_path)
+        _CJK_FONT_LOADED = True
+        logger.info(f"[Chart] CJK字体已加载: {cjk_path}")
+
+
+async def preload_cjk_font() -> None:
+    """在线程中预加载 matplotlib 与 CJK 字体（lifespan 后台任务），首次出图不再阻塞事件循环。"""
+    t0 = time.perf_counter()
+    try:
+        await asyncio.to_thread(_ensure_cjk_font)
+    except Exception:
+        logger.warning("[Chart] CJK字体预加载失败", exc_info=True)
+        return
+    logger.info(f"[Chart] 字体预加载完成（{time.perf_counter() - t0:.1f}s）")
 
-    # 存 FontProperties(fname=...) 供 _draw_chart 直接注入到 Text 对象，
-    # 绕过 matplotlib 按名称查找字体时可能回落到 DejaVu Sans 的问题
-    _cjk_font_prop = fm.FontProperties(fname=cjk_path)
-    logger.info(f"[Chart] CJK字体已加载: {cjk_path}")
 
+_EMA_CONFIGS = [
+    (21,  "#F5C518"),  # 亮黄
+    (55,  "#D4920A"),  # 深金黄
+    (100, "#A0621A"),  # 土黄褐
+    (200, "#6B3A10"),  # 深棕
+]
 
-def _draw_chart(
-    symbol: str,
-    interval_label: str,
+# 单个子图的高度（英寸）；多子图时整张图高度 = 子图数 × 该值
+_PANEL_HEIGHT = 5
+
+
+def _draw_panel(
+    ax,
     df: "pd.DataFrame",
+    title_str: str,
     display_n: Optional[int] = None,
+    emas: Optional[np.ndarray] = None,
     zone_bot: Optional[float] = None,
     zone_top: Optional[float] = None,
     zone_role: Optional[str] = None,
     price_level: Optional[float] = None,
-    chart_title: Optional[str] = None,
     price_label: Optional[str] = None,
-) -> bytes:
+) -> None:
+    """
+    在给定 axes 上画一个周期的K线 + EMA + 叠加层（mplfinance 外部 axes 模式）。
+    emas 为与 df 行对齐的 [n, 4] EMA 矩阵（来自 IndicatorStore），未提供时按 df 全量计算。
+    """
     import mplfinance as mpf
-    import matplotlib.pyplot as plt
-    _ensure_cjk_font()
 
-    closes = df["Close"].tolist()
-
-    ema_configs = [
-        (21,  "#F5C518"),  # 亮黄
-        (55,  "#D4920A"),  # 深金黄
-        (100, "#A0621A"),  # 土黄褐
-        (200, "#6B3A10"),  # 深棕
-    ]
+    closes = df["Close"].to_numpy(dtype=np.float64)
     add_plots = []
-    for period, color in ema_configs:
-        vals = _compute_ema(closes, period)
+    for col, (period, color) in enumerate(_EMA_CONFIGS):
+        vals = emas[:, col] if emas is not None else ema(closes, period)
         # 只取最后 display_n 个值，与 df 对齐
         if display_n is not None:
             vals = vals[-display_n:]
-        if any(not math.isnan(v) for v in vals):
-            add_plots.append(mpf.make_addplot(vals, color=color, width=1.3, alpha=0.7, label=f"EMA{period}"))
+        if not np.isnan(vals).all():
+            add_plots.append(mpf.make_addplot(vals, ax=ax, color=color, width=1.3, alpha=0.7, label=f"EMA{period}"))
 
     # 只显示最后 display_n 根 K线
     if display_n is not None:
         df = df.iloc[-display_n:]
 
-    title_str = chart_title if chart_title else f"{symbol}  {interval_label}"
-    fig, axes = mpf.plot(
+    mpf.plot(
         df,
         type="candle",
-        style="classic",
-        title=f"\n{title_str}",
+        ax=ax,
         addplot=add_plots,
-        figsize=(14, 5),
-        returnfig=True,
         warn_too_much_data=9999,
     )
 
-    ax = axes[0]
-
-    # 直接将 CJK 字体注入 suptitle Text 对象，绕过名称查找回落问题
+    # 标题直接使用 CJK 字体对象，绕过名称查找回落问题
     title_color = "#ef5350" if "超买" in title_str else "#26a69a" if "超卖" in title_str else "#000000"
-    if _cjk_font_prop is not None:
-        for txt in fig.texts:
-            txt.set_fontproperties(_cjk_font_prop)
-            txt.set_fontsize(21)
-            txt.set_color(title_color)
-
-    # 图例（mplfinance returnfig 模式下需手动触发）
-    handles, labels = [], []
-    for a in axes:
-        h, l = a.get_legend_handles_labels()
-        handles.extend(h)
-        labels.extend(l)
+    ax.set_title(title_str, fontproperties=_cjk_font_prop, fontsize=21, color=title_color)
+
+    # 图例（外部 axes 模式下需手动触发）
+    handles, labels = ax.get_legend_handles_labels()
     if handles:
         ax.legend(handles, labels, loc="upper left", fontsize=8, framealpha=0.6)
 
@@ -352,20 +570,89 @@ def _draw_chart(
     margin = (y_max - y_min) * 0.08
     ax.set_ylim(y_min - margin, y_max + margin)
 
-    # 隐藏 x 轴刻度标签，减少垂直占用，并压缩底部空白
-    for a in axes:
-        a.tick_params(axis='x', labelbottom=False)
-    fig.subplots_adjust(bottom=0.02)
+    # 隐藏 x 轴刻度标签，减少垂直占用
+    ax.tick_params(axis="x", labelbottom=False)
 
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png", dpi=150, bbox_inches="tight", pad_inches=0.05)
-    plt.close(fig)
-    buf.seek(0)
-    return buf.read()
 
+def _render_figure(
+    panels: list[tuple[str, "pd.DataFrame", Optional[int], Optional[np.ndarray]]],
+    zone_bot: Optional[float] = None,
+    zone_top: Optional[float] = None,
+    zone_role: Optional[str] = None,
+    price_level: Optional[float] = None,
+    price_label: Optional[str] = None,
+    profile: Optional[EncodeProfile] = None,
+) -> EncodedImage:
+    """
+    将全部子图 (title, df, display_n, emas) 画在同一个 figure 的上下排列的 axes 中，只编码一次。
+    相比逐个出图再用 PIL 解码/拼接/重新编码，省掉了多余的编解码与中间图片内存。
+    """
+    import mplfinance as mpf
+    import matplotlib.pyplot as plt
+    _ensure_cjk_font()
+    profile = profile or _default_encode_profile
 
-def _vstack_pngs(chart_bytes_list: list[bytes]) -> bytes:
-    """将多张 PNG 字节垂直拼接为一张图。"""
+    n = len(panels)
+    fig = mpf.figure(style="classic", figsize=(14, _PANEL_HEIGHT * n))
+    try:
+        for i, (title_str, df, display_n, emas) in enumerate(panels):
+            ax = fig.add_subplot(n, 1, i + 1)
+            _draw_panel(
+                ax, df, title_str, display_n=display_n, emas=emas,
+                zone_bot=zone_bot, zone_top=zone_top, zone_role=zone_role,
+                price_level=price_level, price_label=price_label,
+            )
+        if profile.tight:
+            fig.subplots_adjust(bottom=0.02, hspace=0.25)
+        else:
+            apply_fixed_margins(fig)
+            fig.subplots_adjust(hspace=0.25)
+        return encode_figure(fig, profile)
+    finally:
+        plt.close(fig)
+
+
+def _draw_figure(
+    panels: list[tuple[str, "pd.DataFrame", Optional[int], Optional[np.ndarray]]],
+    zone_bot: Optional[float] = None,
+    zone_top: Optional[float] = None,
+    zone_role: Optional[str] = None,
+    price_level: Optional[float] = None,
+    price_label: Optional[str] = None,
+    profile: Optional[EncodeProfile] = None,
+) -> bytes:
+    """多子图单 figure（编码后的图片字节）。"""
+    return _render_figure(
+        panels, zone_bot=zone_bot, zone_top=zone_top, zone_role=zone_role,
+        price_level=price_level, price_label=price_label, profile=profile,
+    ).data
+
+
+def _draw_chart(
+    symbol: str,
+    interval_label: str,
+    df: "pd.DataFrame",
+    display_n: Optional[int] = None,
+    zone_bot: Optional[float] = None,
+    zone_top: Optional[float] = None,
+    zone_role: Optional[str] = None,
+    price_level: Optional[float] = None,
+    chart_title: Optional[str] = None,
+    price_label: Optional[str] = None,
+    profile: Optional[EncodeProfile] = None,
+    emas: Optional[np.ndarray] = None,
+) -> bytes:
+    """单周期K线图（默认 PNG 字节）。emas 为与 df 行对齐的 EMA21/55/100/200 [n, 4]，未给出时按 df 计算。"""
+    title_str = chart_title if chart_title else f"{symbol}  {interval_label}"
+    return _draw_figure(
+        [(title_str, df, display_n, emas)],
+        zone_bot=zone_bot, zone_top=zone_top, zone_role=zone_role,
+        price_level=price_level, price_label=price_label, profile=profile,
+    )
+
+
+def _vstack_images(chart_bytes_list: list[bytes]) -> "Image.Image":
+    """将多张图片字节垂直拼接为一张 PIL 图片（单 figure 渲染失败时的降级路径）。"""
     from PIL import Image
     images = [Image.open(io.BytesIO(b)).convert("RGB") for b in chart_bytes_list]
     max_w = max(img.width for img in images)
@@ -375,10 +662,156 @@ def _vstack_pngs(chart_bytes_list: list[bytes]) -> bytes:
     for img in images:
         combined.paste(img, (0, y))
         y += img.height
-    buf = io.BytesIO()
-    combined.save(buf, format="PNG")
-    buf.seek(0)
-    return buf.read()
+    return combined
+
+
+def _vstack_pngs(chart_bytes_list: list[bytes]) -> bytes:
+    """将多张 PNG 字节垂直拼接为一张 PNG。"""
+    return encode_image(_vstack_images(chart_bytes_list), EncodeProfile()).data
+
+
+def _panel_params(max_iv: str) -> Optional[tuple[str, int, int]]:
+    """返回 (label, display_n, fetch_limit)；max_iv 不支持画图时返回 None。"""
+    if max_iv in ("15m", "3m"):
+        display_n = settings.CHART_15M_BARS if max_iv == "15m" else settings.CHART_3M_BARS
+        fetch_limit = display_n + 1000  # EMA200 需要足够稳定期，Binance 上限 1500
+        return max_iv.upper(), display_n, fetch_limit
+    candles_per_day = _CANDLES_PER_DAY.get(max_iv)
+    if candles_per_day is None:
+        return None
+    days = {"1D": settings.CHART_1D_DAYS, "4h": settings.CHART_4H_DAYS}.get(max_iv, settings.CHART_1H_DAYS)
+    display_n = days * candles_per_day
+    return f"{max_iv.upper()} · {days}d", display_n, display_n + 500
+
+
+async def _load_panel(symbol: str, max_iv: str, chart_title: Optional[str] = None) -> Optional[PanelJob]:
+    """
+    拉取单个子图的 OHLCV。
+    数据源：优先 Binance Futures，失败时 fallback 到 yfinance（覆盖美股/大宗商品）。
+    """
+    params = _panel_params(max_iv)
+    if params is None:
+        return None
+    label, display_n, fetch_limit = params
+    interval_sec = settings.INTERVAL_SECONDS[max_iv]
+    now_ms = time.time() * 1000
+
+    # EMA 已建档时只拉显示长度 + 新增K线；无重叠（断档）时再按长窗口拉取并重新建档
+    window = None
+    if _indicator_store is not None:
+        window = _indicator_store.window_limit(symbol, max_iv, display_n, interval_sec, now_ms)
+    ohlcv = await _fetch_ohlcv(symbol, max_iv, window or fetch_limit)
+    emas = None
+    if ohlcv is not None and _indicator_store is not None:
+        if window is not None:
+            emas = _indicator_store.try_incremental(symbol, max_iv, ohlcv, interval_sec, now_ms)
+            if emas is None:
+                ohlcv = await _fetch_ohlcv(symbol, max_iv, fetch_limit)
+        if ohlcv is not None and emas is None:
+            emas = _indicator_store.seed(symbol, max_iv, ohlcv, interval_sec, now_ms)
+    if ohlcv is None:
+        return None
+    return PanelJob(
+        symbol=symbol, label=label, ohlcv=ohlcv, display_n=display_n,
+        chart_title=chart_title, interval=max_iv, emas=emas,
+    )
+
+
+async def prefetch_panel(symbol: str, max_iv: str) -> bool:
+    """预取单个子图的K线（写入K线缓存 / EMA 状态），不渲染。"""
+    try:
+        return await _load_panel(symbol, max_iv) is not None
+    except Exception:
+        logger.warning(f"[Chart] 预取失败: {symbol}/{max_iv}", exc_info=True)
+        return False
+
+
+async def _fetch_ohlcv(symbol: str, max_iv: str, limit: int) -> Optional[np.ndarray]:
+    """优先 Binance（经K线缓存），失败 fallback yfinance。返回 float64 [n, 6]。"""
+    ohlcv = await fetch_binance_ohlcv(symbol, max_iv, limit)
+    if ohlcv is not None:
+        return ohlcv
+    logger.info(f"[Chart] Binance 无数据，尝试 yfinance: {symbol}/{max_iv}")
+    return await _fetch_klines_yfinance(symbol, max_iv, limit)
+
+
+def _load_encode_profiles() -> tuple[EncodeProfile, dict[int, EncodeProfile]]:
+    """
+    settings.CHART_ENCODE_PROFILES → (默认 profile, {topic_id: profile})。
+    key 为 "default" 或 TG_TOPIC_ 后缀（不区分大小写，如 "4h"、"entry"），话题 profile 未给出的字段沿用 default。
+    """
+    conf = {k.lower(): v for k, v in settings.CHART_ENCODE_PROFILES.items()}
+    default = EncodeProfile.from_dict(conf.pop("default", {}))
+    by_topic: dict[int, EncodeProfile] = {}
+    for name, opts in conf.items():
+        topic_id = getattr(settings, f"TG_TOPIC_{name.upper()}", None)
+        if topic_id is None:
+            logger.warning(f"[Chart] 编码配置中的未知话题: {name}")
+            continue
+        by_topic[topic_id] = EncodeProfile.from_dict(opts, base=default)
+    return default, by_topic
+
+
+_default_encode_profile, _topic_encode_profiles = _load_encode_profiles()
+
+
+def encode_profile_for(topic_id: Optional[int]) -> EncodeProfile:
+    return _topic_encode_profiles.get(topic_id, _default_encode_profile)
+
+
+# 已渲染图表缓存：同一 bar 内重复推送（共振 + zone + EMA、美股改路由等）直接复用
+_png_cache = PngCache(max_bytes=int(settings.CHART_PNG_CACHE_MAX_MB * 1024 * 1024))
+
+
+def png_cache_stats() -> dict:
+    return _png_cache.stats()
+
+
+def _last_closed_open_ms(panel: PanelJob, now_ms: float) -> Optional[float]:
+    """子图中最后一根已收盘K线的开盘时间（毫秒）。"""
+    bar_ms = settings.INTERVAL_SECONDS[panel.interval] * 1000
+    opens = panel.ohlcv[:, 0]
+    closed = opens[opens + bar_ms <= now_ms]
+    return float(closed[-1]) if len(closed) else None
+
+
+def _png_cache_key(layout: str, job: RenderJob, chart_title: Optional[str]) -> tuple:
+    """(symbol, 各子图周期 + 最后收盘K线, 叠加参数, 标题, 编码参数)：未收盘K线的变化不会使缓存失效。"""
+    now_ms = time.time() * 1000
+    return (
+        layout,
+        job.panels[0].symbol,
+        tuple((p.interval, _last_closed_open_ms(p, now_ms)) for p in job.panels),
+        (job.zone_bot, job.zone_top, job.zone_role, job.price_level, job.price_label),
+        chart_title,
+        job.encode,
+    )
+
+
+async def _render_cached(layout: str, job: RenderJob, chart_title: Optional[str]) -> Optional[bytes]:
+    key = _png_cache_key(layout, job, chart_title)
+    png = _png_cache.get(key)
+    if _msg_stats is not None:
+        _msg_stats.record_chart_cache(hit=png is not None)
+    if png is not None:
+        return png
+    image = await _render(job)
+    if image is None:
+        return None
+    if _msg_stats is not None:
+        _msg_stats.record_chart_encode(image.encode_ms, len(image.data))
+    _png_cache.put(key, image.data)
+    return image.data
+
+
+async def _render(job: RenderJob) -> Optional[EncodedImage]:
+    """优先在渲染进程池中执行；未启用或进程池异常时在当前进程渲染。"""
+    if _render_pool is not None:
+        try:
+            return await _render_pool.render(job)
+        except Exception:
+            logger.warning(f"[Chart] 进程池渲染失败，改为本地渲染: {job.panels[0].symbol}", exc_info=True)
+    return run_render_job(job)
 
 
 async def generate_chart(
@@ -390,45 +823,22 @@ async def generate_chart(
     price_level: Optional[float] = None,
     chart_title: Optional[str] = None,
     price_label: Optional[str] = None,
+    profile: Optional[EncodeProfile] = None,
 ) -> Optional[bytes]:
     """
-    生成带EMA21/55/100/200的K线图（PNG字节）。
-    max_iv 须在 _CANDLES_PER_DAY 中定义，否则返回 None。
-    数据源：优先 Binance Futures，失败时 fallback 到 yfinance（覆盖美股/大宗商品）。
+    生成带EMA21/55/100/200的K线图（按 profile 编码的图片字节，默认 PNG）。
+    max_iv 须在 _CANDLES_PER_DAY 中定义（或为 15m/3m），否则返回 None。
     任何异常均返回 None，不影响调用方。
     """
-    binance_iv = _INTERNAL_TO_BINANCE_IV.get(max_iv, max_iv)
-
-    if max_iv in ("15m", "3m"):
-        display_n = settings.CHART_15M_BARS if max_iv == "15m" else settings.CHART_3M_BARS
-        fetch_limit = display_n + 1000  # EMA200 需要足够稳定期，Binance 上限 1500
-        label = max_iv.upper()
-    else:
-        candles_per_day = _CANDLES_PER_DAY.get(max_iv)
-        if candles_per_day is None:
-            return None
-        days = {"1D": settings.CHART_1D_DAYS, "4h": settings.CHART_4H_DAYS}.get(max_iv, settings.CHART_1H_DAYS)
-        display_n = days * candles_per_day
-        fetch_limit = display_n + 500
-        label = f"{max_iv.upper()} · {days}d"
-
-    # 优先 Binance，失败 fallback yfinance
-    df = None
-    klines = await _fetch_klines(symbol, binance_iv, fetch_limit)
-    if klines:
-        df = _binance_to_df(klines)
-    else:
-        logger.info(f"[Chart] Binance 无数据，尝试 yfinance: {symbol}/{max_iv}")
-        df = await _fetch_klines_yfinance(symbol, max_iv, fetch_limit)
-
-    if df is None:
-        return None
-
-    try:
-        return _draw_chart(symbol, label, df, display_n=display_n, zone_bot=zone_bot, zone_top=zone_top, zone_role=zone_role, price_level=price_level, chart_title=chart_title, price_label=price_label)
-    except Exception:
-        logger.warning(f"[Chart] 绘图失败: {symbol}/{max_iv}", exc_info=True)
+    panel = await _load_panel(symbol, max_iv, chart_title)
+    if panel is None:
         return None
+    return await _render_cached("single", RenderJob(
+        panels=[panel],
+        zone_bot=zone_bot, zone_top=zone_top, zone_role=zone_role,
+        price_level=price_level, price_label=price_label,
+        encode=profile or _default_encode_profile,
+    ), chart_title)
 
 
 async def _try_send_chart(
@@ -450,6 +860,7 @@ async def _try_send_chart(
             symbol, max_iv,
             zone_bot=zone_bot, zone_top=zone_top, zone_role=zone_role,
             price_level=price_level, chart_title=chart_title, price_label=price_label,
+            profile=encode_profile_for(message_thread_id),
         )
         if photo is not None:
             await tg.send_photo(
@@ -457,10 +868,46 @@ async def _try_send_chart(
                 photo=photo,
                 message_thread_id=message_thread_id,
             )
+            if _msg_stats is not None:
+                _msg_stats.record_chart_upload(len(photo))
     except Exception:
         logger.warning(f"[Chart] 发送失败: {symbol}/{max_iv}", exc_info=True)
 
 
+# 子图拉取耗时分布（按周期，最近 N 次），每 _PANEL_LATENCY_LOG_EVERY 张多图记录一次日志
+_PANEL_LATENCY_WINDOW = 256
+_PANEL_LATENCY_LOG_EVERY = 50
+_panel_latency: dict[str, deque] = {}
+_panel_timeouts: dict[str, int] = {}
+_multi_chart_count = 0
+
+
+def _record_panel_latency(symbol: str, intervals: list[str], latency: dict[str, float], deadline: float) -> None:
+    global _multi_chart_count
+    timed_out = [iv for iv in intervals if iv not in latency]
+    for iv in intervals:
+        if iv in latency:
+            _panel_latency.setdefault(iv, deque(maxlen=_PANEL_LATENCY_WINDOW)).append(latency[iv])
+        else:
+            _panel_timeouts[iv] = _panel_timeouts.get(iv, 0) + 1
+    parts = "  ".join(f"{iv} {latency[iv]:.0f}ms" if iv in latency else f"{iv} >{deadline:.0f}s" for iv in intervals)
+    if timed_out:
+        logger.warning(f"[Chart] 子图超时已取消 {symbol}: {parts}")
+    else:
+        logger.debug(f"[Chart] 子图耗时 {symbol}: {parts}")
+
+    _multi_chart_count += 1
+    if _multi_chart_count % _PANEL_LATENCY_LOG_EVERY == 0:
+        summary = []
+        for iv, values in _panel_latency.items():
+            ordered = sorted(values)
+            summary.append(
+                f"{iv} p50 {ordered[len(ordered) // 2]:.0f}ms p95 {ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]:.0f}ms"
+                f" max {ordered[-1]:.0f}ms 超时 {_panel_timeouts.get(iv, 0)}"
+            )
+        logger.info(f"[Chart] 子图耗时分布（最近 {_PANEL_LATENCY_WINDOW} 次）: " + "；".join(summary))
+
+
 async def generate_multi_chart(
     symbol: str,
     intervals: list[str],
@@ -470,8 +917,14 @@ async def generate_multi_chart(
     price_level: Optional[float] = None,
     chart_title: Optional[str] = None,
     price_label: Optional[str] = None,
+    profile: Optional[EncodeProfile] = None,
+    soft_deadline: Optional[float] = None,
 ) -> Optional[bytes]:
-    """并发生成多个周期的K线图并垂直拼接为一张图。"""
+    """
+    并发拉取多个周期的K线，渲染为垂直拼接的一张图（按 profile 编码，默认 PNG）。
+    拉取超过 soft_deadline 秒（默认 CHART_PANEL_SOFT_DEADLINE_SEC）的子图取消，用已就绪的子图出图；
+    全部子图都未就绪时返回 None。
+    """
     from datetime import datetime
     from zoneinfo import ZoneInfo
     et_str = datetime.now(tz=ZoneInfo("America/New_York")).strftime("%m/%d %H:%M ET")
@@ -480,27 +933,92 @@ async def generate_multi_chart(
         base = f"{chart_title}  [{iv}]" if chart_title else f"{symbol}  {iv}"
         return f"{base}  {et_str}" if is_top else base
 
-    tasks = [
-        generate_chart(
-            symbol, iv,
-            zone_bot=zone_bot, zone_top=zone_top, zone_role=zone_role,
-            price_level=price_level,
-            chart_title=_title(iv, i == 0),
-            price_label=price_label,
-        )
-        for i, iv in enumerate(intervals)
-    ]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    chart_bytes = [r for r in results if isinstance(r, bytes) and r]
-    if not chart_bytes:
-        return None
-    if len(chart_bytes) == 1:
-        return chart_bytes[0]
+    # 软截止：到时已就绪的子图照常出图，未就绪的取消并在标题中注明
+    deadline = settings.CHART_PANEL_SOFT_DEADLINE_SEC if soft_deadline is None else soft_deadline
+    latency: dict[str, float] = {}
+
+    async def _timed_load(iv: str, title: str) -> Optional[PanelJob]:
+        t0 = time.perf_counter()
+        try:
+            return await _load_panel(symbol, iv, title)
+        finally:
+            latency[iv] = (time.perf_counter() - t0) * 1000
+
+    tasks = [asyncio.create_task(_timed_load(iv, _title(iv, i == 0))) for i, iv in enumerate(intervals)]
     try:
-        return _vstack_pngs(chart_bytes)
-    except Exception:
-        logger.warning(f"[Chart] 多图合并失败: {symbol}", exc_info=True)
-        return chart_bytes[0]
+        await asyncio.wait(tasks, timeout=deadline)
+    finally:
+        timed_out = {iv for iv, t in zip(intervals, tasks) if not t.done()}
+        # 取消只影响本次等待：进行中的K线请求由 single-flight 共享，不会被中断
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    for iv in timed_out:
+        latency.pop(iv, None)
+
+    panels: list[PanelJob] = []
+    missing: list[str] = []
+    for iv, t in zip(intervals, tasks):
+        result = None if t.cancelled() or t.exception() is not None else t.result()
+        if isinstance(result, PanelJob):
+            panels.append(result)
+        else:
+            missing.append(f"{iv} {'超时' if iv in timed_out else '无数据'}")
+    _record_panel_latency(symbol, intervals, latency, deadline)
+    if not panels:
+        return None
+    if missing:
+        top = panels[0]
+        top.chart_title = f"{top.chart_title or f'{symbol}  {top.label}'}  [缺: {', '.join(missing)}]"
+    # 全部子图一次提交渲染（单个任务内画图 + 拼接）
+    # 标题中的 ET 时间不参与缓存 key，命中时沿用首次渲染的时间
+    return await _render_cached("multi", RenderJob(
+        panels=panels,
+        zone_bot=zone_bot, zone_top=zone_top, zone_role=zone_role,
+        price_level=price_level, price_label=price_label,
+        encode=profile or _default_encode_profile,
+    ), chart_title)
+
+
+# 推送出图调度（拉取 + 渲染）：并发上限 + 优先级排队 + 开始截止时间
+_render_scheduler = RenderScheduler(settings.CHART_RENDER_MAX_CONCURRENT)
+
+# 推送最大周期 → 出图优先级（越小越先）
+_INTERVAL_PRIORITY: dict[str, int] = {"1W": 0, "1D": 0, "4h": 1, "1h": 2, "15m": 3, "5m": 4, "3m": 4, "30s": 5}
+
+# 未配置截止时间的周期
+_DEFAULT_RENDER_DEADLINE_SEC = 15.0
+
+
+def render_scheduler_stats() -> dict:
+    return _render_scheduler.stats()
+
+
+def _render_priority(max_iv: str, topic_id: int) -> int:
+    topic_offsets = {
+        getattr(settings, f"TG_TOPIC_{name.upper()}", None): offset
+        for name, offset in settings.CHART_TOPIC_PRIORITY.items()
+    }
+    return _INTERVAL_PRIORITY.get(max_iv, max(_INTERVAL_PRIORITY.values()) + 1) + topic_offsets.get(topic_id, 0)
+
+
+# 画质档位参考的渲染耗时窗口（秒）：更早的样本不再反映当前负载
+_QUALITY_LATENCY_WINDOW_SEC = 300.0
+
+
+def _choose_quality() -> QualityStep:
+    if not settings.CHART_QUALITY_ADAPTIVE:
+        return QUALITY_LADDER[0]
+    # 耗时只看进程池的纯渲染耗时：出图任务总耗时含K线拉取，慢在网络时降画质无济于事。
+    # 未启用进程池时没有渲染耗时样本，只按排队数选择
+    recent_ms = _render_pool.recent_render_ms(_QUALITY_LATENCY_WINDOW_SEC) if _render_pool is not None else 0.0
+    level = choose_quality_level(
+        depth=_render_scheduler.depth,
+        capacity=_render_scheduler.capacity,
+        recent_ms=recent_ms,
+        latency_ms=settings.CHART_QUALITY_LATENCY_MS,
+    )
+    return QUALITY_LADDER[level]
 
 
 def _chart_intervals_for(max_iv: str) -> list[str]:
@@ -530,39 +1048,69 @@ async def send_with_chart(
     reply_to_message_id: Optional[int] = None,
 ) -> Optional[int]:
     """
-    在话题锁保护下，顺序发送文字消息和K线图。
-    同一 topic_id 的发送串行执行，保证文字和图片之间不被其他事件插入。
+    发送带K线图的推送（图文同一条消息；出图失败时降级纯文字）。
+    进入时领取话题内序号：拉取K线/渲染与同话题的其他推送并发进行（经 RenderScheduler 限流与排序，
+    截止时间前未能开始出图则只发文字），发送阶段按序号依次执行，同一 topic_id 的消息顺序与调用顺序一致。
     文字发送失败会抛出异常；图片失败静默忽略。
+    4H 话题的 AI 分析在发送完成后入队（AnalysisQueue），结果回复到图表消息。
     返回文字消息的 message_id（供后续消息引用）。
     """
-    lock = _topic_locks.setdefault(topic_id, asyncio.Lock())
-    async with lock:
+    sequencer = _topic_sequencers.setdefault(topic_id, TopicSequencer())
+    seq = sequencer.ticket()
+    try:
         photo: Optional[bytes] = None
         photo_error: Optional[str] = None
-        try:
-            photo = await asyncio.wait_for(
-                generate_multi_chart(
-                    symbol, chart_ivs if chart_ivs is not None else _chart_intervals_for(max_iv),
-                    zone_bot=zone_bot, zone_top=zone_top, zone_role=zone_role,
-                    price_level=price_level, chart_title=chart_title, price_label=price_label,
-                ),
-                timeout=20.0,
-            )
-            if photo is None:
-                photo_error = "数据获取失败"
-        except asyncio.TimeoutError:
-            logger.warning(f"[Chart] 多图生成超时: {symbol}/{max_iv}")
-            photo_error = "图表生成超时"
-        except Exception as e:
-            logger.warning(f"[Chart] 多图生成异常: {symbol}/{max_iv}", exc_info=True)
-            photo_error = str(e)[:120] or "未知异常"
+        # 按当前出图负载选择画质档位
+        quality = _choose_quality()
+        if _msg_stats is not None:
+            _msg_stats.record_chart_quality(quality.name)
+        if quality is not QUALITY_LADDER[0]:
+            logger.info(f"[Chart] 出图负载较高，画质降为 {quality.name}: {symbol}/{max_iv}")
+        intervals = reduce_panels(
+            chart_ivs if chart_ivs is not None else _chart_intervals_for(max_iv), max_iv, quality.max_panels,
+        )
+        profile = encode_profile_for(topic_id)
+        if quality.dpi_scale != 1.0:
+            profile = dataclasses.replace(profile, dpi=round(profile.dpi * quality.dpi_scale))
+        if not intervals:
+            photo_error = "负载过高，仅发送文字"
+        else:
+            try:
+                photo = await _render_scheduler.run(
+                    _render_priority(max_iv, topic_id),
+                    settings.CHART_RENDER_DEADLINE_SEC.get(max_iv, _DEFAULT_RENDER_DEADLINE_SEC),
+                    lambda: asyncio.wait_for(
+                        generate_multi_chart(
+                            symbol, intervals,
+                            zone_bot=zone_bot, zone_top=zone_top, zone_role=zone_role,
+                            price_level=price_level, chart_title=chart_title, price_label=price_label,
+                            profile=profile,
+                        ),
+                        timeout=20.0,
+                    ),
+                )
+                if photo is None:
+                    photo_error = "数据获取失败"
+            except RenderDeadlineMissed:
+                logger.warning(f"[Chart] 出图排队超时，只发文字: {symbol}/{max_iv}")
+                photo_error = "出图繁忙，排队超时"
+            except asyncio.TimeoutError:
+                logger.warning(f"[Chart] 多图生成超时: {symbol}/{max_iv}")
+                photo_error = "图表生成超时"
+            except Exception as e:
+                logger.warning(f"[Chart] 多图生成异常: {symbol}/{max_iv}", exc_info=True)
+                photo_error = str(e)[:120] or "未知异常"
 
+        # 只有发送阶段按序进行
+        await sequencer.wait_turn(seq)
         if photo is not None:
             try:
                 msg_id = await tg.send_photo(
                     chat_id=chat_id, photo=photo, caption=msg,
                     message_thread_id=topic_id, reply_to_message_id=reply_to_message_id,
                 )
+                if _msg_stats is not None:
+                    _msg_stats.record_chart_upload(len(photo))
             except Exception as e:
                 logger.warning(f"[Chart] sendPhoto失败，降级纯文字: {symbol}/{max_iv} {e}")
                 photo = None
@@ -577,42 +1125,19 @@ async def send_with_chart(
                 chat_id=chat_id, text=fallback_text, message_thread_id=topic_id,
                 reply_to_message_id=reply_to_message_id,
             )
-
-        if (
-            photo is not None
-            and topic_id == settings.TG_TOPIC_4H
-            and _analysis_svc is not None
-            and _analysis_enabled
-        ):
-            try:
-                analysis_text, usage = await _analysis_svc.analyze(
-                    image_bytes=photo,
-                    symbol=symbol,
-                    extra_context=analysis_context,
-                )
-                await tg.send_message(
-                    chat_id=chat_id,
-                    text=analysis_text,
-                    message_thread_id=topic_id,
-                )
-                if _msg_stats is not None:
-                    _msg_stats.record_tokens(
-                        input_tokens=usage.input_tokens,
-                        output_tokens=usage.output_tokens,
-                        cache_creation=usage.cache_creation_tokens,
-                        cache_read=usage.cache_read_tokens,
-                    )
-                    if _msg_stats.get_estimated_cost() > 1.0:
-                        set_analysis_enabled(False)
-                        logger.warning("[Analysis] 今日成本超过 $1.00，已自动关闭AI分析")
-                        try:
-                            await tg.send_message(
-                                chat_id=chat_id,
-                                text=f"⚠️ AI分析今日成本已超过 $1.00，已自动关闭。\n如需恢复请发送 /analysis on",
-                                message_thread_id=settings.TG_TOPIC_SUMMARY,
-                            )
-                        except Exception:
-                            logger.warning("[Analysis] 超限通知发送失败", exc_info=True)
-            except Exception:
-                logger.warning(f"[Analysis] 分析失败: {symbol}", exc_info=True)
+    finally:
+        sequencer.done(seq)
+
+    # AI 分析在发送完成后排队执行，结果作为图表消息的回复发送，不阻塞同话题的后续推送
+    if (
+        photo is not None
+        and topic_id == settings.TG_TOPIC_4H
+        and _analysis_queue is not None
+        and _analysis_enabled
+    ):
+        from ..services.analysis_queue import AnalysisJob
+        _analysis_queue.submit(AnalysisJob(
+            image=photo, symbol=symbol, chat_id=chat_id, topic_id=topic_id,
+            reply_to_message_id=msg_id, extra_context=analysis_context,
+        ))
     return msg_id
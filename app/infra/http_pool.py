@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Optional
+
+import httpx
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# 延迟分位数统计窗口（最近 N 次请求）
+_LATENCY_WINDOW = 1024
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class PooledHttpClient:
+    """
+    app 生命周期内复用的 httpx.AsyncClient：连接池 + keep-alive（可选 HTTP/2），
+    避免每次请求都重新做 DNS / TCP / TLS 握手。记录每次请求的延迟。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_connections: int,
+        max_keepalive: int,
+        keepalive_expiry: float,
+        timeout: float,
+        http2: bool = True,
+    ):
+        if http2 and not _h2_available():
+            logger.warning(f"[HTTP:{name}] 未安装 h2，回退 HTTP/1.1（pip install 'httpx[http2]'）")
+            http2 = False
+        self.name = name
+        self._client = httpx.AsyncClient(
+            http2=http2,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        )
+        self._latencies: Deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self.requests = 0
+        self.errors = 0
+        self.http_versions: Counter = Counter()
+
+    @property
+    def is_closed(self) -> bool:
+        return self._client.is_closed
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        t0 = time.perf_counter()
+        try:
+            r = await self._client.get(url, **kwargs)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._latencies.append((time.perf_counter() - t0) * 1000)
+            self.requests += 1
+        self.http_versions[r.http_version] += 1
+        return r
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        lat = sorted(self._latencies)
+
+        def pct(p: float) -> float:
+            return lat[min(int(len(lat) * p), len(lat) - 1)] if lat else 0.0
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "http_versions": dict(self.http_versions),
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "max_ms": lat[-1] if lat else 0.0,
+        }
+
+
+# Binance REST（K线）共享客户端：lifespan 中创建/关闭，图表与衰竭规则共用
+_binance_client: Optional[PooledHttpClient] = None
+
+
+def _new_binance_client() -> PooledHttpClient:
+    return PooledHttpClient(
+        name="binance",
+        max_connections=settings.BINANCE_HTTP_MAX_CONNECTIONS,
+        max_keepalive=settings.BINANCE_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.BINANCE_HTTP_KEEPALIVE_EXPIRY,
+        timeout=settings.BINANCE_HTTP_TIMEOUT,
+        http2=settings.BINANCE_HTTP2,
+    )
+
+
+def start_binance_client() -> PooledHttpClient:
+    global _binance_client
+    if _binance_client is None or _binance_client.is_closed:
+        _binance_client = _new_binance_client()
+    return _binance_client
+
+
+async def close_binance_client() -> None:
+    global _binance_client
+    if _binance_client is not None:
+        await _binance_client.aclose()
+        _binance_client = None
+
+
+def binance_client() -> PooledHttpClient:
+    """返回共享客户端；未经 lifespan 启动（脚本/测试）时按需创建。"""
+    return start_binance_client()
+
+
+def binance_http_stats() -> Optional[Dict[str, Any]]:
+    return _binance_client.stats() if _binance_client is not None else None
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import io
+import struct
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Mapping, Optional
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+    from PIL.Image import Image
+
+# format → (media_type, 文件扩展名)
+_FORMATS = {
+    "png": ("image/png", "png"),
+    "png_optimized": ("image/png", "png"),
+    "png_palette": ("image/png", "png"),
+    "jpeg": ("image/jpeg", "jpg"),
+    "webp": ("image/webp", "webp"),
+}
+
+_LOSSY = ("jpeg", "webp")
+
+# 超出 target_bytes 时：有损格式每次降低的 quality 及下限，之后按比例缩小图片
+_QUALITY_STEP = 10
+_MIN_QUALITY = 40
+_SHRINK = 0.85
+_MIN_WIDTH = 700
+
+# 非 tight 布局时的固定边距（英寸）：与 bbox_inches="tight", pad_inches=0.05 的留白接近
+_MARGIN_TOP_IN = 0.45
+_MARGIN_BOTTOM_IN = 0.1
+_MARGIN_LEFT_IN = 0.15
+_MARGIN_RIGHT_IN = 1.0    # 右侧价格刻度与 "Price" 标签
+
+
+@dataclass(frozen=True)
+class EncodeProfile:
+    """图表编码参数（按话题配置，见 settings.CHART_ENCODE_PROFILES）。"""
+    format: str = "png"                # png / png_optimized / png_palette / jpeg / webp
+    dpi: int = 150
+    max_width: Optional[int] = None    # 像素上限：超出时按比例降低 dpi
+    max_height: Optional[int] = None
+    tight: bool = True                 # bbox_inches="tight"（多一次布局计算）；False 时用固定边距
+    quality: int = 85                  # jpeg / webp
+    target_bytes: Optional[int] = None # 超出时逐步降低 quality / 缩小尺寸
+
+    def __post_init__(self) -> None:
+        if self.format not in _FORMATS:
+            raise ValueError(f"不支持的图片格式: {self.format}（可选 {', '.join(_FORMATS)}）")
+
+    @property
+    def media_type(self) -> str:
+        return _FORMATS[self.format][0]
+
+    @property
+    def extension(self) -> str:
+        return _FORMATS[self.format][1]
+
+    @classmethod
+    def from_dict(cls, opts: Mapping[str, Any], base: Optional["EncodeProfile"] = None) -> "EncodeProfile":
+        """由配置项构造；未给出的字段沿用 base。"""
+        fields = dict(base.__dict__) if base is not None else {}
+        unknown = set(opts) - set(cls.__dataclass_fields__)
+        if unknown:
+            raise ValueError(f"未知的编码参数: {', '.join(sorted(unknown))}")
+        fields.update(opts)
+        return cls(**fields)
+
+
+@dataclass
+class EncodedImage:
+    data: bytes
+    media_type: str
+    width: int
+    height: int
+    encode_ms: float   # 从 figure 绘制完成到得到最终字节的耗时（含栅格化）
+
+
+def image_media_type(data: bytes) -> str:
+    """按文件头识别图片格式（缓存中的图片只存字节）。"""
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/png"
+
+
+def _effective_dpi(fig: "Figure", profile: EncodeProfile) -> float:
+    w_in, h_in = fig.get_size_inches()
+    dpi = float(profile.dpi)
+    if profile.max_width:
+        dpi = min(dpi, profile.max_width / w_in)
+    if profile.max_height:
+        dpi = min(dpi, profile.max_height / h_in)
+    return dpi
+
+
+def apply_fixed_margins(fig: "Figure") -> None:
+    """非 tight 布局：按英寸固定边距，省掉 tight bbox 的额外布局计算。"""
+    w_in, h_in = fig.get_size_inches()
+    fig.subplots_adjust(
+        left=_MARGIN_LEFT_IN / w_in, right=1 - _MARGIN_RIGHT_IN / w_in,
+        top=1 - _MARGIN_TOP_IN / h_in, bottom=_MARGIN_BOTTOM_IN / h_in,
+    )
+
+
+def _png_size(data: bytes) -> tuple[int, int]:
+    return struct.unpack(">II", data[16:24])
+
+
+def encode_figure(fig: "Figure", profile: EncodeProfile) -> EncodedImage:
+    """按 profile 编码已绘制好的 figure（布局边距由调用方按 profile.tight 设置）。"""
+    t0 = time.perf_counter()
+    dpi = _effective_dpi(fig, profile)
+    tight = {"bbox_inches": "tight", "pad_inches": 0.05} if profile.tight else {}
+
+    if profile.format == "png" and profile.target_bytes is None:
+        # 默认路径：matplotlib 直接输出 PNG，不经 PIL 中转
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=dpi, **tight)
+        data = buf.getvalue()
+        w, h = _png_size(data)
+        return EncodedImage(data, profile.media_type, w, h, (time.perf_counter() - t0) * 1000)
+
+    from PIL import Image
+    if profile.tight:
+        # tight bbox 只能经 savefig 计算：先输出不压缩的 PNG 再交给 PIL
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=dpi, pil_kwargs={"compress_level": 0}, **tight)
+        buf.seek(0)
+        image = Image.open(buf)
+        image.load()
+    else:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig.set_dpi(dpi)
+        canvas = FigureCanvasAgg(fig)
+        canvas.draw()
+        image = Image.frombuffer("RGBA", canvas.get_width_height(), canvas.buffer_rgba(), "raw", "RGBA", 0, 1)
+    return _encode_to_target(image, profile, t0)
+
+
+def encode_image(image: "Image", profile: EncodeProfile) -> EncodedImage:
+    """按 profile 编码 PIL 图片（多图拼接降级路径）；只应用尺寸上限，不改 dpi。"""
+    t0 = time.perf_counter()
+    from PIL import Image
+    scale = 1.0
+    if profile.max_width:
+        scale = min(scale, profile.max_width / image.width)
+    if profile.max_height:
+        scale = min(scale, profile.max_height / image.height)
+    if scale < 1.0:
+        image = image.resize((int(image.width * scale), int(image.height * scale)), Image.LANCZOS)
+    return _encode_to_target(image, profile, t0)
+
+
+def _encode_to_target(image: "Image", profile: EncodeProfile, t0: float) -> EncodedImage:
+    from PIL import Image
+    image = image.convert("RGB")
+    quality = profile.quality
+    while True:
+        data = _save(image, profile.format, quality)
+        if profile.target_bytes is None or len(data) <= profile.target_bytes:
+            break
+        if profile.format in _LOSSY and quality > _MIN_QUALITY:
+            quality = max(quality - _QUALITY_STEP, _MIN_QUALITY)
+            continue
+        if image.width * _SHRINK < _MIN_WIDTH:
+            break   # 已缩到下限，按当前结果输出
+        image = image.resize((int(image.width * _SHRINK), int(image.height * _SHRINK)), Image.LANCZOS)
+    return EncodedImage(data, profile.media_type, image.width, image.height, (time.perf_counter() - t0) * 1000)
+
+
+def _save(image: "Image", fmt: str, quality: int) -> bytes:
+    from PIL import Image
+    buf = io.BytesIO()
+    if fmt == "png":
+        image.save(buf, format="PNG")
+    elif fmt == "png_optimized":
+        image.save(buf, format="PNG", optimize=True)
+    elif fmt == "png_palette":
+        # K线图颜色很少：256 色调色板几乎无损，体积约为真彩 PNG 的 1/3
+        image.quantize(256, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE).save(
+            buf, format="PNG", optimize=True,
+        )
+    elif fmt == "jpeg":
+        image.save(buf, format="JPEG", quality=quality, optimize=True)
+    else:
+        image.save(buf, format="WEBP", quality=quality, method=4)
+    return buf.getvalue()
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional, Tuple
+
+import numpy as np
+
+from .indicators import ema
+
+logger = logging.getLogger(__name__)
+
+EMA_PERIODS: Tuple[int, ...] = (21, 55, 100, 200)
+_K = np.array([2.0 / (p + 1) for p in EMA_PERIODS])
+
+# 每个 key 保留最近 N 根已收盘K线的 EMA（≥ 各图表显示根数，覆盖衰竭窗口 2h/3m=40 根）
+_HISTORY = 256
+
+# 建档所需最少已收盘K线数：EMA200 初始化 + 300 根稳定期（与原先画图多拉 500 根一致）
+MIN_SEED_BARS = 500
+
+# Binance 单次 klines 请求上限
+_MAX_WINDOW = 1500
+
+
+def _count_closed(opens: np.ndarray, interval_sec: int, now_ms: float) -> int:
+    """已收盘K线根数（opens 升序，未收盘K线只可能在末尾）。"""
+    return int(np.searchsorted(opens + interval_sec * 1000, now_ms, side="right"))
+
+
+@dataclass
+class _EmaState:
+    last_open_ms: float                     # 最后一根已收盘K线的开盘时间
+    last: np.ndarray                        # 该K线处的 EMA21/55/100/200
+    hist_open: Deque[float] = field(default_factory=lambda: deque(maxlen=_HISTORY))
+    hist: Deque[np.ndarray] = field(default_factory=lambda: deque(maxlen=_HISTORY))
+
+
+class IndicatorStore:
+    """
+    按 (symbol, interval) 保存 EMA21/55/100/200 的最新值及最近 _HISTORY 根的历史。
+
+    首次（或状态断档时）用长窗口K线全量计算并建档；之后每根新收盘K线 O(1) 递推，
+    调用方只需拉取显示长度 + 少量重叠的K线。状态定期写盘，重启后无需重新拉长历史。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self._states: Dict[Tuple[str, str], _EmaState] = {}
+        self.incremental = 0   # 增量递推命中
+        self.seeded = 0        # 全量建档
+        if path:
+            self.load()
+
+    # ── 查询 ────────────────────────────────────────────────
+
+    def window_limit(
+        self, symbol: str, interval: str, display_n: int, interval_sec: int, now_ms: float,
+    ) -> Optional[int]:
+        """
+        已建档时返回增量计算所需的K线根数（显示长度 + 上次更新以来的新K线 + 重叠），
+        未建档 / 显示长度超出历史 / 间隔过久时返回 None（调用方应拉长窗口建档）。
+        """
+        st = self._states.get((symbol, interval))
+        if st is None or np.isnan(st.last).any() or display_n > _HISTORY:
+            return None
+        new_bars = max(int((now_ms - st.last_open_ms) // (interval_sec * 1000)), 0)
+        limit = display_n + new_bars + 2
+        return limit if limit <= _MAX_WINDOW else None
+
+    def try_incremental(
+        self, symbol: str, interval: str, ohlcv: np.ndarray, interval_sec: int, now_ms: float,
+    ) -> Optional[np.ndarray]:
+        """
+        ohlcv 包含已建档的最后一根K线时，只对其后新收盘的K线 O(1) 递推，
+        返回与 ohlcv 行对齐的 EMA 矩阵 [n, 4]（列顺序同 EMA_PERIODS；超出历史的行为 nan）。
+        无重叠时返回 None，调用方应拉长窗口后调用 seed()。
+        """
+        st = self._states.get((symbol, interval))
+        if st is None or np.isnan(st.last).any():
+            return None
+        opens = ohlcv[:, 0]
+        closes = ohlcv[:, 4]
+        n_closed = _count_closed(opens, interval_sec, now_ms)
+        hit = np.flatnonzero(opens[:n_closed] == st.last_open_ms)
+        if not len(hit):
+            return None
+
+        e = st.last
+        for i in range(int(hit[0]) + 1, n_closed):
+            e = _K * closes[i] + (1.0 - _K) * e
+            st.hist_open.append(float(opens[i]))
+            st.hist.append(e)
+        st.last = e
+        st.last_open_ms = float(opens[n_closed - 1])
+        self.incremental += 1
+
+        out = np.full((len(ohlcv), len(EMA_PERIODS)), np.nan)
+        h_open = np.fromiter(st.hist_open, dtype=np.float64, count=len(st.hist_open))
+        h_vals = np.array(st.hist).reshape(-1, len(EMA_PERIODS))
+        idx = np.searchsorted(h_open, opens[:n_closed])
+        ok = (idx < len(h_open)) & (h_open[np.minimum(idx, len(h_open) - 1)] == opens[:n_closed])
+        out[:n_closed][ok] = h_vals[idx[ok]]
+        # 未收盘K线：在最新 EMA 上临时递推，不写入状态
+        for i in range(n_closed, len(ohlcv)):
+            e = _K * closes[i] + (1.0 - _K) * e
+            out[i] = e
+        return out
+
+    def seed(
+        self, symbol: str, interval: str, ohlcv: np.ndarray, interval_sec: int, now_ms: float,
+    ) -> np.ndarray:
+        """按 ohlcv 全量计算 EMA 矩阵；已收盘K线 ≥ MIN_SEED_BARS 时同时（重新）建档。"""
+        emas = np.column_stack([ema(ohlcv[:, 4], p) for p in EMA_PERIODS])
+        n_closed = _count_closed(ohlcv[:, 0], interval_sec, now_ms)
+        if n_closed >= MIN_SEED_BARS:
+            self._seed((symbol, interval), ohlcv[:n_closed, 0], emas[:n_closed])
+        return emas
+
+    def _seed(self, key: Tuple[str, str], opens: np.ndarray, emas: np.ndarray) -> None:
+        st = _EmaState(last_open_ms=float(opens[-1]), last=emas[-1].copy())
+        tail = slice(max(len(opens) - _HISTORY, 0), len(opens))
+        st.hist_open.extend(opens[tail].tolist())
+        st.hist.extend(emas[tail])
+        self._states[key] = st
+        self.seeded += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"keys": len(self._states), "incremental": self.incremental, "seeded": self.seeded}
+
+    # ── 持久化 ──────────────────────────────────────────────
+
+    def save(self) -> None:
+        if not self._path or not self._states:
+            return
+        keys = list(self._states)
+        arrays: Dict[str, np.ndarray] = {}
+        for i, k in enumerate(keys):
+            st = self._states[k]
+            arrays[f"o{i}"] = np.fromiter(st.hist_open, dtype=np.float64, count=len(st.hist_open))
+            arrays[f"v{i}"] = np.array(st.hist).reshape(-1, len(EMA_PERIODS))
+            arrays[f"l{i}"] = np.r_[st.last_open_ms, st.last]
+        os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+        tmp = self._path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, keys=np.array(json.dumps(keys)), **arrays)
+        os.replace(tmp, self._path)
+
+    def load(self) -> None:
+        if not self._path or not os.path.exists(self._path):
+            return
+        try:
+            with np.load(self._path) as data:
+                keys = json.loads(str(data["keys"]))
+                for i, (symbol, interval) in enumerate(keys):
+                    last = data[f"l{i}"]
+                    st = _EmaState(last_open_ms=float(last[0]), last=last[1:].copy())
+                    st.hist_open.extend(data[f"o{i}"].tolist())
+                    st.hist.extend(data[f"v{i}"])
+                    self._states[(symbol, interval)] = st
+            logger.info(f"[Indicators] 已加载 {len(self._states)} 组 EMA 状态: {self._path}")
+        except Exception:
+            logger.warning(f"[Indicators] EMA 状态文件损坏，忽略: {self._path}", exc_info=True)
+            self._states.clear()
+
+    async def run_persist_loop(self, interval_sec: float = 300.0) -> None:
+        """定期写盘；取消时再写一次。"""
+        try:
+            while True:
+                await asyncio.sleep(interval_sec)
+                try:
+                    self.save()
+                except Exception:
+                    logger.warning("[Indicators] EMA 状态写盘失败", exc_info=True)
+        finally:
+            try:
+                self.save()
+            except Exception:
+                logger.warning("[Indicators] EMA 状态写盘失败", exc_info=True)
@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from .ohlcv_archive import OhlcvArchive
+
+logger = logging.getLogger(__name__)
+
+# Binance 单次 klines 请求上限
+_MAX_LIMIT = 1500
+
+# OHLCV 归档中的数据源目录
+_ARCHIVE_SOURCE = "binance"
+
+# 缓存列：open_ms, Open, High, Low, Close, Volume
+OHLCV_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+# Binance klines 每根K线的字段数（open_time … ignore）
+_KLINE_FIELDS = 12
+
+# decode_klines 解析前去掉的字节：数组括号、字符串引号、空白
+_KLINE_STRIP = b'[]" \t\r\n'
+
+# (symbol, interval, limit, start_time_ms) → 已解码的 float64 [n, 6] 或 Binance 原始 K 线列表；失败返回 None
+FetchFn = Callable[[str, str, int, Optional[int]], Awaitable[Optional[Union[np.ndarray, list]]]]
+
+
+def klines_to_array(klines: list) -> np.ndarray:
+    """Binance 原始 K 线 → float64 [n, 6]（open_ms, O, H, L, C, V）。"""
+    return np.asarray([row[:6] for row in klines], dtype=np.float64).reshape(-1, 6)
+
+
+def decode_klines(body: bytes) -> Optional[np.ndarray]:
+    """
+    Binance klines 响应体 → float64 [n, 6]（open_ms, O, H, L, C, V），C 连续。
+
+    不经 json.loads：去掉括号与引号后按逗号切分，由 NumPy 一次转换全部数值，
+    只产生一个 [n, 12] 临时数组，不为每个数值创建 Python float。
+    响应不是K线数组（错误信息等）时返回 None；各行字段数不是 12 或含非数值字段时退回 JSON 解析。
+    """
+    body = body.strip()
+    if not body.startswith(b"["):
+        return None
+    flat = body.translate(None, _KLINE_STRIP)
+    if not flat:
+        return np.empty((0, 6))
+    fields = flat.split(b",")
+    # 字段数须是 12 的整数倍且与行数（'[' 个数减去最外层）相符，否则不是 12 列的K线
+    if len(fields) % _KLINE_FIELDS or len(fields) // _KLINE_FIELDS != body.count(b"[") - 1:
+        return _decode_klines_json(body)
+    try:
+        values = np.array(fields, dtype=np.float64)
+    except ValueError:
+        return _decode_klines_json(body)
+    return np.ascontiguousarray(values.reshape(-1, _KLINE_FIELDS)[:, :6])
+
+
+def _decode_klines_json(body: bytes) -> Optional[np.ndarray]:
+    """decode_klines 的兜底：格式不符合快速路径时按 JSON 解析。"""
+    try:
+        rows = json.loads(body)
+        return klines_to_array(rows) if isinstance(rows, list) else None
+    except ValueError:
+        return None
+
+
+def array_to_df(arr: np.ndarray) -> "pd.DataFrame":
+    """float64 [n, 6] → OHLCV DataFrame（index=Open_time UTC DatetimeIndex，列 Open/High/Low/Close/Volume）。"""
+    import pandas as pd
+    index = pd.to_datetime(arr[:, 0].astype(np.int64), unit="ms", utc=True)
+    index.name = "Open_time"
+    return pd.DataFrame(arr[:, 1:6], index=index, columns=list(OHLCV_COLUMNS))
+
+
+def df_to_array(df: "pd.DataFrame") -> np.ndarray:
+    """OHLCV DataFrame（index=UTC DatetimeIndex）→ float64 [n, 6]，array_to_df 的逆操作。"""
+    out = np.empty((len(df), 6), dtype=np.float64)
+    out[:, 0] = df.index.as_unit("ms").asi8
+    out[:, 1:6] = df[list(OHLCV_COLUMNS)].to_numpy(dtype=np.float64)
+    return out
+
+
+@dataclass
+class _Entry:
+    data: np.ndarray      # float64 [n, 6]，按 open_ms 升序；末行可能是未收盘K线
+    capacity: int         # 最多保留的根数（= 该 key 请求过的最大 limit）
+    exhausted: bool       # 全量拉取时返回根数 < limit：历史已到头（新上市品种）
+    live_until_ms: float  # 在此之前直接返回缓存，不发请求；不晚于末根K线收盘
+    pending: Optional[np.ndarray] = None  # 推流写入、尚未合并的末根K线（与末行同一根或下一根）
+
+
+class KlineCache:
+    """
+    按 (symbol, interval) 缓存 K 线的定长缓冲区（满了丢最旧的），供画图使用。
+
+    - 已收盘K线不会再变，首次全量拉取后只用 startTime 从末根K线起增量拉取；
+    - 末根（未收盘）K线在 live_ttl 秒内视为最新，且有效期不跨越其收盘时间；
+    - 总内存超过 max_bytes 时按 LRU 淘汰；
+    - 可由 K 线推流（apply_bar）持续更新，推流期间无需请求；
+    - 设置 archive 后，拉取结果写入磁盘归档，进程重启后从归档恢复，只需增量拉取。
+    """
+
+    def __init__(self, max_bytes: int, live_ttl: float, fetch: FetchFn, stream_ttl: float = 30.0):
+        self._max_bytes = max_bytes
+        self._live_ttl_ms = live_ttl * 1000
+        self._stream_ttl_ms = stream_ttl * 1000
+        self.archive: Optional["OhlcvArchive"] = None  # lifespan 中注册
+        # 归档写入（阻塞文件 I/O）移出事件循环；单线程保证同一 key 的写入按提交顺序落盘
+        self._archive_writer: Optional[ThreadPoolExecutor] = None
+        self._fetch = fetch
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._row_bytes = 0.0  # Binance 响应中每根K线的 JSON 字节数（实测）
+
+        self.hits = 0          # 完全命中，无请求
+        self.partial = 0       # 增量请求
+        self.misses = 0        # 全量请求
+        self.stale = 0         # 增量请求失败，返回旧数据
+        self.evictions = 0
+        self.bytes_saved = 0.0
+        self.stream_updates = 0  # 推流写入次数
+        self.stream_gaps = 0     # 推流与缓存不连续（需 REST 回补）
+        self.archive_loads = 0   # 从磁盘归档恢复
+
+    async def get(
+        self,
+        symbol: str,
+        interval: str,
+        interval_sec: int,
+        limit: int,
+        now_ms: Optional[float] = None,
+    ) -> Optional[np.ndarray]:
+        """返回最近 limit 根K线（float64 [n, 6]，只读），拉取失败且无缓存时返回 None。"""
+        now_ms = time.time() * 1000 if now_ms is None else now_ms
+        key = (symbol, interval)
+        bar_ms = interval_sec * 1000
+        e = self._entries.get(key)
+        if e is not None and e.pending is not None:
+            e = self._commit(key, e)
+        if e is None:
+            e = self._load_archive(key, limit)
+
+        if e is not None and (len(e.data) >= limit or e.exhausted):
+            self._entries.move_to_end(key)
+            if now_ms < e.live_until_ms:
+                self.hits += 1
+                self.bytes_saved += limit * self._row_bytes
+                return e.data[-limit:]
+
+            last_open = e.data[-1, 0]
+            need = int((now_ms - last_open) // bar_ms) + 1  # 末根 + 之后新增的根数
+            if need < _MAX_LIMIT:
+                new = self._to_array(await self._fetch(symbol, interval, need + 1, int(last_open)))
+                if new is None:
+                    self.stale += 1
+                    logger.info(f"[KlineCache] 增量拉取失败，返回旧数据: {symbol}/{interval}")
+                    return e.data[-limit:]
+                keep = e.data[e.data[:, 0] < new[0, 0]]
+                self._replace(key, _Entry(
+                    data=np.concatenate([keep, new])[-e.capacity:],
+                    capacity=e.capacity,
+                    exhausted=e.exhausted,
+                    live_until_ms=self._live_until(new[-1, 0], bar_ms, now_ms),
+                ))
+                self.partial += 1
+                self.bytes_saved += max(limit - len(new), 0) * self._row_bytes
+                out = self._entries[key].data[-limit:]
+                await self._archive(key, new)
+                return out
+
+        data = self._to_array(await self._fetch(symbol, interval, limit, None))
+        if data is None:
+            return None
+        self._replace(key, _Entry(
+            data=data,
+            capacity=max(limit, e.capacity if e is not None else 0),
+            exhausted=len(data) < limit,
+            live_until_ms=self._live_until(data[-1, 0], bar_ms, now_ms),
+        ))
+        self.misses += 1
+        await self._archive(key, data)
+        return data
+
+    def apply_bar(
+        self, symbol: str, interval: str, interval_sec: int, bar: np.ndarray, now_ms: Optional[float] = None,
+    ) -> bool:
+        """
+        写入推流K线（float64 [6]）。只暂存为 pending，读取时再合并，避免每条消息复制整个缓冲区。
+        无缓存或与缓存末根不连续时返回 False（调用方应经 REST 回补）。
+        """
+        now_ms = time.time() * 1000 if now_ms is None else now_ms
+        key = (symbol, interval)
+        bar_ms = interval_sec * 1000
+        e = self._entries.get(key)
+        if e is None:
+            return False
+        if e.pending is not None and bar[0] > e.pending[0]:
+            e = self._commit(key, e)
+        last_open = e.data[-1, 0]
+        if bar[0] < last_open:
+            return True  # 乱序的旧消息
+        if bar[0] > last_open + bar_ms:
+            self.stream_gaps += 1
+            e.live_until_ms = 0.0
+            return False
+        e.pending = bar
+        e.live_until_ms = self._live_until(bar[0], bar_ms, now_ms, self._stream_ttl_ms)
+        self.stream_updates += 1
+        return True
+
+    def expire(self, keys) -> None:
+        """使给定 (symbol, interval) 的缓存立即过期：下次读取走 REST 增量拉取（推流断开时调用）。"""
+        for key in keys:
+            e = self._entries.get(key)
+            if e is not None:
+                e.live_until_ms = 0.0
+
+    def _commit(self, key: Tuple[str, str], e: _Entry) -> _Entry:
+        """把 pending 合并进缓冲区（生成新数组，已返回给调用方的视图不受影响）。"""
+        bar, e.pending = e.pending, None
+        if bar[0] == e.data[-1, 0]:
+            data = e.data.copy()
+            data[-1] = bar
+        else:
+            data = np.concatenate([e.data, bar[None, :]])[-e.capacity:]
+        self._replace(key, _Entry(
+            data=data, capacity=e.capacity, exhausted=e.exhausted, live_until_ms=e.live_until_ms,
+        ))
+        return self._entries[key]
+
+    def _load_archive(self, key: Tuple[str, str], limit: int) -> Optional[_Entry]:
+        """归档中已有 ≥ limit 根时载入（立即过期，随后走增量拉取）。"""
+        if self.archive is None:
+            return None
+        stored = self.archive.read(_ARCHIVE_SOURCE, key[0], key[1], limit)
+        if stored is None or len(stored) < limit:
+            return None
+        self._replace(key, _Entry(data=np.array(stored), capacity=limit, exhausted=False, live_until_ms=0.0))
+        self.archive_loads += 1
+        return self._entries[key]
+
+    async def _archive(self, key: Tuple[str, str], rows: np.ndarray) -> None:
+        """写入归档（在写入线程中执行，缓存已先行更新）。"""
+        if self.archive is None:
+            return
+        if self._archive_writer is None:
+            self._archive_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kline-archive")
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self._archive_writer, self.archive.append, _ARCHIVE_SOURCE, key[0], key[1], rows,
+            )
+        except OSError:
+            logger.warning(f"[KlineCache] 写入归档失败: {key}", exc_info=True)
+
+    def _live_until(self, last_open_ms: float, bar_ms: int, now_ms: float, ttl_ms: Optional[float] = None) -> float:
+        ttl_ms = self._live_ttl_ms if ttl_ms is None else ttl_ms
+        close_ms = last_open_ms + bar_ms
+        if close_ms <= now_ms:
+            # 末根已收盘（停牌/无成交），只按 live_ttl 控制
+            return now_ms + ttl_ms
+        return min(now_ms + ttl_ms, close_ms)
+
+    def record_response_size(self, nbytes: int, rows: int) -> None:
+        """fetch 直接返回已解码数组时，由其报告响应体大小（用于估算 bytes_saved）。"""
+        if rows:
+            self._row_bytes = nbytes / rows
+
+    def _to_array(self, rows: Optional[Union[np.ndarray, list]]) -> Optional[np.ndarray]:
+        """fetch 结果 → float64 [n, 6]；失败或为空返回 None。原始列表在此解码并实测每根字节数。"""
+        if rows is None or len(rows) == 0:
+            return None
+        if isinstance(rows, np.ndarray):
+            return rows
+        self._row_bytes = float(len(json.dumps(rows[-1], separators=(",", ":"))))
+        return klines_to_array(rows)
+
+    def _replace(self, key: Tuple[str, str], entry: _Entry) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.data.nbytes
+        self._entries[key] = entry
+        self._bytes += entry.data.nbytes
+        # 保留刚写入的 key
+        while self._bytes > self._max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.data.nbytes
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        # 拉取失败后返回旧数据（stale）不算命中，单独计数，也不计入命中率分母
+        total = self.hits + self.partial + self.misses
+        return {
+            "entries": len(self._entries),
+            "mem_bytes": self._bytes,
+            "hits": self.hits,
+            "partial": self.partial,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.partial) / total if total else 0.0,
+            "bytes_saved": int(self.bytes_saved),
+            "stream_updates": self.stream_updates,
+            "stream_gaps": self.stream_gaps,
+            "archive_loads": self.archive_loads,
+        }
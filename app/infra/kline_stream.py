@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .binance_weight import background_priority
+from .kline_cache import KlineCache
+
+logger = logging.getLogger(__name__)
+
+# 重连退避上限（秒）
+_BACKOFF_MAX = 60.0
+
+# 订阅列表（universe 热更新）检查间隔（秒）
+_RESUBSCRIBE_SEC = 300
+
+# REST 回补并发数（启动预热时会集中回补全部订阅）
+_BACKFILL_CONCURRENCY = 2
+
+
+@dataclass(frozen=True)
+class StreamSub:
+    """一路 K 线推流订阅，写入 KlineCache 的 (symbol, interval)。"""
+    symbol: str          # 项目内 symbol（缓存 key）
+    interval: str        # Binance interval（缓存 key）
+    interval_sec: int
+    limit: int           # 回补/预热时缓存保留的根数
+    stream_symbol: str   # Binance 合约 symbol
+
+    @property
+    def stream(self) -> str:
+        return f"{self.stream_symbol.lower()}@kline_{self.interval}"
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return (self.symbol, self.interval)
+
+
+def parse_kline_message(raw: str) -> Optional[Tuple[str, np.ndarray]]:
+    """组合流消息 → (stream 名, float64 [6] open_ms, O, H, L, C, V)；非K线消息返回 None。"""
+    msg = json.loads(raw)
+    data = msg.get("data") or {}
+    k = data.get("k")
+    if not k or "stream" not in msg:
+        return None
+    bar = np.array([k["t"], float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]), float(k["v"])])
+    return msg["stream"], bar
+
+
+class KlineStream:
+    """
+    Binance K 线 websocket 推流（可选）：订阅 universe 中全部加密品种的画图周期，
+    持续写入 KlineCache，出图时无需再请求 REST。
+
+    - 每条连接最多 max_streams 路（组合流），断开后指数退避重连；
+    - 连上后经 REST 回补断开期间缺失的K线（KlineCache 的 startTime 增量拉取），
+      推流与缓存不连续时同样回补；
+    - 断开期间缓存立即过期，读取自动回退到 REST。
+    """
+
+    def __init__(
+        self,
+        url: str,
+        cache: KlineCache,
+        subscriptions: Callable[[], List[StreamSub]],
+        max_streams: int = 200,
+        reconnect_delay: float = 1.0,
+    ):
+        self._url = url
+        self._cache = cache
+        self._subscriptions = subscriptions
+        self._max_streams = max_streams
+        self._reconnect_delay = reconnect_delay
+        self._subs: Dict[str, StreamSub] = {}
+        self._backfills: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._backfill_sem: Optional[asyncio.Semaphore] = None
+
+        self.connected = 0     # 当前已连接的连接数
+        self.messages = 0
+        self.reconnects = 0
+        self.backfilled = 0
+        self.last_message_ts = 0.0
+
+    async def run_forever(self) -> None:
+        try:
+            from websockets.asyncio.client import connect
+        except ImportError:
+            logger.warning("[KlineStream] 未安装 websockets，K线推流未启动（pip install websockets）")
+            return
+
+        self._backfill_sem = asyncio.Semaphore(_BACKFILL_CONCURRENCY)
+        tasks: List[asyncio.Task] = []
+        current: Optional[List[StreamSub]] = None
+        try:
+            while True:
+                subs = sorted(set(self._subscriptions()), key=lambda s: s.stream)
+                if subs != current:
+                    await self._cancel(tasks)
+                    current = subs
+                    self._subs = {s.stream: s for s in subs}
+                    chunks = [subs[i:i + self._max_streams] for i in range(0, len(subs), self._max_streams)]
+                    tasks = [asyncio.create_task(self._run_connection(connect, c)) for c in chunks]
+                    logger.info(f"[KlineStream] 订阅 {len(subs)} 路K线，{len(chunks)} 条连接")
+                await asyncio.sleep(_RESUBSCRIBE_SEC)
+        finally:
+            await self._cancel(tasks + list(self._backfills.values()))
+
+    async def _run_connection(self, connect: Any, chunk: List[StreamSub]) -> None:
+        url = f"{self._url}?streams=" + "/".join(s.stream for s in chunk)
+        delay = self._reconnect_delay
+        while True:
+            opened = False
+            try:
+                async with connect(url, open_timeout=10, ping_interval=20) as ws:
+                    opened = True
+                    self.connected += 1
+                    delay = self._reconnect_delay
+                    for sub in chunk:
+                        self._schedule_backfill(sub)
+                    async for raw in ws:
+                        self._on_message(raw)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[KlineStream] 连接断开: {type(e).__name__}: {e}")
+            finally:
+                if opened:
+                    self.connected -= 1
+                # 推流中断：缓存立即过期，读取回退 REST
+                self._cache.expire([s.key for s in chunk])
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _BACKOFF_MAX)
+
+    def _on_message(self, raw: str) -> None:
+        try:
+            parsed = parse_kline_message(raw)
+        except (ValueError, KeyError, TypeError):
+            logger.debug(f"[KlineStream] 无法解析的消息: {raw[:200]}")
+            return
+        if parsed is None:
+            return
+        stream, bar = parsed
+        sub = self._subs.get(stream)
+        if sub is None:
+            return
+        self.messages += 1
+        self.last_message_ts = time.time()
+        if not self._cache.apply_bar(sub.symbol, sub.interval, sub.interval_sec, bar):
+            self._schedule_backfill(sub)
+
+    def _schedule_backfill(self, sub: StreamSub) -> None:
+        if sub.key in self._backfills:
+            return
+        task = asyncio.create_task(self._backfill(sub))
+        self._backfills[sub.key] = task
+        task.add_done_callback(lambda _: self._backfills.pop(sub.key, None))
+
+    async def _backfill(self, sub: StreamSub) -> None:
+        """经 REST 补齐缺失K线：已有缓存时从末根增量拉取，无缓存时全量预热。"""
+        async with self._backfill_sem:
+            self._cache.expire([sub.key])
+            try:
+                with background_priority():
+                    await self._cache.get(sub.symbol, sub.interval, sub.interval_sec, sub.limit)
+                self.backfilled += 1
+            except Exception:
+                logger.warning(f"[KlineStream] 回补失败: {sub.symbol}/{sub.interval}", exc_info=True)
+
+    @staticmethod
+    async def _cancel(tasks: List[asyncio.Task]) -> None:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "streams": len(self._subs),
+            "connected": self.connected,
+            "messages": self.messages,
+            "reconnects": self.reconnects,
+            "backfilled": self.backfilled,
+            "last_message_age_s": time.time() - self.last_message_ts if self.last_message_ts else None,
+        }
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..domain.models import LevelState, Side
+
+# side 轴顺序
+SIDES: Tuple[Side, Side] = (Side.OVERSOLD, Side.OVERBOUGHT)
+
+# 状态编码（int8）
+OUT, WARM, IN = 0, 1, 2
+LEVEL_OF_CODE: Dict[int, LevelState] = {OUT: LevelState.OUT, WARM: LevelState.WARM, IN: LevelState.IN}
+
+
+@dataclass
+class MatrixSnapshot:
+    """某一时刻 symbols × intervals × side 的 IN/WARM/OUT 矩阵（只读）。"""
+    ts: float
+    symbols: List[str]
+    intervals: List[str]
+    states: np.ndarray   # int8 [S, I, 2]，编码见 OUT/WARM/IN
+    values: np.ndarray   # float64 [S, I]，无数据为 nan
+    allowed: Optional[np.ndarray] = None   # bool [S, I]，各 symbol 在 universe 中跟踪的周期；None 为全部
+
+    def __post_init__(self) -> None:
+        self._col = {iv: i for i, iv in enumerate(self.intervals)}
+        self._row = {s: i for i, s in enumerate(self.symbols)}
+
+    def col(self, interval: str) -> Optional[int]:
+        return self._col.get(interval)
+
+    def state_of(self, symbol: str, interval: str, side: Side) -> LevelState:
+        c = self._col.get(interval)
+        r = self._row.get(symbol)
+        if c is None or r is None:
+            return LevelState.OUT
+        return LEVEL_OF_CODE[int(self.states[r, c, SIDES.index(side)])]
+
+    def symbols_at(self, interval: str, side: Side, level: int = IN) -> List[str]:
+        """某周期某方向处于给定状态（默认 IN）的全部 symbol，保持 symbols 原顺序。"""
+        c = self._col.get(interval)
+        if c is None:
+            return []
+        hit = self.states[:, c, SIDES.index(side)] == level
+        return [self.symbols[i] for i in np.flatnonzero(hit)]
+
+    def masks(self, side: Side) -> Tuple[np.ndarray, np.ndarray]:
+        """每个 symbol 的 (IN/WARM 位图, IN 位图)，bit 序号 = intervals 下标。"""
+        st = self.states[:, :, SIDES.index(side)]
+        weights = np.left_shift(np.int64(1), np.arange(len(self.intervals), dtype=np.int64))
+        active = ((st != OUT) * weights).sum(axis=1)
+        in_only = ((st == IN) * weights).sum(axis=1)
+        return active, in_only
+
+    def tracked_mask(self) -> np.ndarray:
+        """每个 symbol 跟踪的周期位图（bit 序号 = intervals 下标）。"""
+        weights = np.left_shift(np.int64(1), np.arange(len(self.intervals), dtype=np.int64))
+        if self.allowed is None:
+            return np.full(len(self.symbols), weights.sum(), dtype=np.int64)
+        return (self.allowed * weights).sum(axis=1)
+
+    def mask_of(self, intervals: Iterable[str]) -> int:
+        m = 0
+        for iv in intervals:
+            c = self._col.get(iv)
+            if c is None:
+                return -1  # 含矩阵未跟踪的周期，永远不可能满足
+            m |= 1 << c
+        return m
+
+    def combo_hits(self, combos: Sequence[Tuple[str, ...]], side: Side) -> Dict[Tuple[str, ...], List[str]]:
+        """一次性对全部 symbol 判定每个组合，返回 combo → 当前满足（全部 IN/WARM）的 symbol。"""
+        active, _ = self.masks(side)
+        out: Dict[Tuple[str, ...], List[str]] = {}
+        for combo in combos:
+            m = self.mask_of(combo)
+            if m < 0:
+                out[combo] = []
+                continue
+            hit = np.bitwise_and(active, m) == m
+            out[combo] = [self.symbols[i] for i in np.flatnonzero(hit)]
+        return out
+
+
+class ObosMatrix:
+    """
+    全量 ob/os 状态的 NumPy 镜像，由 AppState 在更新 cache 时同步写入。
+
+    原始数据（最新值 / 是否 IN / 最近退出时间）按 symbol 行、interval 列存储；
+    IN/WARM/OUT 的判定在 snapshot() 时对整个矩阵向量化计算，与 AppState.is_warm 口径一致。
+    """
+
+    def __init__(
+        self,
+        intervals: Sequence[str],
+        warm_k_map: Dict[str, int],
+        interval_seconds: Dict[str, int],
+        capacity: int = 64,
+    ):
+        self.intervals: List[str] = list(intervals)
+        self._col: Dict[str, int] = {iv: i for i, iv in enumerate(self.intervals)}
+        self._row: Dict[str, int] = {}
+        self.symbols: List[str] = []
+
+        n = len(self.intervals)
+        # warm 窗口秒数；未配置周期秒数的列为 nan（永远不会 WARM）
+        self._warm_sec = np.array(
+            [warm_k_map.get(iv, 2) * interval_seconds[iv] if iv in interval_seconds else np.nan
+             for iv in self.intervals],
+            dtype=np.float64,
+        )
+        self._value = np.full((capacity, n), np.nan)
+        self._in = np.zeros((capacity, n, 2), dtype=bool)
+        self._exit = np.full((capacity, n, 2), np.nan)
+
+    def _ensure_row(self, symbol: str) -> int:
+        r = self._row.get(symbol)
+        if r is not None:
+            return r
+        r = len(self.symbols)
+        if r >= self._value.shape[0]:
+            grow = self._value.shape[0]
+            self._value = np.concatenate([self._value, np.full((grow, len(self.intervals)), np.nan)])
+            self._in = np.concatenate([self._in, np.zeros((grow, len(self.intervals), 2), dtype=bool)])
+            self._exit = np.concatenate([self._exit, np.full((grow, len(self.intervals), 2), np.nan)])
+        self._row[symbol] = r
+        self.symbols.append(symbol)
+        return r
+
+    def set_cell(
+        self,
+        symbol: str,
+        interval: str,
+        value: float,
+        in_oversold: bool,
+        in_overbought: bool,
+        last_exit_ts_oversold: Optional[float],
+        last_exit_ts_overbought: Optional[float],
+    ) -> None:
+        c = self._col.get(interval)
+        if c is None:
+            return
+        r = self._ensure_row(symbol)
+        self._value[r, c] = value
+        self._in[r, c, 0] = in_oversold
+        self._in[r, c, 1] = in_overbought
+        self._exit[r, c, 0] = np.nan if last_exit_ts_oversold is None else last_exit_ts_oversold
+        self._exit[r, c, 1] = np.nan if last_exit_ts_overbought is None else last_exit_ts_overbought
+
+    def snapshot(
+        self,
+        now_ts: float,
+        universe: Optional[Dict[str, List[str]]] = None,
+    ) -> MatrixSnapshot:
+        """
+        向量化计算 IN/WARM/OUT。
+        传入 universe 时行 = universe 中的 symbol（排序），且只保留各 symbol 允许的周期，其余记为 OUT。
+        """
+        n_rows = len(self.symbols)
+        value = self._value[:n_rows]
+        is_in = self._in[:n_rows]
+        with np.errstate(invalid="ignore"):
+            is_warm = ~is_in & ((now_ts - self._exit[:n_rows]) < self._warm_sec[None, :, None])
+        states = np.where(is_in, IN, np.where(is_warm, WARM, OUT)).astype(np.int8)
+
+        if universe is None:
+            return MatrixSnapshot(
+                ts=now_ts, symbols=list(self.symbols), intervals=list(self.intervals),
+                states=states, values=value.copy(),
+            )
+
+        symbols = sorted(universe)
+        # 未出现过的 symbol 指向末尾追加的空行（全 OUT / nan）
+        rows = np.array([self._row.get(s, n_rows) for s in symbols], dtype=np.intp)
+        pad_states = np.concatenate([states, np.zeros((1, len(self.intervals), 2), dtype=np.int8)])
+        pad_values = np.concatenate([value, np.full((1, len(self.intervals)), np.nan)])
+        allowed = np.zeros((len(symbols), len(self.intervals)), dtype=bool)
+        for i, s in enumerate(symbols):
+            for iv in universe[s]:
+                c = self._col.get(iv)
+                if c is not None:
+                    allowed[i, c] = True
+
+        out_states = np.where(allowed[:, :, None], pad_states[rows], OUT).astype(np.int8)
+        out_values = np.where(allowed, pad_values[rows], np.nan)
+        return MatrixSnapshot(
+            ts=now_ts, symbols=symbols, intervals=list(self.intervals),
+            states=out_states, values=out_values, allowed=allowed,
+        )
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import quote
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 每行 open_ms, O, H, L, C, V 共 6 个 float64
+_ROW_BYTES = 6 * 8
+
+
+def resample_ohlcv(arr: np.ndarray, bucket_ms: int) -> np.ndarray:
+    """
+    按 UTC 对齐的 bucket_ms 聚合 OHLCV（float64 [n, 6]，open_ms 升序），只输出有数据的桶。
+    与 DataFrame.resample(...).agg(first/max/min/last/sum).dropna() 结果一致。
+    """
+    if not len(arr):
+        return arr
+    keys = arr[:, 0] // bucket_ms * bucket_ms
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(arr)] - 1
+    return np.column_stack([
+        keys[starts],
+        arr[starts, 1],
+        np.maximum.reduceat(arr[:, 2], starts),
+        np.minimum.reduceat(arr[:, 3], starts),
+        arr[ends, 4],
+        np.add.reduceat(arr[:, 5], starts),
+    ])
+
+
+class OhlcvArchive:
+    """
+    磁盘 OHLCV 归档：每个 (source, symbol, interval) 一个 float64 [n, 6] 原始文件
+    （{root}/{source}/{interval}/{symbol}.f64，按 open_ms 升序），读取经 np.memmap 零拷贝映射。
+
+    - 写入总是合并后写临时文件再原子替换（新数据与已有K线重叠的部分以新数据为准）：
+      read() 返回的映射指向替换前的旧文件，调用方持有的数组不会被之后的写入改变；
+    - 文件 mtime 即最近一次成功拉取的时间，供调用方判断是否需要增量下载。
+    """
+
+    def __init__(self, root: str):
+        self._root = root
+        self._lock = threading.Lock()   # yfinance 在线程池中写入
+        self.reads = 0
+        self.appends = 0
+        self.rewrites = 0
+        self.rows_written = 0
+
+    def _path(self, source: str, symbol: str, interval: str) -> str:
+        return os.path.join(self._root, source, interval, quote(symbol, safe="") + ".f64")
+
+    def read(self, source: str, symbol: str, interval: str, limit: Optional[int] = None) -> Optional[np.ndarray]:
+        """返回最近 limit 根（只读 memmap 视图），无归档时返回 None。"""
+        path = self._path(source, symbol, interval)
+        try:
+            n = os.path.getsize(path) // _ROW_BYTES
+        except OSError:
+            return None
+        if n == 0:
+            return None
+        self.reads += 1
+        mm = np.memmap(path, dtype=np.float64, mode="r", shape=(n, 6))
+        # 普通 ndarray 视图（仍引用映射），可照常 pickle 给渲染进程
+        return (mm[-limit:] if limit else mm).view(np.ndarray)
+
+    def age(self, source: str, symbol: str, interval: str) -> Optional[float]:
+        """距最近一次写入/touch 的秒数；无归档时返回 None。"""
+        try:
+            return time.time() - os.path.getmtime(self._path(source, symbol, interval))
+        except OSError:
+            return None
+
+    def touch(self, source: str, symbol: str, interval: str) -> None:
+        """拉取成功但无新K线时刷新 mtime。"""
+        try:
+            os.utime(self._path(source, symbol, interval))
+        except OSError:
+            pass
+
+    def append(self, source: str, symbol: str, interval: str, rows: np.ndarray) -> None:
+        """写入新拉取的K线（float64 [n, 6]，升序）；与已有K线重叠的部分以新数据为准。阻塞 I/O，勿在事件循环中调用。"""
+        if not len(rows):
+            return
+        rows = np.ascontiguousarray(rows, dtype=np.float64)
+        path = self._path(source, symbol, interval)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                n = os.path.getsize(path) // _ROW_BYTES
+            except OSError:
+                n = 0
+            old = np.fromfile(path, dtype=np.float64, count=n * 6).reshape(n, 6) if n else np.empty((0, 6))
+            merged = np.concatenate([
+                old[old[:, 0] < rows[0, 0]], rows, old[old[:, 0] > rows[-1, 0]],
+            ])
+            tmp = path + ".tmp"
+            merged.tofile(tmp)
+            os.replace(tmp, path)
+            if n and rows[0, 0] < old[-1, 0]:
+                self.rewrites += 1   # 回补更早的K线
+            else:
+                self.appends += 1
+            self.rows_written += len(rows)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "reads": self.reads,
+            "appends": self.appends,
+            "rewrites": self.rewrites,
+            "rows_written": self.rows_written,
+        }
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+
+@dataclass(frozen=True)
+class QualityStep:
+    name: str
+    max_panels: Optional[int]   # None = 全部子图；0 = 不出图
+    dpi_scale: float = 1.0
+
+
+# 负载越高越往下：全部子图 → 减少子图 → 降低 dpi → 单个子图 → 只发文字
+QUALITY_LADDER: tuple[QualityStep, ...] = (
+    QualityStep("full", None),
+    QualityStep("fewer_panels", 2),
+    QualityStep("low_dpi", 2, 0.67),
+    QualityStep("single_panel", 1, 0.67),
+    QualityStep("text", 0),
+)
+
+# 单靠渲染耗时最多降到单个子图：只发文字时不再产生耗时样本，需保留出图才能观察到负载回落
+_MAX_LATENCY_LEVEL = len(QUALITY_LADDER) - 2
+
+
+def choose_quality_level(depth: int, capacity: int, recent_ms: float, latency_ms: Sequence[float]) -> int:
+    """
+    按当前出图排队数与最近出图耗时选择档位（QUALITY_LADDER 下标）：
+
+    - 排队：排队数不超过并发上限时为满画质，之后每超过一倍（capacity、2×、4×…）降一档；
+    - 耗时：recent_ms（纯渲染耗时）每超过 latency_ms 中的一个阈值降一档（最多到单个子图）；
+    取两者中较低的画质。负载回落后下一次推送即恢复。
+    """
+    by_queue = 0
+    bound = max(capacity, 1)
+    while depth > bound and by_queue < len(QUALITY_LADDER) - 1:
+        by_queue += 1
+        bound *= 2
+    by_latency = min(sum(1 for t in latency_ms if recent_ms > t), _MAX_LATENCY_LEVEL)
+    return max(by_queue, by_latency)
+
+
+def reduce_panels(intervals: list[str], max_iv: str, n: Optional[int]) -> list[str]:
+    """
+    保留 n 个子图（周期从大到小）：优先保留推送周期 max_iv 及其上方的较大周期，
+    max_iv 不在其中时保留最大的 n 个。
+    """
+    if n is None or len(intervals) <= n:
+        return list(intervals)
+    if max_iv not in intervals:
+        return list(intervals[:n])
+    idx = intervals.index(max_iv)
+    start = max(idx - n + 1, 0)
+    return list(intervals[start:start + n])
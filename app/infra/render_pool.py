@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .image_encoding import EncodedImage, EncodeProfile
+
+logger = logging.getLogger(__name__)
+
+# 渲染耗时统计窗口（最近 N 个任务）
+_TIMING_WINDOW = 512
+
+# recent_render_ms 只看最近这么多个任务
+_RECENT_JOBS = 16
+
+
+@dataclass
+class PanelJob:
+    """单个子图：OHLCV 以 float64 [n, 6] 数组传给 worker（open_ms, O, H, L, C, V）。"""
+    symbol: str
+    label: str
+    ohlcv: np.ndarray
+    display_n: Optional[int] = None
+    chart_title: Optional[str] = None
+    interval: str = ""
+    emas: Optional[np.ndarray] = None   # 与 ohlcv 行对齐的 EMA21/55/100/200 [n, 4]
+
+
+@dataclass
+class RenderJob:
+    panels: List[PanelJob]
+    zone_bot: Optional[float] = None
+    zone_top: Optional[float] = None
+    zone_role: Optional[str] = None
+    price_level: Optional[float] = None
+    price_label: Optional[str] = None
+    encode: EncodeProfile = field(default_factory=EncodeProfile)
+
+
+def run_render_job(job: RenderJob) -> Optional[EncodedImage]:
+    """
+    全部子图画在同一个 figure 中，按 job.encode 只编码一次。
+    失败时降级为逐个子图出图（无损 PNG）再拼接编码：单个子图失败时跳过该子图，全部失败返回 None。
+    """
+    from .chart import _draw_chart, _render_figure, _vstack_images
+    from .image_encoding import encode_image
+    from .kline_cache import array_to_df
+
+    overlays = dict(
+        zone_bot=job.zone_bot, zone_top=job.zone_top, zone_role=job.zone_role,
+        price_level=job.price_level, price_label=job.price_label,
+    )
+    try:
+        return _render_figure(
+            [
+                (p.chart_title or f"{p.symbol}  {p.label}", array_to_df(p.ohlcv), p.display_n, p.emas)
+                for p in job.panels
+            ],
+            profile=job.encode,
+            **overlays,
+        )
+    except Exception:
+        if len(job.panels) == 1:
+            logger.warning(f"[Chart] 绘图失败: {job.panels[0].symbol}/{job.panels[0].label}", exc_info=True)
+            return None
+        logger.warning(f"[Chart] 单图多子图渲染失败，逐个子图重试: {job.panels[0].symbol}", exc_info=True)
+
+    # 中间图统一无损 PNG，拼接后再按 job.encode 编码一次
+    lossless = EncodeProfile(dpi=job.encode.dpi, tight=job.encode.tight)
+    pngs: List[bytes] = []
+    for p in job.panels:
+        try:
+            pngs.append(_draw_chart(
+                p.symbol, p.label, array_to_df(p.ohlcv),
+                display_n=p.display_n, chart_title=p.chart_title, profile=lossless, emas=p.emas, **overlays,
+            ))
+        except Exception:
+            logger.warning(f"[Chart] 绘图失败: {p.symbol}/{p.label}", exc_info=True)
+    if not pngs:
+        return None
+    try:
+        return encode_image(_vstack_images(pngs), job.encode)
+    except Exception:
+        logger.warning(f"[Chart] 多图合并失败: {job.panels[0].symbol}", exc_info=True)
+        return encode_image(_vstack_images(pngs[:1]), EncodeProfile())
+
+
+def _worker_init() -> None:
+    """worker 启动时预加载 matplotlib / mplfinance 并注册 CJK 字体，首个任务无需再付出导入开销。"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot  # noqa: F401
+    import mplfinance  # noqa: F401
+    from .chart import _ensure_cjk_font
+    _ensure_cjk_font()
+
+
+def _worker_ready() -> bool:
+    return True
+
+
+def _timed_render(job: RenderJob) -> Tuple[Optional[EncodedImage], float, float]:
+    """worker 内执行：返回 (图片, 开始时间戳, 渲染毫秒)。"""
+    started = time.time()
+    t0 = time.perf_counter()
+    image = run_render_job(job)
+    return image, started, (time.perf_counter() - t0) * 1000
+
+
+def _pct(values: List[float], p: float) -> float:
+    return values[min(int(len(values) * p), len(values) - 1)] if values else 0.0
+
+
+class RenderPool:
+    """
+    图表渲染进程池：matplotlib 渲染 + 图片编码移出事件循环，
+    避免多图推送期间阻塞 webhook / Telegram 轮询 / 各后台循环。
+    """
+
+    def __init__(self, workers: int):
+        self._workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.depth = 0          # 已提交未完成的任务数
+        self.max_depth = 0
+        self.jobs = 0
+        self.failures = 0
+        self._render_ms: Deque[float] = deque(maxlen=_TIMING_WINDOW)
+        self._recent: Deque[Tuple[float, float]] = deque(maxlen=_RECENT_JOBS)   # (完成时刻, 渲染毫秒)
+        self._wait_ms: Deque[float] = deque(maxlen=_TIMING_WINDOW)
+        self._encode_ms: Deque[float] = deque(maxlen=_TIMING_WINDOW)
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn：不继承父进程的事件循环/线程状态
+        return ProcessPoolExecutor(
+            max_workers=self._workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_worker_init,
+        )
+
+    async def start(self) -> None:
+        """创建进程池并等待全部 worker 完成预热。"""
+        self._executor = self._new_executor()
+        loop = asyncio.get_running_loop()
+        t0 = time.perf_counter()
+        await asyncio.gather(*[
+            loop.run_in_executor(self._executor, _worker_ready) for _ in range(self._workers)
+        ])
+        logger.info(f"[RenderPool] {self._workers} 个渲染进程已就绪（{time.perf_counter() - t0:.1f}s）")
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def render(self, job: RenderJob) -> Optional[EncodedImage]:
+        if self._executor is None:
+            raise RuntimeError("RenderPool 未启动")
+        loop = asyncio.get_running_loop()
+        submitted = time.time()
+        executor = self._executor
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+        try:
+            image, started, render_ms = await loop.run_in_executor(executor, _timed_render, job)
+        except BrokenProcessPool:
+            # worker 异常退出：重建进程池，本次任务由调用方降级处理。
+            # 同一次损坏会让全部在途任务都收到 BrokenProcessPool：只有第一个重建，
+            # 之后的不能关闭已重建的新进程池（会取消其中已提交的任务）
+            self.failures += 1
+            if self._executor is executor:
+                logger.warning("[RenderPool] 进程池损坏，重建", exc_info=True)
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._new_executor()
+            raise
+        finally:
+            self.depth -= 1
+        self.jobs += 1
+        self._render_ms.append(render_ms)
+        self._recent.append((time.monotonic(), render_ms))
+        self._wait_ms.append(max(started - submitted, 0.0) * 1000)
+        if image is not None:
+            self._encode_ms.append(image.encode_ms)
+        return image
+
+    def recent_render_ms(self, window_sec: float) -> float:
+        """最近 window_sec 秒内完成的渲染耗时中位数（不含排队与K线拉取，最多看最近 _RECENT_JOBS 个）；无样本返回 0。"""
+        cutoff = time.monotonic() - window_sec
+        recent = sorted(ms for ts, ms in self._recent if ts >= cutoff)
+        return recent[len(recent) // 2] if recent else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        render = sorted(self._render_ms)
+        wait = sorted(self._wait_ms)
+        encode = sorted(self._encode_ms)
+        return {
+            "workers": self._workers,
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "jobs": self.jobs,
+            "failures": self.failures,
+            "render_p50_ms": _pct(render, 0.50),
+            "render_p95_ms": _pct(render, 0.95),
+            "wait_p50_ms": _pct(wait, 0.50),
+            "wait_p95_ms": _pct(wait, 0.95),
+            "encode_p50_ms": _pct(encode, 0.50),
+            "encode_p95_ms": _pct(encode, 0.95),
+        }
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 耗时统计窗口（最近 N 个任务）
+_TIMING_WINDOW = 512
+
+
+class RenderDeadlineMissed(Exception):
+    """出图任务在截止时间前未能开始（调用方改发纯文字）。"""
+
+
+def _pct(values: List[float], p: float) -> float:
+    return values[min(int(len(values) * p), len(values) - 1)] if values else 0.0
+
+
+class RenderScheduler:
+    """
+    推送出图（拉取K线 + 渲染）的准入调度：
+
+    - 同时最多 max_concurrent 个出图任务，突发推送时 DataFrame / figure 的内存占用有上限；
+    - 其余任务按 priority（越小越先）排队，同优先级先进先出；
+    - 每个任务带开始截止时间：排队超过 deadline 仍未开始的任务放弃（RenderDeadlineMissed）。
+    """
+
+    def __init__(self, max_concurrent: int):
+        self._max_concurrent = max_concurrent
+        self._running = 0
+        self._heap: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+        self.max_depth = 0
+        self.jobs = 0
+        self.dropped = 0
+        self.dropped_by_priority: Dict[int, int] = {}
+        self._wait_ms: Deque[float] = deque(maxlen=_TIMING_WINDOW)
+        self._run_ms: Deque[float] = deque(maxlen=_TIMING_WINDOW)
+
+    @property
+    def depth(self) -> int:
+        """排队中（未开始）的任务数。"""
+        return sum(1 for _, _, fut in self._heap if not fut.done())
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def capacity(self) -> int:
+        return self._max_concurrent
+
+    async def run(self, priority: int, deadline_sec: float, job: Callable[[], Awaitable[T]]) -> T:
+        """等待空位（最多 deadline_sec 秒）后执行 job()；未能按时开始时抛出 RenderDeadlineMissed。"""
+        t0 = time.monotonic()
+        await self._acquire(priority, deadline_sec)
+        self._wait_ms.append((time.monotonic() - t0) * 1000)
+        t1 = time.monotonic()
+        try:
+            return await job()
+        finally:
+            self._run_ms.append((time.monotonic() - t1) * 1000)
+            self.jobs += 1
+            self._release()
+
+    async def _acquire(self, priority: int, deadline_sec: float) -> None:
+        if self._running < self._max_concurrent and not self.depth:
+            self._running += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), fut))
+        self.max_depth = max(self.max_depth, self.depth)
+        try:
+            await asyncio.wait_for(fut, timeout=max(deadline_sec, 0.0))
+        except asyncio.TimeoutError:
+            self.dropped += 1
+            self.dropped_by_priority[priority] = self.dropped_by_priority.get(priority, 0) + 1
+            raise RenderDeadlineMissed(f"排队 {deadline_sec:.0f}s 未开始") from None
+        except asyncio.CancelledError:
+            # 名额已转交给本任务后才被取消：归还
+            if fut.done() and not fut.cancelled():
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        # 名额直接转交给优先级最高的等待者（_running 不变）
+        while self._heap:
+            _, _, fut = heapq.heappop(self._heap)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._running -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        wait = sorted(self._wait_ms)
+        run = sorted(self._run_ms)
+        return {
+            "max_concurrent": self._max_concurrent,
+            "running": self._running,
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "jobs": self.jobs,
+            "dropped": self.dropped,
+            "dropped_by_priority": dict(self.dropped_by_priority),
+            "wait_p50_ms": _pct(wait, 0.50),
+            "wait_p95_ms": _pct(wait, 0.95),
+            "run_p50_ms": _pct(run, 0.50),
+            "run_p95_ms": _pct(run, 0.95),
+        }
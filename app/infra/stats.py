@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from collections import defaultdict
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from typing import Dict, Optional
 
 
@@ -14,12 +14,32 @@ class TokenStats:
     cache_read_tokens: int = 0
 
 
+@dataclass
+class ChartCacheStats:
+    hits: int = 0
+    misses: int = 0
+
+
+@dataclass
+class ChartEncodeStats:
+    renders: int = 0
+    encode_ms_total: float = 0.0
+    encode_ms_max: float = 0.0
+    encoded_bytes: int = 0
+    uploads: int = 0
+    upload_bytes: int = 0
+    upload_bytes_max: int = 0
+
+
 class MessageStats:
     """每日消息发送量与 Claude 用量统计，asyncio 单线程环境下安全。"""
 
     def __init__(self) -> None:
         self._counts: Dict[Optional[int], int] = defaultdict(int)
         self._tokens: TokenStats = TokenStats()
+        self._chart_cache: ChartCacheStats = ChartCacheStats()
+        self._chart_encode: ChartEncodeStats = ChartEncodeStats()
+        self._chart_quality: Dict[str, int] = defaultdict(int)
 
     def record(self, topic_id: Optional[int]) -> None:
         self._counts[topic_id] += 1
@@ -37,6 +57,37 @@ class MessageStats:
         self._tokens.cache_creation_tokens += cache_creation
         self._tokens.cache_read_tokens += cache_read
 
+    def record_chart_cache(self, hit: bool) -> None:
+        if hit:
+            self._chart_cache.hits += 1
+        else:
+            self._chart_cache.misses += 1
+
+    def record_chart_encode(self, encode_ms: float, size: int) -> None:
+        e = self._chart_encode
+        e.renders += 1
+        e.encode_ms_total += encode_ms
+        e.encode_ms_max = max(e.encode_ms_max, encode_ms)
+        e.encoded_bytes += size
+
+    def record_chart_upload(self, size: int) -> None:
+        e = self._chart_encode
+        e.uploads += 1
+        e.upload_bytes += size
+        e.upload_bytes_max = max(e.upload_bytes_max, size)
+
+    def record_chart_quality(self, level: str) -> None:
+        self._chart_quality[level] += 1
+
+    def get_chart_quality_stats(self) -> Dict[str, int]:
+        return dict(self._chart_quality)
+
+    def get_chart_encode_stats(self) -> ChartEncodeStats:
+        return replace(self._chart_encode)
+
+    def get_chart_cache_stats(self) -> ChartCacheStats:
+        return ChartCacheStats(hits=self._chart_cache.hits, misses=self._chart_cache.misses)
+
     def get_current(self) -> Dict[Optional[int], int]:
         return dict(self._counts)
 
@@ -63,4 +114,7 @@ class MessageStats:
         tokens = self.get_token_stats()
         self._counts.clear()
         self._tokens = TokenStats()
+        self._chart_cache = ChartCacheStats()
+        self._chart_encode = ChartEncodeStats()
+        self._chart_quality.clear()
         return counts, tokens
@@ -6,7 +6,8 @@ from dataclasses import dataclass
 from typing import Any, Dict, Tuple, List, Optional
 from collections import defaultdict
 from ..config import settings
-from ..domain.models import Side, TrackingWindow
+from ..domain.models import Side, TrackingWindow, Transition, IntervalTransition
+from .obos_matrix import ObosMatrix
 
 import logging
 logger = logging.getLogger(__name__)
@@ -26,6 +27,14 @@ class IntervalCache:
     last_exit_ts_overbought: Optional[float] = None  # 最近一次离开超买的时间
 
 
+def _transition(was_in: bool, is_in: bool) -> Transition:
+    if is_in and not was_in:
+        return Transition.ENTER_IN
+    if was_in and not is_in:
+        return Transition.EXIT_WARM
+    return Transition.NONE
+
+
 # =========================
 # 推送门控记录
 # =========================
@@ -35,6 +44,15 @@ class GateRecord:
     last_sent_ts: float = 0.0
 
 
+# =========================
+# 共振评估记录（transition-only 评估用）
+# =========================
+@dataclass
+class ResonanceEvalRecord:
+    allowed: Tuple[str, ...]                # 上次评估时的 universe 周期列表
+    next_warm_expiry: Optional[float] = None  # 上次评估时最早到期的 WARM 周期的到期时间
+
+
 # =========================
 # AppState 主体
 # =========================
@@ -65,6 +83,14 @@ class AppState:
 
 
         self.cache: Dict[Tuple[str, str], IntervalCache] = {}
+        # cache 的 NumPy 镜像（symbols × intervals × side），供全量扫描/组合查询向量化使用
+        self.obos_matrix = ObosMatrix(
+            intervals=list(settings.INTERVAL_ORDER) + [
+                iv for iv in interval_seconds if iv not in settings.INTERVAL_ORDER
+            ],
+            warm_k_map=warm_k_map,
+            interval_seconds=interval_seconds,
+        )
         self.gate: Dict[Tuple[str, str], GateRecord] = {}
 
         self.latest_combo_state: Dict[
@@ -111,6 +137,10 @@ class AppState:
         # 调度器去重：记录每个 (symbol, interval) 最近一次已处理的 bar close 时间戳
         self.last_checked_bar: Dict[Tuple[str, str], float] = {}
 
+        # 共振评估门控：key=(symbol, side)，仅在 IN/WARM 成员变化或 warm 到期时重新评估
+        self.resonance_eval: Dict[Tuple[str, Side], ResonanceEvalRecord] = {}
+        self.resonance_eval_counts: Dict[str, int] = {"evaluated": 0, "skipped": 0}
+
     # =========================================================
     # 更新某个周期的状态，同时记录“是否刚离开 IN”
     # =========================================================
@@ -122,11 +152,12 @@ class AppState:
         ob_level: float,
         os_level: float,
         now_ts: Optional[float] = None,
-    ) -> None:
+    ) -> IntervalTransition:
         """
         主要职责：
         - 更新最新值
         - 判断是否刚刚离开 IN，若是，则记录 exit_ts
+        - 返回两个方向上的状态迁移（进入 IN / 退出到 WARM / 无变化）
         """
         if now_ts is None:
             now_ts = time.time()
@@ -150,6 +181,7 @@ class AppState:
             rec.last_exit_ts_oversold = now_ts
 
         rec.in_oversold = is_in_os
+        os_trans = _transition(was_in_os, is_in_os)
 
         # ========= 超买处理 =========
         was_in_ob = rec.in_overbought
@@ -159,6 +191,17 @@ class AppState:
             rec.last_exit_ts_overbought = now_ts
 
         rec.in_overbought = is_in_ob
+        ob_trans = _transition(was_in_ob, is_in_ob)
+        self._sync_matrix(symbol, interval, rec)
+
+        return IntervalTransition(oversold=os_trans, overbought=ob_trans)
+
+    def _sync_matrix(self, symbol: str, interval: str, rec: IntervalCache) -> None:
+        self.obos_matrix.set_cell(
+            symbol, interval, rec.value,
+            rec.in_oversold, rec.in_overbought,
+            rec.last_exit_ts_oversold, rec.last_exit_ts_overbought,
+        )
 
     # =========================================================
     # 判断 warm 状态（基于时间差）
@@ -181,9 +224,16 @@ class AppState:
         if now_ts is None:
             now_ts = time.time()
 
+        expiry = self.warm_expiry_ts(symbol, interval, side)
+        if expiry is None:
+            return False
+        return now_ts < expiry
+
+    def warm_expiry_ts(self, symbol: str, interval: str, side: Side) -> Optional[float]:
+        """返回该周期 warm 窗口的到期时间戳；从未退出过 IN 或周期未配置时返回 None。"""
         rec = self.cache.get((symbol, interval))
         if rec is None:
-            return False
+            return None
 
         if side == Side.OVERSOLD:
             exit_ts = rec.last_exit_ts_oversold
@@ -191,17 +241,55 @@ class AppState:
             exit_ts = rec.last_exit_ts_overbought
 
         if exit_ts is None:
-            return False
+            return None
 
         candle_sec = self.interval_seconds.get(interval)
         warm_k = self.warm_k_map.get(interval, 2) # 获取这个周期允许 warm 的 K线根数（默认是2根）
 
         # 防御性代码：如果没有配好周期秒数（极少发生），就直接认为 不在 warm 状态
         if candle_sec is None:
-            return False
-        # logger.debug(f"当前时间戳距离上次离开区间的秒数{now_ts-exit_ts}, 该窗口的warm秒数：{warm_k * candle_sec}")
-        # logger.debug(f"当前时间戳距离上次离开的蜡烛数{(now_ts-exit_ts)/candle_sec}")
-        return (now_ts - exit_ts) < warm_k * candle_sec
+            return None
+        return exit_ts + warm_k * candle_sec
+
+    # =========================================================
+    # 共振评估门控（transition-only）
+    # =========================================================
+    def needs_resonance_eval(
+        self,
+        symbol: str,
+        side: Side,
+        allowed_intervals: List[str],
+        membership_changed: bool,
+        now_ts: float,
+    ) -> bool:
+        """
+        判断本次事件是否需要重新评估该方向的共振：
+        - 本次事件使该方向某周期进入/退出 IN
+        - 从未评估过，或 universe 周期列表变化
+        - 上次评估时的某个 WARM 周期已到期（WARM → OUT）
+        其余情况 IN/WARM 成员与上次评估完全一致，评估结果不会变化，直接跳过。
+        """
+        rec = self.resonance_eval.get((symbol, side))
+        needed = (
+            membership_changed
+            or rec is None
+            or rec.allowed != tuple(allowed_intervals)
+            or (rec.next_warm_expiry is not None and now_ts >= rec.next_warm_expiry)
+        )
+        self.resonance_eval_counts["evaluated" if needed else "skipped"] += 1
+        return needed
+
+    def record_resonance_eval(
+        self,
+        symbol: str,
+        side: Side,
+        allowed_intervals: List[str],
+        next_warm_expiry: Optional[float],
+    ) -> None:
+        self.resonance_eval[(symbol, side)] = ResonanceEvalRecord(
+            allowed=tuple(allowed_intervals),
+            next_warm_expiry=next_warm_expiry,
+        )
 
     # =========================================================
     # Zone 触及状态管理
@@ -372,6 +460,10 @@ class AppState:
             rec.in_oversold = False
             changed = True
         if changed:
+            self._sync_matrix(symbol, interval, rec)
+            # 状态在 webhook 之外被翻转，强制下次事件重新评估共振
+            self.resonance_eval.pop((symbol, Side.OVERBOUGHT), None)
+            self.resonance_eval.pop((symbol, Side.OVERSOLD), None)
             logger.info(f"[心跳缺席] {symbol}/{interval} 已清除 OB/OS 状态，bar_close={bar_close_ts:.0f}")
 
     # =========================================================
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Dict, Set
+
+
+class TopicSequencer:
+    """
+    单个话题的发送顺序：推送进入时领取序号，之后的拉取/渲染可以并发，
+    发送阶段按序号严格依次进行（前一条 done 之后下一条才轮到）。
+
+    每个序号必须调用一次 done（包括渲染失败、被取消的情况），否则后续推送会一直等待；
+    提前 done 的序号在轮到时直接跳过。
+    """
+
+    def __init__(self) -> None:
+        self._issued = 0
+        self._next = 0                 # 当前轮到发送的序号
+        self._finished: Set[int] = set()   # 已 done 但还没轮到的序号
+        self._waiters: Dict[int, asyncio.Future] = {}
+        self.max_backlog = 0           # 同时在途（已领号未发送完）的最大推送数
+
+    def ticket(self) -> int:
+        seq = self._issued
+        self._issued += 1
+        self.max_backlog = max(self.max_backlog, self._issued - self._next)
+        return seq
+
+    async def wait_turn(self, seq: int) -> None:
+        if seq == self._next:
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters[seq] = fut
+        try:
+            await fut
+        finally:
+            self._waiters.pop(seq, None)
+
+    def done(self, seq: int) -> None:
+        if seq != self._next:
+            self._finished.add(seq)
+            return
+        self._next += 1
+        while self._next in self._finished:
+            self._finished.discard(self._next)
+            self._next += 1
+        fut = self._waiters.get(self._next)
+        if fut is not None and not fut.done():
+            fut.set_result(None)
+
+    @property
+    def backlog(self) -> int:
+        return self._issued - self._next
@@ -2,18 +2,27 @@ from __future__ import annotations
 
 import asyncio
 import os
+from typing import Optional
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 
-from .config import settings
+from .config import settings, get_universe
 from .infra.store import AppState
 from .infra.stats import MessageStats
-from .infra.chart import register_analysis, register_stats
+from .infra.chart import (
+    register_analysis_queue, register_stats, register_render_pool, register_indicator_store, create_kline_stream,
+    register_ohlcv_archive, preload_cjk_font,
+)
+from .infra.ohlcv_archive import OhlcvArchive
+from .infra.indicator_store import IndicatorStore
+from .infra.render_pool import RenderPool
+from .infra.http_pool import start_binance_client, close_binance_client
 from .adapters.tg_client import TelegramClient
 from .adapters.claude_client import ClaudeClient
 from .services.chart_analysis import ChartAnalysisService
+from .services.analysis_queue import AnalysisQueue
 from .adapters.tv_parser import parse_tv_payload, parse_zone_payload, parse_ema_payload, parse_divergence_payload, parse_volatile_payload
-from .services.resonance_service import ResonanceService
+from .services.resonance_service import ResonanceService, filter_by_universe
 from .services.zone_service import ZoneService
 from .services.ema_service import EmaService
 from .services.divergence_service import DivergenceService
@@ -22,8 +31,11 @@ from .services.tg_command_handler import polling_loop
 from .services.exhaustion_service import ExhaustionService, Ema21CrossEma200Rule
 from .services.market_briefing_service import MarketBriefingService
 from .services.obos_scan_service import ObosScanService
+from .services.prefetch_service import BarClosePrefetcher
 from .services.daily_summary_service import DailySummaryService
 from .services.heartbeat_scheduler import HeartbeatScheduler
+from .services.interval_relevance import INTERVAL_CONSUMERS, is_interval_relevant, prunable_alerts
+from .services.matrix_service import build_matrix_payload, near_trigger_payload
 import logging
 from .infra.logger_config import setup_logging
 
@@ -62,8 +74,12 @@ msg_stats = MessageStats()
 # Telegram client
 tg = TelegramClient(bot_token=settings.TG_BOT_TOKEN, stats=msg_stats)
 
+# 出图统计（PNG 缓存命中、编码、降级）与是否启用 AI 分析无关
+register_stats(msg_stats)
+
 # Claude 图表分析 + 市场简报（ANTHROPIC_API_KEY 未配置时跳过）
 _briefing_svc: MarketBriefingService | None = None
+_analysis_queue: AnalysisQueue | None = None
 
 if settings.ANTHROPIC_API_KEY:
     _claude_client = ClaudeClient(
@@ -71,8 +87,11 @@ if settings.ANTHROPIC_API_KEY:
         model=settings.CLAUDE_MODEL,
         max_tokens=settings.CLAUDE_MAX_TOKENS,
     )
-    register_analysis(ChartAnalysisService(_claude_client))
-    register_stats(msg_stats)
+    _analysis_queue = AnalysisQueue(
+        ChartAnalysisService(_claude_client), tg, stats=msg_stats,
+        concurrency=settings.ANALYSIS_CONCURRENCY, max_pending=settings.ANALYSIS_QUEUE_MAX,
+    )
+    register_analysis_queue(_analysis_queue)
     _briefing_svc = MarketBriefingService(claude=_claude_client, tg=tg)
 else:
     logger.warning("ANTHROPIC_API_KEY 未配置，图表分析和市场简报功能已禁用")
@@ -96,6 +115,29 @@ volatile_svc = VolatileService(state=state, tg=tg, exhaustion_svc=exhaustion_svc
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    start_binance_client()
+    font_task = asyncio.create_task(preload_cjk_font())
+    render_pool = None
+    if settings.CHART_RENDER_WORKERS > 0:
+        try:
+            render_pool = RenderPool(settings.CHART_RENDER_WORKERS)
+            await render_pool.start()
+            register_render_pool(render_pool)
+        except Exception:
+            logger.warning("渲染进程池启动失败，改为进程内渲染", exc_info=True)
+            render_pool = None
+    if settings.OHLCV_ARCHIVE_DIR:
+        register_ohlcv_archive(OhlcvArchive(settings.OHLCV_ARCHIVE_DIR))
+    indicator_store = IndicatorStore(settings.INDICATOR_STATE_PATH)
+    register_indicator_store(indicator_store)
+    indicator_task = asyncio.create_task(
+        indicator_store.run_persist_loop(settings.INDICATOR_PERSIST_INTERVAL)
+    )
+    stream_task = (
+        asyncio.create_task(create_kline_stream().run_forever())
+        if settings.KLINE_STREAM_ENABLED
+        else None
+    )
     task = asyncio.create_task(
         polling_loop(state=state, tg=tg, owner_chat_id=settings.TG_OWNER_CHAT_ID, stats=msg_stats, briefing_svc=_briefing_svc)
     )
@@ -103,26 +145,51 @@ async def lifespan(app: FastAPI):
     scan_task = asyncio.create_task(obos_scan_svc.run_loop())
     exhaustion_task = asyncio.create_task(exhaustion_svc.run_forever())
     heartbeat_task = asyncio.create_task(heartbeat_scheduler.run_forever())
+    prefetch_task = (
+        asyncio.create_task(BarClosePrefetcher(state).run_loop())
+        if settings.PREFETCH_ENABLED
+        else None
+    )
     briefing_task = (
         asyncio.create_task(_briefing_svc.run_daily_loop())
         if _briefing_svc is not None
         else None
     )
+    analysis_task = (
+        asyncio.create_task(_analysis_queue.run())
+        if _analysis_queue is not None
+        else None
+    )
     yield
     task.cancel()
     summary_task.cancel()
     scan_task.cancel()
     exhaustion_task.cancel()
     heartbeat_task.cancel()
+    indicator_task.cancel()
+    font_task.cancel()
     if briefing_task is not None:
         briefing_task.cancel()
-    for t in (task, summary_task, scan_task, exhaustion_task, heartbeat_task, briefing_task):
+    if analysis_task is not None:
+        analysis_task.cancel()
+    if stream_task is not None:
+        stream_task.cancel()
+    if prefetch_task is not None:
+        prefetch_task.cancel()
+    for t in (
+        task, summary_task, scan_task, exhaustion_task, heartbeat_task, indicator_task, briefing_task, stream_task,
+        prefetch_task, font_task, analysis_task,
+    ):
         if t is None:
             continue
         try:
             await t
         except asyncio.CancelledError:
             pass
+    await close_binance_client()
+    if render_pool is not None:
+        register_render_pool(None)
+        render_pool.shutdown()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -132,6 +199,29 @@ async def health():
     return {"ok": True}
 
 
+@app.get("/alerts/prunable")
+async def alerts_prunable():
+    """列出没有任何规则消费的 ob/os alert（interval → symbols），可在 TradingView 删除。"""
+    prunable = prunable_alerts(get_universe())
+    return {
+        "consumers": {iv: sorted(c) for iv, c in INTERVAL_CONSUMERS.items()},
+        "prunable": prunable,
+        "count": sum(len(v) for v in prunable.values()),
+    }
+
+
+@app.get("/resonance/matrix")
+async def resonance_matrix():
+    """全量 symbols × intervals × side 的 IN/WARM 状态，以及每个白名单组合当前满足的 symbol。"""
+    return build_matrix_payload(state)
+
+
+@app.get("/resonance/near")
+async def resonance_near(max_distance: Optional[float] = None):
+    """差一个周期即可成立的白名单组合；max_distance 限制缺失周期距 ob/os 阈值的最大差值。"""
+    return near_trigger_payload(state, max_distance)
+
+
 @app.post("/webhook/tradingview")
 async def tradingview_webhook(req: Request):
     try:
@@ -191,6 +281,15 @@ async def tradingview_webhook(req: Request):
         if not event.signals:
             return {"ok": True, "ignored": True}
 
+        # 无任何规则消费的周期（如 30s / 5m / 1W）：只更新状态，跳过共振与 zone 反查
+        # （先按 universe 过滤，universe 外的 symbol / interval 不写入 cache）
+        if not any(is_interval_relevant(s.interval) for s in event.signals):
+            event = filter_by_universe(event)
+            if event is None:
+                return {"ok": True, "ignored": True}
+            svc.update_state_only(event)
+            return {"ok": True, "pruned": True}
+
         await svc.handle_event(event)
         try:
             await zone_svc.handle_obos_reverse(event)
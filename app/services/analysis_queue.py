@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional
+
+from ..config import settings
+from ..infra.chart import is_analysis_enabled, set_analysis_enabled
+from ..infra.image_encoding import image_media_type
+
+if TYPE_CHECKING:
+    from ..adapters.tg_client import TelegramClient
+    from ..infra.stats import MessageStats
+    from .chart_analysis import ChartAnalysisService
+
+logger = logging.getLogger(__name__)
+
+# 今日 AI 分析估算成本上限（美元），超过后自动关闭分析
+_DAILY_COST_LIMIT = 1.0
+
+# 等待耗时统计窗口
+_TIMING_WINDOW = 256
+
+
+@dataclass
+class AnalysisJob:
+    image: bytes
+    symbol: str
+    chat_id: str
+    topic_id: int
+    reply_to_message_id: Optional[int]   # 图表消息：分析结果作为其回复发送
+    extra_context: Optional[str] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class AnalysisQueue:
+    """
+    图表 AI 分析后台队列：推送路径只负责入队（不持有话题锁等待模型调用），
+    由 concurrency 个 worker 调用 Claude 并把结果回复到对应的图表消息。
+    队列有界，满时丢弃新任务（该图表不附分析）。
+    """
+
+    def __init__(
+        self,
+        svc: "ChartAnalysisService",
+        tg: "TelegramClient",
+        stats: Optional["MessageStats"] = None,
+        concurrency: int = 2,
+        max_pending: int = 20,
+    ):
+        self._svc = svc
+        self._tg = tg
+        self._stats = stats
+        self._concurrency = concurrency
+        self._queue: "asyncio.Queue[AnalysisJob]" = asyncio.Queue(maxsize=max_pending)
+        self._wait_ms: Deque[float] = deque(maxlen=_TIMING_WINDOW)
+
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def submit(self, job: AnalysisJob) -> bool:
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"[Analysis] 队列已满，跳过分析: {job.symbol}")
+            return False
+        self.submitted += 1
+        return True
+
+    async def run(self) -> None:
+        workers: List[asyncio.Task] = [asyncio.create_task(self._worker()) for _ in range(self._concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            self.running += 1
+            try:
+                if is_analysis_enabled():   # 入队后可能已被关闭（/analysis off 或成本超限）
+                    self._wait_ms.append((time.monotonic() - job.enqueued_at) * 1000)
+                    await self._process(job)
+                    self.completed += 1
+            except Exception:
+                self.failed += 1
+                logger.warning(f"[Analysis] 分析失败: {job.symbol}", exc_info=True)
+            finally:
+                self.running -= 1
+                self._queue.task_done()
+
+    async def _process(self, job: AnalysisJob) -> None:
+        analysis_text, usage = await self._svc.analyze(
+            image_bytes=job.image,
+            media_type=image_media_type(job.image),
+            symbol=job.symbol,
+            extra_context=job.extra_context,
+        )
+        await self._tg.send_message(
+            chat_id=job.chat_id,
+            text=analysis_text,
+            message_thread_id=job.topic_id,
+            reply_to_message_id=job.reply_to_message_id,
+        )
+        if self._stats is None:
+            return
+        self._stats.record_tokens(
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            cache_creation=usage.cache_creation_tokens,
+            cache_read=usage.cache_read_tokens,
+        )
+        if self._stats.get_estimated_cost() > _DAILY_COST_LIMIT and is_analysis_enabled():
+            set_analysis_enabled(False)
+            logger.warning(f"[Analysis] 今日成本超过 ${_DAILY_COST_LIMIT:.2f}，已自动关闭AI分析")
+            try:
+                await self._tg.send_message(
+                    chat_id=job.chat_id,
+                    text=f"⚠️ AI分析今日成本已超过 ${_DAILY_COST_LIMIT:.2f}，已自动关闭。\n如需恢复请发送 /analysis on",
+                    message_thread_id=settings.TG_TOPIC_SUMMARY,
+                )
+            except Exception:
+                logger.warning("[Analysis] 超限通知发送失败", exc_info=True)
+
+    def stats(self) -> Dict[str, Any]:
+        wait = sorted(self._wait_ms)
+        return {
+            "pending": self._queue.qsize(),
+            "running": self.running,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "wait_p50_ms": wait[len(wait) // 2] if wait else 0.0,
+            "wait_max_ms": wait[-1] if wait else 0.0,
+        }
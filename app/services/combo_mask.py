@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..config import settings
+from .router import max_interval, rank_of
+from .resonance_combinations import ALLOWED_COMBINATIONS, COMBINATION_ROUTING, canonical_combo
+
+logger = logging.getLogger(__name__)
+
+
+# =========================
+# 组合位图（bitmask）
+# =========================
+# 每个周期占一个 bit（按 settings.INTERVAL_ORDER 顺序分配）。
+# IN/WARM 周期集合 → int，组合白名单预编译为 mask 表，
+# 子集 / 升级 / 取大 判断全部退化为位运算。
+
+
+@dataclass(frozen=True)
+class ComboMask:
+    combo: Tuple[str, ...]   # canonical（大周期在前）
+    mask: int
+    max_iv: str
+
+
+class ComboMaskTable:
+    """
+    组合白名单的预编译位图表。
+
+    - groups：max_iv → 该 topic 下的白名单组合（保持 ALLOWED_COMBINATIONS 原顺序）
+    - routing：max_iv → COMBINATION_ROUTING 中同 max_iv 的组合 mask，用于判定 topic 是否被激活
+    """
+
+    def __init__(
+        self,
+        allowed: Sequence[Tuple[str, ...]],
+        routing: Iterable[Tuple[str, ...]],
+        interval_order: Sequence[str],
+    ):
+        self.bits: Dict[str, int] = {iv: 1 << i for i, iv in enumerate(interval_order)}
+        self._mask_cache: Dict[Tuple[str, ...], int] = {}
+
+        self.groups: Dict[str, List[ComboMask]] = {}
+        for combo in allowed:
+            max_iv = max_interval(list(combo))
+            if max_iv is None:
+                logger.warning(f"[ComboMask] 组合 {combo} 无法计算最大周期，已忽略")
+                continue
+            self.groups.setdefault(max_iv, []).append(
+                ComboMask(combo=canonical_combo(combo), mask=self.mask_of(combo), max_iv=max_iv)
+            )
+
+        self.routing: Dict[str, List[int]] = {}
+        for combo in routing:
+            max_iv = max_interval(list(combo))
+            if max_iv is None:
+                continue
+            self.routing.setdefault(max_iv, []).append(self.mask_of(combo))
+
+        # 固定遍历顺序：大周期 topic 优先，保证推送顺序稳定
+        self.max_iv_order: List[str] = sorted(self.routing, key=rank_of, reverse=True)
+
+    def mask_of(self, intervals: Iterable[str]) -> int:
+        """周期集合 → mask；未在 INTERVAL_ORDER 中的周期不占 bit（不参与任何组合）。"""
+        key = tuple(intervals)
+        m = self._mask_cache.get(key)
+        if m is None:
+            m = 0
+            for iv in key:
+                m |= self.bits.get(iv, 0)
+            self._mask_cache[key] = m
+        return m
+
+    def active_groups(self, current_mask: int) -> List[str]:
+        """返回当前 IN/WARM 集合可激活的 max_iv（至少一个 routing 组合被满足）。"""
+        return [
+            max_iv for max_iv in self.max_iv_order
+            if any(m & current_mask == m for m in self.routing[max_iv])
+        ]
+
+    def match(
+        self,
+        max_iv: str,
+        current_mask: int,
+        in_mask: int,
+        pushed_combos: Dict[Tuple[str, ...], Dict],
+        last_active_combo: Optional[Tuple[str, ...]],
+    ) -> List[Tuple[Tuple[str, ...], bool]]:
+        """
+        与 match_combinations_with_lifecycle 语义一致的位运算版本：
+        - 升级：last_active ⊂ combo，且新增周期全部为 IN → (combo, True)
+        - 首次命中 / 已被重置（active=False） → (combo, False)
+        - 其余（已推送且仍 active）不返回
+        """
+        prev_mask = self.mask_of(last_active_combo) if last_active_combo else 0
+        result: List[Tuple[Tuple[str, ...], bool]] = []
+
+        for cm in self.groups.get(max_iv, ()):
+            if cm.mask & current_mask != cm.mask:
+                continue
+
+            if prev_mask:
+                added = cm.mask & ~prev_mask
+                if prev_mask & ~cm.mask == 0 and added and added & ~in_mask == 0:
+                    result.append((cm.combo, True))
+                    continue
+
+            status = pushed_combos.get(cm.combo)
+            if status is None or status.get("active") is False:
+                result.append((cm.combo, False))
+
+        return result
+
+    def suppress_dominated(
+        self,
+        results: List[Tuple[Tuple[str, ...], bool]],
+    ) -> List[Tuple[Tuple[str, ...], bool]]:
+        """topic 内取大：被同组其它组合严格包含的组合不展示。"""
+        masks = [self.mask_of(combo) for combo, _ in results]
+        visible = []
+        for (combo, is_upgrade), m in zip(results, masks):
+            dominated = any(
+                h != m and m & h == m
+                for h in masks
+            )
+            if not dominated:
+                visible.append((combo, is_upgrade))
+        return visible
+
+
+COMBO_TABLE = ComboMaskTable(
+    allowed=ALLOWED_COMBINATIONS,
+    routing=COMBINATION_ROUTING.keys(),
+    interval_order=settings.INTERVAL_ORDER,
+)
@@ -28,6 +28,7 @@ class DailySummaryService:
             )
             await asyncio.sleep((next_midnight - now).total_seconds())
 
+            chart_cache = self.stats.get_chart_cache_stats()
             counts, tokens = self.stats.get_and_reset()
             if not counts and tokens.analysis_count == 0:
                 continue
@@ -61,6 +62,12 @@ class DailySummaryService:
                     lines.append(f"  缓存写入: {tokens.cache_creation_tokens:,}")
                 lines.append(f"  估算成本: ${cost:.4f}")
 
+            chart_total = chart_cache.hits + chart_cache.misses
+            if chart_total:
+                lines.append("")
+                lines.append("🖼 图表缓存")
+                lines.append(f"  命中: {chart_cache.hits}  未命中: {chart_cache.misses}（命中率 {chart_cache.hits / chart_total:.0%}）")
+
             try:
                 await self.tg.send_message(
                     chat_id=settings.TG_CHAT_ID,
@@ -24,6 +24,10 @@ _EMA21_INTERVAL_TO_TOPIC_ATTR: dict[str, str] = {
     "4h": "TG_TOPIC_4H",
     "1h": "TG_TOPIC_1H",
 }
+# EMA21 触及周期 → 额外检查的 ob/os 周期（IN 即单独推送到该周期话题，不要求同级别 IN）
+_EMA21_EXTRA_OBOS_INTERVAL: dict[str, str] = {
+    "1h": "15m",
+}
 
 
 class EmaService:
@@ -223,8 +227,9 @@ class EmaService:
 
         # 15m 推送：仅限 1h 周期，15m obos IN 即可，不要求 1h obos IN
         push_15m = False
-        if event.interval == "1h" and "15m" in allowed_intervals:
-            obos_15m = _get_obos_state(self.state, event.symbol, "15m", side, now_ts)
+        extra_iv = _EMA21_EXTRA_OBOS_INTERVAL.get(event.interval)
+        if extra_iv is not None and extra_iv in allowed_intervals:
+            obos_15m = _get_obos_state(self.state, event.symbol, extra_iv, side, now_ts)
             push_15m = obos_15m == LevelState.IN and not in_cooldown
             logger.info(f"[EMA21] {event.symbol} 15m state={obos_15m.value} push_15m={push_15m}")
 
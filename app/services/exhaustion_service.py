@@ -8,11 +8,16 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from typing import Callable, Optional, TYPE_CHECKING
 
+import numpy as np
+
 from ..config import settings
 from ..domain.models import Side, TrackingWindow  # Side 也用于 on_push 类型注解
 from ..infra.store import AppState
 from ..infra.utils import ts_to_utc_str
-from ..infra.chart import _fetch_klines, _binance_to_df, _compute_ema, send_with_chart
+from ..infra.binance_weight import background_priority
+from ..infra.chart import fetch_binance_ohlcv, get_indicator_store, send_with_chart
+from ..infra.indicator_store import EMA_PERIODS
+from ..infra.indicators import ema
 
 if TYPE_CHECKING:
     from ..adapters.tg_client import TelegramClient
@@ -73,25 +78,36 @@ class Ema21CrossEma200Rule(ExhaustionRule):
         return "ema21_cross_ema200_3m"
 
     async def check(self, window: TrackingWindow) -> Optional[ExhaustionResult]:
-        klines = await _fetch_klines(window.symbol, "3m", _KLINE_LIMIT)
-        if not klines:
-            logger.debug(f"[{self.name}] {window.symbol} 无 3m K线，跳过")
-            return None
-
-        # 过滤未收盘的 K 线：Binance kline[6] 是 close_time（毫秒），
-        # close_time > now 说明该 K 线尚未收盘，丢弃。
         now_ms = time.time() * 1000
-        klines = [k for k in klines if k[6] < now_ms]
-        if len(klines) < 401:  # EMA200 初始化(200) + 最低稳定期(200) + 1
-            logger.debug(f"[{self.name}] {window.symbol} 已收盘 K 线不足，跳过")
-            return None
-
-        df = _binance_to_df(klines)
-        closes = df["Close"].tolist()
-        open_times = [t.timestamp() for t in df.index]
-
-        ema21  = _compute_ema(closes, 21)
-        ema200 = _compute_ema(closes, 200)
+        store = get_indicator_store()
+
+        # EMA 已建档时只需拉 push_ts 之后的K线（+ 前一根用于判断穿越），否则拉长窗口全量计算
+        emas = None
+        limit = None
+        if store is not None:
+            need = max(int((now_ms / 1000 - window.push_ts) // _3M_CANDLE_SEC) + 2, 2)
+            limit = store.window_limit(window.symbol, "3m", need, _3M_CANDLE_SEC, now_ms)
+        if limit is not None:
+            ohlcv = await self._closed_ohlcv(window.symbol, limit, now_ms)
+            if ohlcv is not None:
+                emas = store.try_incremental(window.symbol, "3m", ohlcv, _3M_CANDLE_SEC, now_ms)
+
+        if emas is None:
+            ohlcv = await self._closed_ohlcv(window.symbol, _KLINE_LIMIT, now_ms)
+            if ohlcv is None:
+                logger.debug(f"[{self.name}] {window.symbol} 无 3m K线，跳过")
+                return None
+            if len(ohlcv) < 401:  # EMA200 初始化(200) + 最低稳定期(200) + 1
+                logger.debug(f"[{self.name}] {window.symbol} 已收盘 K 线不足，跳过")
+                return None
+            if store is not None:
+                emas = store.seed(window.symbol, "3m", ohlcv, _3M_CANDLE_SEC, now_ms)
+            else:
+                emas = np.column_stack([ema(ohlcv[:, 4], p) for p in EMA_PERIODS])
+
+        open_times = ohlcv[:, 0] / 1000
+        ema21  = emas[:, EMA_PERIODS.index(21)]
+        ema200 = emas[:, EMA_PERIODS.index(200)]
 
         for i in range(1, len(open_times)):
             close_ts = open_times[i] + _3M_CANDLE_SEC  # 该 K 线收盘时间
@@ -113,6 +129,15 @@ class Ema21CrossEma200Rule(ExhaustionRule):
 
         return None
 
+    @staticmethod
+    async def _closed_ohlcv(symbol: str, limit: int, now_ms: float) -> Optional[np.ndarray]:
+        """拉取 3m K线（经K线缓存 / OHLCV 归档）并过滤未收盘的 K 线（open + 3m > now 说明尚未收盘）。"""
+        ohlcv = await fetch_binance_ohlcv(symbol, "3m", limit)
+        if ohlcv is None:
+            return None
+        ohlcv = ohlcv[ohlcv[:, 0] + _3M_CANDLE_SEC * 1000 <= now_ms]
+        return ohlcv if len(ohlcv) else None
+
     @staticmethod
     def _make_result(
         window: TrackingWindow,
@@ -199,7 +224,9 @@ class ExhaustionService:
     async def _check_window(self, window: TrackingWindow) -> None:
         for rule in self._rules:
             try:
-                result = await rule.check(window)
+                # 轮询属后台请求，Binance 权重紧张时让行推送出图
+                with background_priority():
+                    result = await rule.check(window)
             except Exception:
                 logger.warning(f"[Exhaustion] 规则 {rule.name} 异常", exc_info=True)
                 continue
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from typing import Dict, FrozenSet, List
+
+from .resonance_combinations import ALLOWED_COMBINATIONS
+from .zone_rules import ZONE_RULES, EMA200_RULES
+from .ema_service import _EMA55_COMBO, _EMA21_INTERVAL_TO_TOPIC_ATTR, _EMA21_EXTRA_OBOS_INTERVAL
+from .volatile_service import _OBOS_CHECK_INTERVALS
+from .divergence_service import DIVERGENCE_INTERVAL_TO_TOPIC_ATTR
+from .obos_scan_service import _INTERVALS as _SNAPSHOT_INTERVALS
+from .resonance_service import _PRICE_ALERT_OBOS_INTERVALS
+
+logger = logging.getLogger(__name__)
+
+
+# =========================
+# ob/os 周期 → 读取该周期状态的规则消费方
+# =========================
+# 启动时分析一次规则表：某周期的 ob/os 值没有任何规则读取时，
+# webhook 只需更新 cache（供 /cache、/scan 查询），无需走共振评估与 zone 反查。
+
+
+def analyze_interval_consumers() -> Dict[str, FrozenSet[str]]:
+    consumers: Dict[str, set[str]] = defaultdict(set)
+
+    for combo in ALLOWED_COMBINATIONS:
+        for iv in combo:
+            consumers[iv].add("resonance")
+    for _, obos_iv in ZONE_RULES:
+        consumers[obos_iv].add("zone")
+    for _, obos_iv in EMA200_RULES:
+        consumers[obos_iv].add("ema200")
+    for iv in _EMA55_COMBO:
+        consumers[iv].add("ema55")
+    for iv in _EMA21_INTERVAL_TO_TOPIC_ATTR:
+        consumers[iv].add("ema21")
+    for iv in _EMA21_EXTRA_OBOS_INTERVAL.values():
+        consumers[iv].add("ema21")
+    for iv in _OBOS_CHECK_INTERVALS:
+        consumers[iv].add("volatile")
+    for iv in DIVERGENCE_INTERVAL_TO_TOPIC_ATTR:
+        consumers[iv].add("divergence")
+    for iv in _PRICE_ALERT_OBOS_INTERVALS:
+        consumers[iv].add("price_alert")
+    for iv in _SNAPSHOT_INTERVALS:
+        consumers[iv].add("obos_snapshot")
+
+    return {iv: frozenset(c) for iv, c in consumers.items()}
+
+
+INTERVAL_CONSUMERS: Dict[str, FrozenSet[str]] = analyze_interval_consumers()
+logger.info(
+    "[Relevance] 有消费方的 ob/os 周期: "
+    + ", ".join(f"{iv}={'/'.join(sorted(c))}" for iv, c in sorted(INTERVAL_CONSUMERS.items()))
+)
+
+
+def is_interval_relevant(interval: str) -> bool:
+    return interval in INTERVAL_CONSUMERS
+
+
+def prunable_alerts(universe: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """
+    返回可安全删除的 TradingView ob/os alert：interval → symbols。
+    这些周期的数值不被任何规则读取，删除后不影响任何推送。
+    """
+    out: Dict[str, List[str]] = defaultdict(list)
+    for symbol, intervals in sorted(universe.items()):
+        for iv in intervals:
+            if not is_interval_relevant(iv):
+                out[iv].append(symbol)
+    return dict(out)
@@ -3,6 +3,7 @@ from __future__ import annotations
 import asyncio
 import datetime
 import logging
+import time
 from typing import TYPE_CHECKING
 from zoneinfo import ZoneInfo
 
@@ -10,9 +11,12 @@ import pandas as pd
 import yfinance as yf
 
 from ..config import settings
+from ..infra.chart import get_ohlcv_archive
+from ..infra.kline_cache import OHLCV_COLUMNS, df_to_array
 from ..services.prompts import MARKET_BRIEFING_PROMPT_TEMPLATE
 
 if TYPE_CHECKING:
+    from ..infra.ohlcv_archive import OhlcvArchive
     from ..adapters.claude_client import ClaudeClient
     from ..adapters.tg_client import TelegramClient
 
@@ -20,6 +24,9 @@ logger = logging.getLogger(__name__)
 
 EASTERN = ZoneInfo("America/New_York")
 
+# 归档日线在此时刻（美东，当日）之后写入才视为最终收盘价：现货 16:00 收盘、股指期货 17:00 结算，留少量余量
+_FINAL_AFTER_ET = datetime.time(17, 30)
+
 _briefing_enabled: bool = True
 
 _INDICES = ["SPY", "QQQ", "^DJI", "^GSPC", "^IXIC"]
@@ -28,6 +35,9 @@ _SENTIMENT = ["^VIX"]
 _SECTOR_ETFS = ["XLK", "XLF", "XLE", "XLV", "XLI", "ARKK"]
 _CORE_STOCKS = ["NVDA", "AAPL", "TSLA", "META", "MSFT", "GOOGL", "AMD"]
 
+# OHLCV 归档中与画图共用的 yfinance 数据源目录
+_YF_ARCHIVE_SOURCE = "yfinance"
+
 
 def set_briefing_enabled(value: bool) -> None:
     global _briefing_enabled
@@ -53,44 +63,120 @@ def _last_trading_day(d: datetime.date) -> datetime.date:
     return d
 
 
+def _download_closes(symbols: list[str], start: datetime.date, end: datetime.date) -> pd.DataFrame:
+    """yf.download 日线，返回 MultiIndex 列（Price, Ticker）的原始 DataFrame。"""
+    return yf.download(
+        tickers=symbols,
+        start=start.strftime("%Y-%m-%d"),
+        end=end.strftime("%Y-%m-%d"),
+        interval="1d",
+        auto_adjust=True,
+        progress=False,
+        threads=True,
+    )
+
+
+def _final_after_ts(fetch_date: datetime.date) -> float:
+    return datetime.datetime.combine(fetch_date, _FINAL_AFTER_ET, tzinfo=EASTERN).timestamp()
+
+
+def _close_on(arr, fetch_date: datetime.date, written_ts: float | None = None):
+    """
+    日线（float64 [n, 6]）中 fetch_date 当天的收盘价，没有返回 None。
+    written_ts 给定时（归档数据）：盘中写入的日线是未收盘K线，只有在当日收盘后写入、
+    或其后已有更晚的日线（增量下载总是从末根起重新拉取）时才采用，否则返回 None。
+    """
+    if arr is None:
+        return None
+    for i in range(len(arr) - 1, -1, -1):
+        d = datetime.datetime.fromtimestamp(arr[i, 0] / 1000, tz=datetime.timezone.utc).date()
+        if d == fetch_date:
+            final = written_ts is None or i < len(arr) - 1 or written_ts >= _final_after_ts(fetch_date)
+            return float(arr[i, 4]) if final else None
+        if d < fetch_date:
+            return None
+    return None
+
+
+def _archived_closes(archive: "OhlcvArchive", symbols: list[str], fetch_date: datetime.date) -> dict[str, float]:
+    """
+    归档中已有 fetch_date 最终日线的品种直接读取；其余品种（含只有盘中日线的）一次批量下载最近一周日线，
+    写入归档（与画图共用 yfinance/1d）后再读取。
+    """
+    closes: dict[str, float] = {}
+    missing: list[str] = []
+    now = time.time()
+    for sym in symbols:
+        age = archive.age(_YF_ARCHIVE_SOURCE, sym, "1d")
+        written_ts = now - age if age is not None else 0.0
+        val = _close_on(archive.read(_YF_ARCHIVE_SOURCE, sym, "1d", limit=10), fetch_date, written_ts)
+        if val is None:
+            missing.append(sym)
+        else:
+            closes[sym] = val
+    if not missing:
+        return closes
+
+    raw = _download_closes(missing, fetch_date - datetime.timedelta(days=7), fetch_date + datetime.timedelta(days=1))
+    if raw.empty:
+        return closes
+    for sym in missing:
+        if isinstance(raw.columns, pd.MultiIndex):
+            if sym not in raw.columns.get_level_values(1):
+                continue
+            df = raw.xs(sym, axis=1, level=1)
+        else:
+            df = raw
+        df = df[list(OHLCV_COLUMNS)].dropna(subset=["Close"]).astype(float)
+        if df.empty:
+            continue
+        if df.index.tz is None:
+            df.index = df.index.tz_localize("UTC")
+        else:
+            df.index = df.index.tz_convert("UTC")
+        arr = df_to_array(df)
+        archive.append(_YF_ARCHIVE_SOURCE, sym, "1d", arr)
+        val = _close_on(arr, fetch_date)
+        if val is not None:
+            closes[sym] = val
+    return closes
+
+
 def _fetch_market_data(fetch_date: datetime.date, extra_symbols: list[str]) -> str:
-    """用 yfinance 拉取指定交易日的收盘数据，返回格式化字符串。"""
+    """
+    拉取指定交易日的收盘数据，返回格式化字符串。
+    已注册 OHLCV 归档时优先读归档，只下载归档中缺失的品种。
+    """
     all_syms = list(dict.fromkeys(
         _INDICES + _FUTURES + _SENTIMENT + _SECTOR_ETFS + _CORE_STOCKS + extra_symbols
     ))
     end_date = fetch_date + datetime.timedelta(days=1)
 
+    archive = get_ohlcv_archive()
     try:
-        raw = yf.download(
-            tickers=all_syms,
-            start=fetch_date.strftime("%Y-%m-%d"),
-            end=end_date.strftime("%Y-%m-%d"),
-            interval="1d",
-            auto_adjust=True,
-            progress=False,
-            threads=True,
-        )
+        if archive is not None:
+            row = _archived_closes(archive, all_syms, fetch_date)
+            if not row:
+                return "（指定日期无交易数据，可能为非交易日）"
+        else:
+            raw = _download_closes(all_syms, fetch_date, end_date)
+            if raw.empty:
+                return "（指定日期无交易数据，可能为非交易日）"
+            if isinstance(raw.columns, pd.MultiIndex):
+                closes = raw["Close"]
+            else:
+                closes = raw[["Close"]].rename(columns={"Close": all_syms[0]})
+            if closes.empty:
+                return "（数据为空）"
+            row = closes.iloc[-1].to_dict()
     except Exception as e:
         logger.warning("yfinance 下载失败: %s", e)
         return "（市场数据获取失败，请以搜索结果为准）"
 
-    if raw.empty:
-        return "（指定日期无交易数据，可能为非交易日）"
-
-    if isinstance(raw.columns, pd.MultiIndex):
-        closes = raw["Close"]
-    else:
-        closes = raw[["Close"]].rename(columns={"Close": all_syms[0]})
-
-    if closes.empty:
-        return "（数据为空）"
-
-    row = closes.iloc[-1]
-
     def fmt_group(label: str, symbols: list[str]) -> list[str]:
         lines = [f"\n[{label}]"]
         for sym in symbols:
-            val = row.get(sym) if sym in closes.columns else None
+            val = row.get(sym)
             if val is None or pd.isna(val):
                 lines.append(f"  {sym}: 数据不可用")
             else:
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import settings, get_universe
+from ..domain.models import Side
+from ..infra.obos_matrix import SIDES, LEVEL_OF_CODE, MatrixSnapshot, OUT
+from .resonance_combinations import ALLOWED_COMBINATIONS, canonical_combo
+
+if TYPE_CHECKING:
+    from ..infra.store import AppState
+
+
+# 白名单组合（canonical，去重，保持原顺序）
+_COMBOS: List[Tuple[str, ...]] = list(dict.fromkeys(canonical_combo(c) for c in ALLOWED_COMBINATIONS))
+
+
+def take_snapshot(state: "AppState", now_ts: Optional[float] = None) -> MatrixSnapshot:
+    """按当前 universe 生成全量 ob/os 矩阵快照（全部扫描类功能的统一数据源）。"""
+    return state.obos_matrix.snapshot(
+        now_ts=time.time() if now_ts is None else now_ts,
+        universe=get_universe(),
+    )
+
+
+def build_matrix_payload(state: "AppState", now_ts: Optional[float] = None) -> Dict[str, Any]:
+    """/resonance/matrix 的 JSON 结构：非 OUT 的单元格 + 每个白名单组合当前满足的 symbol。"""
+    snap = take_snapshot(state, now_ts)
+
+    cells: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for r, c, s in zip(*(snap.states != OUT).nonzero()):
+        symbol, iv = snap.symbols[r], snap.intervals[c]
+        cell = cells.setdefault(symbol, {}).setdefault(iv, {"value": float(snap.values[r, c])})
+        cell[SIDES[s].value] = LEVEL_OF_CODE[int(snap.states[r, c, s])].value
+
+    combos = {
+        side.value: {
+            "+".join(combo): symbols
+            for combo, symbols in snap.combo_hits(_COMBOS, side).items()
+        }
+        for side in SIDES
+    }
+    return {
+        "ts": snap.ts,
+        "symbols": len(snap.symbols),
+        "intervals": snap.intervals,
+        "cells": cells,
+        "combos": combos,
+    }
+
+
+def build_matrix_text(state: "AppState", now_ts: Optional[float] = None) -> str:
+    """/matrix 命令：列出每个白名单组合当前满足的全部标的。"""
+    snap = take_snapshot(state, now_ts)
+    lines = ["🧮 共振矩阵（白名单组合 × 全部标的）"]
+    any_result = False
+    for side in (Side.OVERBOUGHT, Side.OVERSOLD):
+        hits = {combo: syms for combo, syms in snap.combo_hits(_COMBOS, side).items() if syms}
+        if not hits:
+            continue
+        any_result = True
+        dot = "🔴 超买" if side == Side.OVERBOUGHT else "🟢 超卖"
+        lines.append(f"\n{dot}")
+        for combo, syms in hits.items():
+            lines.append(f"  {'+'.join(combo)}: {' '.join(s.replace('USDT', '') for s in syms)}")
+    if not any_result:
+        lines.append("  暂无标的满足任何组合")
+    return "\n".join(lines)
+
+
+# =========================
+# 临近触发（差一个周期即可成立的组合）
+# =========================
+
+@dataclass(frozen=True)
+class NearTrigger:
+    symbol: str
+    side: Side
+    combo: Tuple[str, ...]   # canonical，combo[0] 即 max_iv
+    missing: str             # 唯一缺失的周期
+    value: float             # 缺失周期当前值
+    distance: float          # 距离 ob/os 阈值还差多少
+
+
+def _distance(side: Side, value: float) -> float:
+    if math.isnan(value):
+        return math.inf
+    if side == Side.OVERSOLD:
+        return max(value - settings.OS_LEVEL, 0.0)
+    return max(settings.OB_LEVEL - value, 0.0)
+
+
+def find_near_triggers(
+    snap: MatrixSnapshot,
+    max_distance: Optional[float] = None,
+) -> List[NearTrigger]:
+    """
+    返回恰好缺一个周期即可成立的白名单组合（按距离从近到远）。
+    每个组合先用位图向量化筛出候选 symbol（组合周期均在其 universe 中、缺失位恰好 1 个），只对候选逐个构造结果。
+    缺失周期尚无数据的不返回；max_distance 给定时，只保留缺失周期距阈值不超过该值的结果。
+    """
+    out: List[NearTrigger] = []
+    tracked = snap.tracked_mask()
+    for side in SIDES:
+        active, _ = snap.masks(side)
+        for combo in _COMBOS:
+            m = snap.mask_of(combo)
+            if m < 0:
+                continue
+            missing = np.bitwise_and(~active, m)
+            # 缺失位恰好 1 个：missing != 0 且 missing & (missing - 1) == 0
+            # 组合含该 symbol 未跟踪的周期时永远不会成立
+            candidates = np.flatnonzero(
+                (np.bitwise_and(tracked, m) == m) & (missing != 0) & (np.bitwise_and(missing, missing - 1) == 0)
+            )
+            for r in candidates:
+                c = int(missing[r]).bit_length() - 1
+                value = float(snap.values[r, c])
+                dist = _distance(side, value)
+                if not math.isfinite(dist) or (max_distance is not None and dist > max_distance):
+                    continue
+                out.append(NearTrigger(
+                    symbol=snap.symbols[r], side=side, combo=combo,
+                    missing=snap.intervals[c], value=value, distance=dist,
+                ))
+    out.sort(key=lambda n: (n.distance, n.symbol))
+    return out
+
+
+def near_trigger_symbols(
+    state: "AppState",
+    max_distance: Optional[float] = None,
+    now_ts: Optional[float] = None,
+) -> Dict[str, set[str]]:
+    """内部接口（预取等）：symbol → 临近触发组合的 max_iv 集合。"""
+    out: Dict[str, set[str]] = {}
+    for n in find_near_triggers(take_snapshot(state, now_ts), max_distance):
+        out.setdefault(n.symbol, set()).add(n.combo[0])
+    return out
+
+
+def near_trigger_payload(state: "AppState", max_distance: Optional[float] = None) -> Dict[str, Any]:
+    snap = take_snapshot(state)
+    items = find_near_triggers(snap, max_distance)
+    return {
+        "ts": snap.ts,
+        "max_distance": max_distance,
+        "items": [
+            {
+                "symbol": n.symbol,
+                "side": n.side.value,
+                "combo": "+".join(n.combo),
+                "missing": n.missing,
+                "value": n.value,
+                "distance": round(n.distance, 2),
+            }
+            for n in items
+        ],
+    }
+
+
+def build_near_trigger_text(state: "AppState", max_distance: Optional[float] = None) -> str:
+    """/near 命令：差一个周期即可成立的组合，按距离排序。"""
+    items = find_near_triggers(take_snapshot(state), max_distance)
+    title = "⏳ 临近触发" + (f"（距离 ≤ {max_distance:g}）" if max_distance is not None else "")
+    lines = [title]
+    if not items:
+        lines.append("  暂无临近触发的组合")
+        return "\n".join(lines)
+    for n in items:
+        dot = "🔴" if n.side == Side.OVERBOUGHT else "🟢"
+        lines.append(
+            f"  {dot} {n.symbol.replace('USDT', '')} {'+'.join(n.combo)} 缺 {n.missing}: "
+            f"{n.value:.2f}（差 {n.distance:.2f}）"
+        )
+    return "\n".join(lines)
@@ -6,7 +6,9 @@ import logging
 from zoneinfo import ZoneInfo
 from typing import TYPE_CHECKING
 
-from ..config import settings, get_universe
+from ..config import settings
+from ..domain.models import Side
+from .matrix_service import take_snapshot
 
 if TYPE_CHECKING:
     from ..infra.store import AppState
@@ -30,21 +32,12 @@ def _next_et_4h_boundary() -> datetime.datetime:
 
 
 def build_scan_text(state: "AppState") -> str:
-    uni = get_universe()
+    snap = take_snapshot(state)
     lines = ["📊 超买/超卖快照（1D-15m）"]
     any_result = False
     for iv in _INTERVALS:
-        ob_in, os_in = [], []
-        for symbol, allowed_ivs in sorted(uni.items()):
-            if iv not in allowed_ivs:
-                continue
-            rec = state.cache.get((symbol, iv))
-            if rec is None:
-                continue
-            if rec.in_overbought:
-                ob_in.append(symbol.replace("USDT", ""))
-            if rec.in_oversold:
-                os_in.append(symbol.replace("USDT", ""))
+        ob_in = [s.replace("USDT", "") for s in snap.symbols_at(iv, Side.OVERBOUGHT)]
+        os_in = [s.replace("USDT", "") for s in snap.symbols_at(iv, Side.OVERSOLD)]
         if not (ob_in or os_in):
             continue
         any_result = True
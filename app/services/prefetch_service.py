@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import numpy as np
+
+from ..config import settings
+from ..infra.binance_weight import background_priority
+from ..infra.chart import _chart_intervals_for, prefetch_panel
+from ..infra.obos_matrix import OUT, MatrixSnapshot
+from .matrix_service import take_snapshot
+
+if TYPE_CHECKING:
+    from ..infra.store import AppState
+
+logger = logging.getLogger(__name__)
+
+# 在这些周期处于 IN/WARM 的标的，视为下一根收盘时可能推送
+_ACTIVE_LEVELS = ("1D", "4h", "1h")
+
+# 子图周期；按 15m 边界调度，每个边界 3m / 15m 都收盘，1h / 4h / 1D 在其整点收盘
+_CLOSE_INTERVALS = ("3m", "15m", "1h", "4h", "1D")
+_STEP_SEC = 15 * 60
+
+
+def prefetch_targets(snap: MatrixSnapshot, max_symbols: int) -> Dict[str, List[str]]:
+    """
+    symbol → 需要预取的子图周期（推送时 _chart_intervals_for 会用到的并集）。
+    按 IN/WARM 的周期数从多到少取前 max_symbols 个。
+    """
+    levels = [iv for iv in _ACTIVE_LEVELS if snap.col(iv) is not None]
+    if not levels or not snap.symbols:
+        return {}
+    cols = [snap.col(iv) for iv in levels]
+    active = (snap.states[:, cols, :] != OUT).any(axis=2)    # [S, len(levels)]
+    counts = active.sum(axis=1)
+    rows = [int(r) for r in np.argsort(-counts, kind="stable") if counts[r]][:max_symbols]
+    return {
+        snap.symbols[r]: list(dict.fromkeys(
+            iv for lv, on in zip(levels, active[r]) if on for iv in _chart_intervals_for(lv)
+        ))
+        for r in rows
+    }
+
+
+class BarClosePrefetcher:
+    """
+    每个 15m / 1h / 4h / 1D 收盘后 PREFETCH_DELAY_SEC 秒，把可能推送的标的中刚收盘周期的子图K线
+    预取进K线缓存（及 EMA 状态），紧随其后的 webhook 出图时无需再等待拉取。
+    未收盘周期的子图缓存仍有效，不重复拉取。
+    预取按后台优先级请求 Binance，并发受 PREFETCH_CONCURRENCY 限制。
+    """
+
+    def __init__(self, state: "AppState") -> None:
+        self.state = state
+        self.runs = 0
+        self.panels = 0
+        self.failures = 0
+
+    async def run_loop(self) -> None:
+        while True:
+            now = time.time()
+            close_ts = (now // _STEP_SEC + 1) * _STEP_SEC
+            await asyncio.sleep(close_ts - now + settings.PREFETCH_DELAY_SEC)
+            closed = [iv for iv in _CLOSE_INTERVALS if int(close_ts) % settings.INTERVAL_SECONDS[iv] == 0]
+            try:
+                await self.prefetch(closed)
+            except Exception:
+                logger.warning("[Prefetch] 预取异常", exc_info=True)
+
+    async def prefetch(self, closed: List[str], now_ts: Optional[float] = None) -> int:
+        """预取一次（只预取 closed 中周期的子图），返回成功加载的子图数。"""
+        targets = prefetch_targets(take_snapshot(self.state, now_ts), settings.PREFETCH_MAX_SYMBOLS)
+        jobs = [(s, iv) for s, ivs in targets.items() for iv in ivs if iv in closed]
+        if not jobs:
+            return 0
+        sem = asyncio.Semaphore(settings.PREFETCH_CONCURRENCY)
+
+        async def one(symbol: str, iv: str) -> bool:
+            async with sem:
+                with background_priority():
+                    return await prefetch_panel(symbol, iv)
+
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*[one(s, iv) for s, iv in jobs], return_exceptions=True)
+        loaded = sum(r is True for r in results)
+        self.runs += 1
+        self.panels += loaded
+        self.failures += len(jobs) - loaded
+        logger.info(
+            f"[Prefetch] {'/'.join(closed)} 收盘：预取 {len({s for s, _ in jobs})} 个标的 "
+            f"{loaded}/{len(jobs)} 个子图，{(time.perf_counter() - t0) * 1000:.0f}ms"
+        )
+        return loaded
@@ -3,8 +3,8 @@ import asyncio
 import hashlib
 from fastapi import Request
 from typing import List, Dict, TYPE_CHECKING
-from .resonance_combinations import canonical_combo, match_combinations_with_lifecycle, COMBINATION_ROUTING, SILENT_COMBINATIONS
-from .resonance_combinations import ALLOWED_COMBINATIONS
+from .resonance_combinations import canonical_combo, COMBINATION_ROUTING, SILENT_COMBINATIONS
+from .combo_mask import COMBO_TABLE
 from ..config import settings, universe, routing_rules,get_routing_rules,get_universe, get_us_stock_symbols
 from ..domain.models import (
     Side,
@@ -12,13 +12,13 @@ from ..domain.models import (
     TvEvent,
     IntervalState,
     ResonanceSnapshot,
+    Transition,
 )
 from ..infra.store import AppState
 from ..infra.utils import is_crypto_symbol
 from ..adapters.tg_client import TelegramClient
 from .router import (
     choose_topic_by_max_interval,
-    max_interval,
     apply_min_interval_floor,
 )
 from ..infra.chart import send_with_chart
@@ -33,6 +33,10 @@ logger = logging.getLogger(__name__)
 
 
 
+# 价格警报附带展示的 ob/os 周期
+_PRICE_ALERT_OBOS_INTERVALS = ("1D", "4h", "1h", "15m")
+
+
 def _side_zh(side: Side) -> str:
     return "超买" if side == Side.OVERBOUGHT else "超卖"
 
@@ -112,6 +116,38 @@ class ResonanceService:
         self.tg = tg
         self.exhaustion_svc = exhaustion_svc
 
+    def _update_states(self, event: TvEvent) -> set[Side]:
+        """更新各周期缓存与心跳，返回 IN/WARM 成员发生变化的方向。"""
+        changed_sides: set[Side] = set()
+        for sig in event.signals:
+            interval = sig.interval
+            value = float(sig.values[0])
+            trans = self.state.update_interval(
+                symbol=event.symbol,
+                interval=interval,
+                value=value,
+                ob_level=settings.OB_LEVEL,
+                os_level=settings.OS_LEVEL,
+                now_ts=event.ts,  # 使用事件时间戳记录退出时间
+            )
+            for side in (Side.OVERSOLD, Side.OVERBOUGHT):
+                if trans.for_side(side) != Transition.NONE:
+                    changed_sides.add(side)
+            # crypto 资产：通道外部心跳到达时记录时间戳，供调度器判断缺席
+            if is_crypto_symbol(event.symbol) and (
+                value >= settings.OB_LEVEL or value <= settings.OS_LEVEL
+            ):
+                self.state.record_heartbeat(event.symbol, interval, event.ts)
+        return changed_sides
+
+    def update_state_only(self, event: TvEvent) -> None:
+        """
+        无规则消费的周期（见 interval_relevance）走的最小路径：
+        只更新 cache 供 /cache、/scan 查询，不做共振评估。event 须已经过 filter_by_universe。
+        """
+        logger.debug(f"[Relevance] 无规则消费的周期，仅更新状态: {event.symbol} {[s.interval for s in event.signals]}")
+        self._update_states(event)
+
     async def handle_event(self, event: TvEvent):
         logger.debug("  \n\n\n\n\n\n\n\n")
         logger.info(f"收到Event数据\nevent:{event}")
@@ -123,24 +159,7 @@ class ResonanceService:
             return
         # logger.debug(f"step1:过滤不在 universe 中的 symbol / interval后：{event2}")
         # Step 2️⃣：更新状态缓存（AppState），记录最新值和 IN 状态转换
-        # intervals_updated = set()
-        for sig in event2.signals:
-            interval = sig.interval
-            value = float(sig.values[0])
-            self.state.update_interval(
-                symbol=event2.symbol,
-                interval=interval,
-                value=value,
-                ob_level=settings.OB_LEVEL,
-                os_level=settings.OS_LEVEL,
-                now_ts=event2.ts,  # 使用事件时间戳记录退出时间
-            )
-            # crypto 资产：通道外部心跳到达时记录时间戳，供调度器判断缺席
-            if is_crypto_symbol(event2.symbol) and (
-                value >= settings.OB_LEVEL or value <= settings.OS_LEVEL
-            ):
-                self.state.record_heartbeat(event2.symbol, interval, event2.ts)
-            # intervals_updated.add(interval)
+        changed_sides = self._update_states(event2)
         # logger.debug(f"Step2:更新状态缓存：{self.state.cache}")
         allowed_intervals = get_universe().get(event2.symbol,[])
         # allowed_intervals = universe.get(event2.symbol, [])
@@ -150,8 +169,22 @@ class ResonanceService:
         # Step 3️⃣：每个方向单独处理（超买/超卖）
         for side in (Side.OVERSOLD, Side.OVERBOUGHT):
             logger.debug(f"============ 开始处理：{side} ============")
+            # Step 3.0：IN/WARM 成员未变化且无 warm 到期 → 评估结果不变，跳过
+            if not self.state.needs_resonance_eval(
+                symbol=event2.symbol,
+                side=side,
+                allowed_intervals=allowed_intervals,
+                membership_changed=side in changed_sides,
+                now_ts=event2.ts,
+            ):
+                logger.debug(f"{event2.symbol}-{side} IN/WARM 成员未变化，跳过共振评估")
+                continue
+
             states: Dict[str, IntervalState] = {}
-            
+            current_mask = 0   # IN/WARM 周期位图
+            in_mask = 0        # 仅 IN 周期位图（升级判定用）
+            next_warm_expiry: float | None = None  # 最早到期的 WARM 周期
+
             # Step 3.1：构建所有周期的状态字典（IN / WARM / OUT）
             for iv in allowed_intervals:
                 rec = self.state.cache.get((event2.symbol, iv))
@@ -165,6 +198,9 @@ class ResonanceService:
                     # 此处event2.ts就是推送时间，即k线收盘时间
                     elif self.state.is_warm(event2.symbol, iv, side, now_ts=event2.ts):
                         st = LevelState.WARM
+                        expiry = self.state.warm_expiry_ts(event2.symbol, iv, side)
+                        if expiry is not None and (next_warm_expiry is None or expiry < next_warm_expiry):
+                            next_warm_expiry = expiry
                     # 一旦判定这个窗口为OUT， 立刻重置以此窗口作为最大窗口的组合。
                     else:
                         key = (event2.symbol, side, iv)
@@ -181,6 +217,14 @@ class ResonanceService:
                                 logger.warning(f"[失效清理] {event2.symbol}-{side} 组合 {combo} 的最大周期 {iv} 已 OUT，标记为 inactive")
                                 meta["active"] = False
                 states[iv] = IntervalState(interval=iv, state=st, value=v)
+                if st != LevelState.OUT:
+                    bit = COMBO_TABLE.bits.get(iv, 0)
+                    current_mask |= bit
+                    if st == LevelState.IN:
+                        in_mask |= bit
+            self.state.record_resonance_eval(
+                event2.symbol, side, allowed_intervals, next_warm_expiry
+            )
             # logger.debug(f"构建的临时字典 表示每个周期状态：{states}")
             # Step 3.2：提取所有处于 IN/WARM 状态的周期
             raw_in_intervals = [
@@ -233,30 +277,19 @@ class ResonanceService:
             # )
             combo_results_by_max_iv: dict[str, list[tuple[tuple[str, ...], bool]]] = defaultdict(list)
             combo_results_all = []
-            
-            # ★ 核心改动：按 max_iv（= topic）循环
-            for max_iv in set(
-                max_interval(combo) for combo in COMBINATION_ROUTING.keys()
-                if all(iv in raw_in_intervals for iv in combo)
-            ):
-                if max_iv is None:
-                    logger.warning("max_iv计算出错为None")
-                    continue
-                allowed = [
-                    combo for combo in ALLOWED_COMBINATIONS
-                    if max_interval(combo) == max_iv
-                ]
-                
+
+            # ★ 核心改动：按 max_iv（= topic）循环，组合匹配走预编译位图
+            for max_iv in COMBO_TABLE.active_groups(current_mask):
                 last_active = self.state.last_active_combo.get(
                     (event2.symbol, side, max_iv)
                 )
 
-                combo_results = match_combinations_with_lifecycle(
-                    raw_intervals=raw_in_intervals,
-                    states=states,
+                combo_results = COMBO_TABLE.match(
+                    max_iv=max_iv,
+                    current_mask=current_mask,
+                    in_mask=in_mask,
                     pushed_combos=self.state.latest_combo_state[(event2.symbol, side)],
                     last_active_combo=last_active,
-                    allowed_combo=allowed
                 )
 
                 combo_results_all.extend(combo_results)
@@ -300,23 +333,7 @@ class ResonanceService:
                     }
 
                 # ===== Step 5.2：topic 内取大（dominance 过滤，仅影响展示）=====
-                combos = [combo for combo, _ in results]
-                suppressed: set[tuple[str, ...]] = set()
-
-                for base in combos:
-                    base_set = set(base)
-                    for higher in combos:
-                        if base == higher:
-                            continue
-                        if base_set < set(higher):
-                            suppressed.add(base)
-                            break
-
-                visible_results = [
-                    (combo, is_upgrade)
-                    for combo, is_upgrade in results
-                    if combo not in suppressed
-                ]
+                visible_results = COMBO_TABLE.suppress_dominated(results)
 
                 if not visible_results:
                     continue
@@ -418,7 +435,7 @@ class ResonanceService:
         obos_lines = []
         if symbol:
             allowed_ivs = get_universe().get(symbol) or []
-            for iv in ("1D", "4h", "1h", "15m"):
+            for iv in _PRICE_ALERT_OBOS_INTERVALS:
                 if iv not in allowed_ivs:
                     continue
                 rec = self.state.cache.get((symbol, iv))
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import math
 import time
 from typing import List
 
@@ -11,8 +12,14 @@ from ..config import settings, get_universe
 from ..domain.models import Side, LevelState
 from ..infra.store import AppState
 from ..infra.stats import MessageStats
-from ..infra.chart import set_analysis_enabled, is_analysis_enabled
+from ..infra.chart import (
+    set_analysis_enabled, is_analysis_enabled, kline_cache_stats, kline_fetch_stats, kline_stream_stats,
+    render_pool_stats, get_ohlcv_archive, analysis_queue_stats, render_scheduler_stats,
+)
+from ..infra.http_pool import binance_http_stats
+from ..infra.binance_weight import binance_weight_stats
 from ..services.market_briefing_service import set_briefing_enabled, is_briefing_enabled, MarketBriefingService
+from ..services.matrix_service import build_matrix_text, build_near_trigger_text
 from ..adapters.tg_client import TelegramClient
 from ..infra.utils import ts_to_utc_str
 
@@ -59,6 +66,10 @@ def _main_menu_keyboard() -> dict:
                 {"text": "➕ add",        "callback_data": "cmd:add"},
                 {"text": "➖ remove",     "callback_data": "sel:remove"},
             ],
+            [
+                {"text": "🧮 matrix",     "callback_data": "cmd:matrix"},
+                {"text": "⏳ near",       "callback_data": "cmd:near"},
+            ],
         ]
     }
 
@@ -123,6 +134,8 @@ COMMANDS = """/cache <symbol>      — 各周期 IN/WARM/OUT 状态
 /divergence <symbol> — 各周期上次背离触发时间
 /tracking            — 当前衰竭追踪窗口
 /scan [interval]     — 扫描全量标的超买/超卖（如 /scan 4h）
+/matrix              — 全量标的当前满足的白名单共振组合
+/near [distance]     — 差一个周期即可成立的组合（如 /near 5）
 /check <symbol>      — 查询品种是否在 universe 中
 /add <symbol>        — 添加品种到 universe
 /remove <symbol>     — 从 universe 移除品种
@@ -307,7 +320,7 @@ def _handle_check(symbol: str) -> str:
         return f"❌ {symbol} 不在 universe 中"
 
 
-def _handle_stats(stats: MessageStats) -> str:
+def _handle_stats(stats: MessageStats, state: AppState | None = None) -> str:
     import datetime
     counts = stats.get_current()
     tokens = stats.get_token_stats()
@@ -343,6 +356,106 @@ def _handle_stats(stats: MessageStats) -> str:
         if tokens.cache_creation_tokens:
             lines.append(f"  缓存写入: {tokens.cache_creation_tokens:,}")
         lines.append(f"  估算成本: ${cost:.4f}")
+        aq = analysis_queue_stats()
+        if aq is not None:
+            lines.append(
+                f"  队列: 排队 {aq['pending']}  进行中 {aq['running']}  丢弃 {aq['dropped']}  失败 {aq['failed']}"
+                f"  等待 p50 {aq['wait_p50_ms'] / 1000:.1f}s  max {aq['wait_max_ms'] / 1000:.1f}s"
+            )
+
+    chart_cache = stats.get_chart_cache_stats()
+    chart_total = chart_cache.hits + chart_cache.misses
+    if chart_total:
+        lines.append("")
+        lines.append("🖼 图表缓存（今日）")
+        lines.append(f"  命中: {chart_cache.hits}  未命中: {chart_cache.misses}（命中率 {chart_cache.hits / chart_total:.0%}）")
+    quality = stats.get_chart_quality_stats()
+    degraded = sum(n for name, n in quality.items() if name != "full")
+    if degraded:
+        lines.append("")
+        lines.append(f"📉 画质降级（今日 {degraded} 次）")
+        lines.append("  " + "  ".join(f"{name}: {n}" for name, n in quality.items()))
+    enc = stats.get_chart_encode_stats()
+    if enc.renders or enc.uploads:
+        lines.append("")
+        lines.append("🗜 图表编码（今日）")
+        if enc.renders:
+            lines.append(
+                f"  编码: {enc.renders} 次  平均 {enc.encode_ms_total / enc.renders:.0f}ms  max {enc.encode_ms_max:.0f}ms"
+                f"  平均 {enc.encoded_bytes / enc.renders / 1024:.0f} KB"
+            )
+        if enc.uploads:
+            lines.append(
+                f"  上传: {enc.uploads} 张  共 {enc.upload_bytes / 1024 / 1024:.1f} MB  max {enc.upload_bytes_max / 1024:.0f} KB"
+            )
+
+    if state is not None:
+        evaluated = state.resonance_eval_counts["evaluated"]
+        skipped = state.resonance_eval_counts["skipped"]
+        total_eval = evaluated + skipped
+        if total_eval:
+            lines.append("")
+            lines.append("⚙️ 共振评估（启动以来）")
+            lines.append(f"  执行: {evaluated:,}")
+            lines.append(f"  跳过: {skipped:,}（{skipped / total_eval:.0%}）")
+
+    kc = kline_cache_stats()
+    kc_total = kc["hits"] + kc["partial"] + kc["misses"] + kc["stale"]
+    if kc_total:
+        lines.append("")
+        lines.append("🕯 K线缓存（启动以来）")
+        lines.append(f"  命中: {kc['hits']:,}  增量: {kc['partial']:,}  全量: {kc['misses']:,}  旧数据: {kc['stale']:,}（命中率 {kc['hit_rate']:.0%}）")
+        lines.append(f"  节省下载: {kc['bytes_saved'] / 1024 / 1024:.1f} MB  占用内存: {kc['mem_bytes'] / 1024 / 1024:.1f} MB")
+        archive = get_ohlcv_archive()
+        if archive is not None:
+            ar = archive.stats()
+            lines.append(
+                f"  归档: 恢复 {kc['archive_loads']:,}  读取 {ar['reads']:,}  "
+                f"写入 {ar['rows_written']:,} 根（重写 {ar['rewrites']:,}）"
+            )
+        ks = kline_stream_stats()
+        if ks is not None:
+            age = f"{ks['last_message_age_s']:.0f}s 前" if ks["last_message_age_s"] is not None else "无"
+            lines.append(
+                f"  推流: {ks['streams']} 路 / 连接 {ks['connected']}  消息: {ks['messages']:,}  "
+                f"重连: {ks['reconnects']}  回补: {ks['backfilled']}  最近: {age}"
+            )
+
+    http = binance_http_stats()
+    if http and http["requests"]:
+        versions = " ".join(f"{v}×{n}" for v, n in http["http_versions"].items())
+        lines.append("")
+        lines.append("🌐 Binance 请求（启动以来）")
+        lines.append(f"  次数: {http['requests']:,}  失败: {http['errors']:,}  {versions}")
+        lines.append(f"  延迟: p50 {http['p50_ms']:.0f}ms  p95 {http['p95_ms']:.0f}ms  max {http['max_ms']:.0f}ms")
+        bw = binance_weight_stats()
+        lines.append(
+            f"  权重: 剩余 {bw['remaining']:,}/{bw['limit']:,}  排队: 推送 {bw['push_waits']} 后台 {bw['background_waits']}"
+            f"  放弃: 推送 {bw['push_rejected']} 后台 {bw['background_rejected']}  418/429: {bw['bans']}"
+        )
+        kf = kline_fetch_stats()
+        if kf["coalesced"]:
+            lines.append(f"  并发合并: {kf['coalesced']:,} / {kf['requests']:,} 次K线请求")
+
+    rs = render_scheduler_stats()
+    if rs["jobs"] or rs["dropped"]:
+        lines.append("")
+        lines.append(f"🗓 出图调度（并发上限 {rs['max_concurrent']}）")
+        lines.append(
+            f"  任务: {rs['jobs']:,}  进行中: {rs['running']}  排队中: {rs['depth']}  最大排队: {rs['max_depth']}"
+            f"  超时只发文字: {rs['dropped']}"
+        )
+        lines.append(f"  排队: p50 {rs['wait_p50_ms']:.0f}ms  p95 {rs['wait_p95_ms']:.0f}ms")
+        lines.append(f"  出图: p50 {rs['run_p50_ms']:.0f}ms  p95 {rs['run_p95_ms']:.0f}ms")
+
+    rp = render_pool_stats()
+    if rp and rp["jobs"]:
+        lines.append("")
+        lines.append(f"🖼 渲染进程池（{rp['workers']} 进程）")
+        lines.append(f"  任务: {rp['jobs']:,}  排队中: {rp['depth']}  最大排队: {rp['max_depth']}  异常: {rp['failures']}")
+        lines.append(f"  渲染: p50 {rp['render_p50_ms']:.0f}ms  p95 {rp['render_p95_ms']:.0f}ms")
+        lines.append(f"  等待: p50 {rp['wait_p50_ms']:.0f}ms  p95 {rp['wait_p95_ms']:.0f}ms")
+        lines.append(f"  编码: p50 {rp['encode_p50_ms']:.0f}ms  p95 {rp['encode_p95_ms']:.0f}ms")
 
     return "\n".join(lines)
 
@@ -400,19 +513,11 @@ def _handle_scan(state: AppState, interval: str | None) -> str:
 
     lines = [title]
     any_result = False
+    snap = state.obos_matrix.snapshot(time.time(), uni)
 
     for iv in intervals_to_scan:
-        ob_in, os_in = [], []
-        for symbol, allowed_ivs in sorted(uni.items()):
-            if iv not in allowed_ivs:
-                continue
-            rec = state.cache.get((symbol, iv))
-            if rec is None:
-                continue
-            if rec.in_overbought:
-                ob_in.append(symbol.replace("USDT", ""))
-            if rec.in_oversold:
-                os_in.append(symbol.replace("USDT", ""))
+        ob_in = [s.replace("USDT", "") for s in snap.symbols_at(iv, Side.OVERBOUGHT)]
+        os_in = [s.replace("USDT", "") for s in snap.symbols_at(iv, Side.OVERSOLD)]
 
         if not (ob_in or os_in):
             continue
@@ -469,8 +574,12 @@ async def _process_callback_query(
             text = _handle_tracking(state, now_ts)
         elif action == "universe":
             text = _handle_universe()
+        elif action == "matrix":
+            text = build_matrix_text(state, now_ts)
+        elif action == "near":
+            text = build_near_trigger_text(state)
         elif action == "stats":
-            text = _handle_stats(stats) if stats is not None else "统计模块未启用"
+            text = _handle_stats(stats, state) if stats is not None else "统计模块未启用"
         elif action == "help":
             text = COMMANDS
         elif action == "add":
@@ -561,6 +670,16 @@ def _parse_command(text: str):
     return cmd, arg
 
 
+def _parse_near_distance(arg: str | None) -> float | None:
+    """/near 的距离参数：无参数返回 None；不是非负有限数（含 nan / inf / 负数）时抛 ValueError"""
+    if not arg:
+        return None
+    distance = float(arg)
+    if not math.isfinite(distance) or distance < 0:
+        raise ValueError(f"invalid distance: {arg}")
+    return distance
+
+
 async def _process_update(update: dict, state: AppState, tg: TelegramClient, owner_chat_id: str, stats: MessageStats | None = None, briefing_svc: MarketBriefingService | None = None) -> None:
     # callback_query（按钮点击）
     if "callback_query" in update:
@@ -648,6 +767,17 @@ async def _process_update(update: dict, state: AppState, tg: TelegramClient, own
     elif cmd == "/tracking":
         reply = _handle_tracking(state, now_ts)
 
+    elif cmd == "/matrix":
+        reply = build_matrix_text(state, now_ts)
+
+    elif cmd == "/near":
+        try:
+            distance = _parse_near_distance(arg)
+        except ValueError:
+            reply = "用法: /near [distance]，例如 /near 5"
+        else:
+            reply = build_near_trigger_text(state, distance)
+
     elif cmd == "/check":
         if not arg:
             reply = "用法: /check <symbol>，例如 /check BTCUSDT"
@@ -670,7 +800,7 @@ async def _process_update(update: dict, state: AppState, tg: TelegramClient, own
         reply = _handle_universe()
 
     elif cmd == "/stats":
-        reply = _handle_stats(stats) if stats is not None else "统计模块未启用"
+        reply = _handle_stats(stats, state) if stats is not None else "统计模块未启用"
 
     elif cmd == "/analysis":
         if arg == "ON":
@@ -721,6 +851,8 @@ COMMAND_MENU = [
     {"command": "divergence", "description": "查询各周期上次背离触发时间，如 /divergence BTCUSDT"},
     {"command": "scan",      "description": "扫描超买/超卖标的，如 /scan 4h 或 /scan 1h"},
     {"command": "tracking",  "description": "查看当前活跃的衰竭追踪窗口"},
+    {"command": "matrix",    "description": "全量标的当前满足的白名单共振组合"},
+    {"command": "near",      "description": "差一个周期即可成立的组合，如 /near 5"},
     {"command": "check",    "description": "查询品种是否在 universe 中，如 /check BTCUSDT"},
     {"command": "add",      "description": "添加品种到 universe，如 /add SOLUSDT"},
     {"command": "remove",   "description": "从 universe 移除品种，如 /remove SOLUSDT"},
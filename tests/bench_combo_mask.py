@@ -0,0 +1,85 @@
+"""
+微基准：组合匹配 旧版（set/tuple 嵌套循环）vs 位图版
+
+运行方式（项目根目录，需配置 .env）：
+    python -m tests.bench_combo_mask
+"""
+
+import logging
+import random
+import timeit
+
+from app.domain.models import IntervalState, LevelState
+from app.services.combo_mask import COMBO_TABLE
+from app.services.resonance_combinations import (
+    ALLOWED_COMBINATIONS,
+    COMBINATION_ROUTING,
+    match_combinations_with_lifecycle,
+)
+from app.services.router import max_interval
+
+N_CASES = 2000
+REPEAT = 5
+
+_INTERVALS = ["1W", "1D", "4h", "1h", "15m", "5m", "3m", "30s"]
+
+
+def _make_cases():
+    rng = random.Random(0)
+    cases = []
+    for _ in range(N_CASES):
+        states = {
+            iv: IntervalState(
+                interval=iv,
+                state=rng.choice([LevelState.IN, LevelState.WARM, LevelState.OUT, LevelState.OUT]),
+                value=0.0,
+            )
+            for iv in _INTERVALS
+        }
+        cases.append(states)
+    return cases
+
+
+def _legacy(states):
+    raw = [iv for iv, st in states.items() if st.state in (LevelState.IN, LevelState.WARM)]
+    for max_iv in {
+        max_interval(combo) for combo in COMBINATION_ROUTING.keys()
+        if all(iv in raw for iv in combo)
+    }:
+        allowed = [c for c in ALLOWED_COMBINATIONS if max_interval(c) == max_iv]
+        results = match_combinations_with_lifecycle(raw, states, {}, None, allowed)
+        combos = [c for c, _ in results]
+        suppressed = set()
+        for base in combos:
+            for higher in combos:
+                if base != higher and set(base) < set(higher):
+                    suppressed.add(base)
+                    break
+
+
+def _masked(states):
+    current_mask = 0
+    in_mask = 0
+    for iv, st in states.items():
+        if st.state != LevelState.OUT:
+            bit = COMBO_TABLE.bits.get(iv, 0)
+            current_mask |= bit
+            if st.state == LevelState.IN:
+                in_mask |= bit
+    for max_iv in COMBO_TABLE.active_groups(current_mask):
+        results = COMBO_TABLE.match(max_iv, current_mask, in_mask, {}, None)
+        COMBO_TABLE.suppress_dominated(results)
+
+
+def main():
+    # 旧版 matcher 每次调用都会打 warning 日志，基准中关闭以只比较计算开销
+    logging.disable(logging.CRITICAL)
+    cases = _make_cases()
+
+    for name, fn in (("legacy", _legacy), ("bitmask", _masked)):
+        best = min(timeit.repeat(lambda: [fn(s) for s in cases], number=1, repeat=REPEAT))
+        print(f"{name:8s} {best / N_CASES * 1e6:8.2f} µs/side")
+
+
+if __name__ == "__main__":
+    main()
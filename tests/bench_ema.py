@@ -0,0 +1,53 @@
+"""
+微基准：EMA 纯 Python 循环（原 _compute_ema） vs NumPy 分块扫描（indicators.ema）
+
+图表每个子图计算 EMA21/55/100/200，最多 4 个子图、1500 根K线；
+衰竭规则每 180s 对每个追踪窗口计算 EMA21/200。
+
+运行方式（项目根目录）：
+    python -m tests.bench_ema
+"""
+
+import timeit
+
+import numpy as np
+
+from app.infra.indicators import ema
+from tests.test_indicators import reference_ema
+
+N_BARS = 1500
+PERIODS = (21, 55, 100, 200)
+REPEAT = 7
+NUMBER = 20
+
+
+def main():
+    rng = np.random.default_rng(0)
+    arr = 30000 + np.cumsum(rng.normal(0, 50, N_BARS))
+    prices = arr.tolist()
+
+    worst = 0.0
+    for p in PERIODS:
+        want = np.array(reference_ema(prices, p))
+        got = ema(arr, p)
+        mask = ~np.isnan(want)
+        worst = max(worst, float(np.max(np.abs(got[mask] - want[mask]) / np.abs(want[mask]))))
+    print(f"最大相对误差: {worst:.2e}")
+
+    def py():
+        for p in PERIODS:
+            reference_ema(prices, p)
+
+    def vec():
+        for p in PERIODS:
+            ema(arr, p)
+
+    t_py = min(timeit.repeat(py, number=NUMBER, repeat=REPEAT)) / NUMBER
+    t_np = min(timeit.repeat(vec, number=NUMBER, repeat=REPEAT)) / NUMBER
+    print(f"python  {t_py * 1e6:9.1f} µs / 4 条EMA × {N_BARS} 根")
+    print(f"numpy   {t_np * 1e6:9.1f} µs / 4 条EMA × {N_BARS} 根")
+    print(f"加速    {t_py / t_np:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
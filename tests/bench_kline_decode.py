@@ -0,0 +1,82 @@
+"""
+微基准：Binance klines 响应体解码
+
+  - pandas：json.loads → 12 列 DataFrame（pd.to_datetime + astype(float)，原 _binance_to_df）
+  - json：json.loads → klines_to_array（逐行切片后交给 NumPy）
+  - decode：decode_klines（响应体字节直接解析为 float64 [n, 6]，不经 json / pandas）
+
+每次推送每个子图最多拉取 1500 根K线；对比单次解码的 CPU 耗时与峰值内存分配（tracemalloc）。
+
+运行方式（项目根目录）：
+    python -m tests.bench_kline_decode
+"""
+
+import json
+import time
+import timeit
+import tracemalloc
+
+import numpy as np
+
+from app.infra.kline_cache import decode_klines, klines_to_array
+
+N_BARS = (100, 500, 1500)
+REPEAT = 7
+NUMBER = 20
+_BAR_MS = 3600 * 1000
+
+
+def _body(n: int) -> bytes:
+    rng = np.random.default_rng(0)
+    close = 30000 + np.cumsum(rng.normal(0, 50, n))
+    rows = []
+    for i, c in enumerate(close):
+        o = 1_700_000_000_000 + i * _BAR_MS
+        rows.append([
+            o, f"{c - 10:.2f}", f"{c + 25:.2f}", f"{c - 30:.2f}", f"{c:.2f}", f"{rng.uniform(100, 5000):.3f}",
+            o + _BAR_MS - 1, f"{rng.uniform(1e6, 1e8):.5f}", int(rng.integers(1000, 90000)),
+            f"{rng.uniform(50, 2500):.3f}", f"{rng.uniform(5e5, 5e7):.5f}", "0",
+        ])
+    return json.dumps(rows, separators=(",", ":")).encode()
+
+
+def _pandas(body: bytes):
+    import pandas as pd
+    df = pd.DataFrame(json.loads(body), columns=[
+        "Open_time", "Open", "High", "Low", "Close", "Volume",
+        "Close_time", "Quote_vol", "Trades", "Taker_base", "Taker_quote", "Ignore",
+    ])
+    df["Open_time"] = pd.to_datetime(df["Open_time"], unit="ms", utc=True)
+    df.set_index("Open_time", inplace=True)
+    for col in ["Open", "High", "Low", "Close", "Volume"]:
+        df[col] = df[col].astype(float)
+    return df[["Open", "High", "Low", "Close", "Volume"]]
+
+
+def _json(body: bytes):
+    return klines_to_array(json.loads(body))
+
+
+def _peak_kb(fn, body: bytes) -> float:
+    tracemalloc.start()
+    fn(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    _pandas(_body(10))   # 预热 pandas 导入
+    for n in N_BARS:
+        body = _body(n)
+        np.testing.assert_array_equal(decode_klines(body), _json(body))
+        print(f"\n{n} 根K线（响应体 {len(body) / 1024:.0f} KB）")
+        base = None
+        for name, fn in (("pandas", _pandas), ("json", _json), ("decode", decode_klines)):
+            t = min(timeit.repeat(lambda: fn(body), number=NUMBER, repeat=REPEAT, timer=time.process_time)) / NUMBER
+            base = base or t
+            print(f"  {name:7s} CPU {t * 1e6:9.1f} µs   峰值分配 {_peak_kb(fn, body):8.1f} KB   加速 {base / t:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+基准：多周期图表 逐个出图 + PIL 拼接（旧版） vs 单 figure 多子图（新版）
+
+每个 (实现, 子图数) 在独立子进程中运行（import 与一次预热渲染后计时 REPEAT 次），
+peak MB 为该子进程的峰值 RSS（ru_maxrss），进程间可直接比较。
+
+运行方式（项目根目录，需配置 .env）：
+    python -m tests.bench_multi_chart
+"""
+
+import multiprocessing
+import resource
+import time
+
+REPEAT = 3
+N_BARS = 1500
+DISPLAY_N = 150
+
+
+def _panels(n: int):
+    from app.infra.kline_cache import array_to_df
+    from tests.test_render_pool import synthetic_ohlcv
+    return [(f"BTCUSDT  P{i}", array_to_df(synthetic_ohlcv(N_BARS, seed=i)), DISPLAY_N, None) for i in range(n)]
+
+
+def _legacy(panels):
+    from app.infra.chart import _draw_chart, _vstack_pngs
+    return _vstack_pngs([
+        _draw_chart("BTCUSDT", title, df, display_n=display_n, chart_title=title)
+        for title, df, display_n, _ in panels
+    ])
+
+
+def _single_figure(panels):
+    from app.infra.chart import _draw_figure
+    return _draw_figure(panels)
+
+
+def _run(name: str, n: int, out) -> None:
+    import logging
+    logging.disable(logging.CRITICAL)
+    fn = {"legacy": _legacy, "single": _single_figure}[name]
+    panels = _panels(n)
+    fn(panels)  # 预热：字体缓存 / 首次绘图开销
+    t0 = time.perf_counter()
+    for _ in range(REPEAT):
+        png = fn(panels)
+    wall = (time.perf_counter() - t0) / REPEAT
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    out.put((wall, peak_kb / 1024, len(png)))
+
+
+def main():
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'impl':8s} {'panels':>6s} {'wall ms':>9s} {'peak MB':>9s} {'png KB':>8s}")
+    for n in (3, 4):
+        for name in ("legacy", "single"):
+            q = ctx.Queue()
+            p = ctx.Process(target=_run, args=(name, n, q))
+            p.start()
+            wall, peak, size = q.get()
+            p.join()
+            print(f"{name:8s} {n:6d} {wall * 1000:9.0f} {peak:9.1f} {size / 1024:8.0f}")
+
+
+if __name__ == "__main__":
+    main()
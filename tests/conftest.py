@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+# app.config 导入时校验的必填环境变量：测试用占位值（已设置的不覆盖）
+_TEST_ENV = {
+    "TG_BOT_TOKEN": "dummy",
+    "TG_CHAT_ID": "1234",
+    "TG_OWNER_CHAT_ID": "1234",
+    **{f"TG_TOPIC_{name}": "1" for name in ("US", "DAY", "4H", "1H", "15MIN", "PRICE", "MAIN", "SUMMARY", "ENTRY")},
+}
+
+# 测试模块在收集阶段就会导入 app.*：此处临时设置占位值并先导入 app.config，
+# 导入后立即恢复，不把占位值泄漏给整个会话（test_config_loading 需要真实的缺失场景）
+with pytest.MonkeyPatch.context() as _mp:
+    for _key, _value in _TEST_ENV.items():
+        if _key not in os.environ:
+            _mp.setenv(_key, _value)
+    import app.config  # noqa: F401,E402
+
+
+@pytest.fixture
+def app_env(monkeypatch):
+    """测试运行期间需要导入 app.config 的场景（如 spawn 的渲染子进程）：设置占位值，结束后恢复。"""
+    for key, value in _TEST_ENV.items():
+        if key not in os.environ:
+            monkeypatch.setenv(key, value)
@@ -0,0 +1,93 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.infra import chart
+from app.infra.stats import MessageStats
+from app.services.analysis_queue import AnalysisJob, AnalysisQueue
+
+
+class _FakeTg:
+    def __init__(self):
+        self.sent = []
+        self._next_id = 100
+
+    async def send_photo(self, chat_id, photo, caption=None, message_thread_id=None, reply_to_message_id=None):
+        self._next_id += 1
+        self.sent.append(("photo", caption, reply_to_message_id, self._next_id))
+        return self._next_id
+
+    async def send_message(self, chat_id, text, message_thread_id=None, reply_to_message_id=None):
+        self._next_id += 1
+        self.sent.append(("text", text, reply_to_message_id, self._next_id))
+        return self._next_id
+
+
+class _SlowAnalysis:
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.calls = []
+
+    async def analyze(self, image_bytes, symbol, media_type="image/png", extra_context=None, **_):
+        self.calls.append((symbol, media_type))
+        await self.release.wait()
+        usage = SimpleNamespace(input_tokens=10, output_tokens=5, cache_creation_tokens=0, cache_read_tokens=0)
+        return f"分析 {symbol}", usage
+
+
+async def _until(cond, timeout: float = 2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not cond():
+        assert loop.time() < deadline, "等待超时"
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_analysis_runs_outside_topic_lock_and_replies_to_chart(monkeypatch):
+    async def fake_chart(symbol, intervals, **_):
+        return b"\x89PNG\r\n\x1a\n" + symbol.encode()
+
+    tg = _FakeTg()
+    svc = _SlowAnalysis()
+    queue = AnalysisQueue(svc, tg, stats=MessageStats(), concurrency=1, max_pending=1)
+    monkeypatch.setattr(chart, "generate_multi_chart", fake_chart)
+    monkeypatch.setattr(chart.settings, "TG_TOPIC_4H", 4)
+    monkeypatch.setattr(chart, "_analysis_enabled", True)
+    monkeypatch.setattr(chart, "_analysis_queue", queue)
+    runner = asyncio.create_task(queue.run())
+    try:
+        first = await chart.send_with_chart(tg, "A 推送", "chat", 4, "AAAUSDT", "4h")
+        await _until(lambda: svc.calls)
+        # 分析进行中：同话题的下一条推送不被阻塞；第三条因队列已满不附分析
+        second = await asyncio.wait_for(chart.send_with_chart(tg, "B 推送", "chat", 4, "BBBUSDT", "4h"), 1.0)
+        await asyncio.wait_for(chart.send_with_chart(tg, "C 推送", "chat", 4, "CCCUSDT", "4h"), 1.0)
+        assert [s[1] for s in tg.sent] == ["A 推送", "B 推送", "C 推送"]
+        assert queue.stats()["dropped"] == 1
+
+        svc.release.set()
+        await _until(lambda: queue.stats()["completed"] == 2)
+        replies = [(text, reply_to) for kind, text, reply_to, _ in tg.sent if kind == "text"]
+        assert replies == [("分析 AAAUSDT", first), ("分析 BBBUSDT", second)]
+        assert svc.calls == [("AAAUSDT", "image/png"), ("BBBUSDT", "image/png")]
+    finally:
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_queued_jobs_skipped_after_analysis_disabled(monkeypatch):
+    tg = _FakeTg()
+    svc = _SlowAnalysis()
+    svc.release.set()
+    queue = AnalysisQueue(svc, tg, concurrency=1)
+    monkeypatch.setattr(chart, "_analysis_enabled", False)
+    queue.submit(AnalysisJob(image=b"png", symbol="AAAUSDT", chat_id="chat", topic_id=4, reply_to_message_id=1))
+    runner = asyncio.create_task(queue.run())
+    try:
+        await _until(lambda: queue.stats()["pending"] == 0 and queue.stats()["running"] == 0)
+        assert svc.calls == [] and tg.sent == []
+    finally:
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from app.infra import binance_weight as bw
+from app.infra.binance_weight import WeightGovernor, background_priority, klines_weight
+
+
+def _governor(**kw) -> WeightGovernor:
+    args = dict(limit=100, background_share=0.5, push_max_wait=0.3, background_max_wait=0.3)
+    args.update(kw)
+    return WeightGovernor(**args)
+
+
+def test_klines_weight_tiers():
+    assert [klines_weight(n) for n in (50, 100, 499, 500, 1000, 1500)] == [1, 2, 2, 5, 5, 10]
+
+
+@pytest.mark.asyncio
+async def test_background_capped_and_push_has_headroom(monkeypatch):
+    monkeypatch.setattr(bw.time, "time", lambda: 1_700_000_010.0)  # 固定在同一分钟窗口内
+    g = _governor()
+    g.observe(200, {"x-mbx-used-weight-1m": "45"})
+    assert g.stats()["used"] == 45
+
+    with background_priority():
+        assert await g.acquire(5)          # 50 ≤ 后台上限 50
+        assert not await g.acquire(5)      # 超出后台上限：等待超时放弃
+    assert await g.acquire(40)             # 推送可用到 95
+    s = g.stats()
+    assert s["background_rejected"] == 1 and s["remaining"] == 10
+
+
+@pytest.mark.asyncio
+async def test_background_yields_to_waiting_push(monkeypatch):
+    monkeypatch.setattr(bw, "_BACKGROUND_POLL_SEC", 0.01)
+    g = _governor(push_max_wait=0.2)
+    g.observe(429, {"retry-after": "0.1"})
+    order = []
+
+    async def req(name, background):
+        if background:
+            with background_priority():
+                ok = await g.acquire(1)
+        else:
+            ok = await g.acquire(1)
+        order.append((name, ok))
+
+    # 封禁期间两者都排队；解封后推送先行
+    await asyncio.gather(req("bg", True), req("push", False))
+    assert order == [("push", True), ("bg", True)]
+    assert g.stats()["bans"] == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_after_rejects_when_ban_outlasts_wait():
+    g = _governor(push_max_wait=0.05)
+    g.observe(418, {"retry-after": "30"})
+    assert not await g.acquire(1)
+    assert g.stats()["push_rejected"] == 1 and g.stats()["ban_remaining_s"] > 20
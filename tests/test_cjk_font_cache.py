@@ -0,0 +1,48 @@
+import os
+import pytest
+
+from app.infra import chart
+
+
+@pytest.fixture
+def font_env(tmp_path, monkeypatch):
+    font = tmp_path / "NotoSansCJK-Regular.ttc"
+    font.write_bytes(b"font")
+    scans = []
+
+    def fake_scan():
+        scans.append(1)
+        return str(font)
+
+    monkeypatch.setattr(chart.settings, "CJK_FONT_CACHE_PATH", str(tmp_path / "cache" / "cjk_font.json"))
+    monkeypatch.setattr(chart, "_scan_cjk_font", fake_scan)
+    monkeypatch.setattr(chart, "_CJK_FONT_LOADED", False)
+    monkeypatch.setattr(chart, "_cjk_font_prop", None)
+    return font, scans
+
+
+def _reload():
+    chart._CJK_FONT_LOADED = False
+    chart._ensure_cjk_font()
+
+
+@pytest.mark.asyncio
+async def test_font_path_cached_across_restarts_and_revalidated_by_mtime(font_env):
+    font, scans = font_env
+    await chart.preload_cjk_font()
+    assert scans == [1] and chart._cjk_font_prop.get_file() == str(font)
+
+    # 重启：直接读缓存，不再扫描
+    _reload()
+    assert scans == [1] and chart._cjk_font_prop.get_file() == str(font)
+
+    # 字体文件更新（mtime 变化）：重新扫描
+    st = os.stat(font)
+    os.utime(font, (st.st_atime, st.st_mtime + 10))
+    _reload()
+    assert len(scans) == 2
+
+    # 字体被删除：重新扫描
+    font.unlink()
+    _reload()
+    assert len(scans) == 3
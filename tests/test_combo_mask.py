@@ -0,0 +1,108 @@
+import copy
+import random
+
+from app.domain.models import IntervalState, LevelState
+from app.services.combo_mask import COMBO_TABLE
+from app.services.resonance_combinations import (
+    ALLOWED_COMBINATIONS,
+    COMBINATION_ROUTING,
+    canonical_combo,
+    match_combinations_with_lifecycle,
+)
+from app.services.router import max_interval
+
+_INTERVALS = ["1W", "1D", "4h", "1h", "15m", "5m", "3m", "30s", "1m"]
+
+
+def _legacy_pipeline(states, pushed, last_active_by_iv):
+    """重现位图改造前 ResonanceService.handle_event 中的 匹配 + 取大 流程。"""
+    raw = [iv for iv, st in states.items() if st.state in (LevelState.IN, LevelState.WARM)]
+    out = {}
+    for max_iv in {
+        max_interval(combo) for combo in COMBINATION_ROUTING.keys()
+        if all(iv in raw for iv in combo)
+    }:
+        allowed = [c for c in ALLOWED_COMBINATIONS if max_interval(c) == max_iv]
+        results = match_combinations_with_lifecycle(
+            raw_intervals=raw,
+            states=states,
+            pushed_combos=pushed,
+            last_active_combo=last_active_by_iv.get(max_iv),
+            allowed_combo=allowed,
+        )
+        combos = [c for c, _ in results]
+        suppressed = set()
+        for base in combos:
+            for higher in combos:
+                if base != higher and set(base) < set(higher):
+                    suppressed.add(base)
+                    break
+        out[max_iv] = (results, [r for r in results if r[0] not in suppressed])
+    return out
+
+
+def _mask_pipeline(states, pushed, last_active_by_iv):
+    current_mask = COMBO_TABLE.mask_of(iv for iv, st in states.items() if st.state != LevelState.OUT)
+    in_mask = COMBO_TABLE.mask_of(iv for iv, st in states.items() if st.state == LevelState.IN)
+    out = {}
+    for max_iv in COMBO_TABLE.active_groups(current_mask):
+        results = COMBO_TABLE.match(
+            max_iv=max_iv,
+            current_mask=current_mask,
+            in_mask=in_mask,
+            pushed_combos=pushed,
+            last_active_combo=last_active_by_iv.get(max_iv),
+        )
+        out[max_iv] = (results, COMBO_TABLE.suppress_dominated(results))
+    return out
+
+
+def test_bitmask_matcher_equivalent_to_legacy():
+    rng = random.Random(20260419)
+    canon_allowed = [canonical_combo(c) for c in ALLOWED_COMBINATIONS]
+
+    for _ in range(5000):
+        states = {
+            iv: IntervalState(
+                interval=iv,
+                state=rng.choice([LevelState.IN, LevelState.WARM, LevelState.OUT]),
+                value=0.0,
+            )
+            for iv in _INTERVALS
+        }
+        pushed = {}
+        for canon in canon_allowed:
+            r = rng.random()
+            if r < 0.3:
+                pushed[canon] = {"active": True, "max_iv": canon[0]}
+            elif r < 0.5:
+                pushed[canon] = {"active": False, "max_iv": canon[0]}
+        last_active_by_iv = {
+            iv: rng.choice([None] + canon_allowed)
+            for iv in ("1D", "4h", "1h", "15m")
+        }
+
+        legacy = _legacy_pipeline(states, copy.deepcopy(pushed), last_active_by_iv)
+        masked = _mask_pipeline(states, copy.deepcopy(pushed), last_active_by_iv)
+        assert legacy == masked
+
+
+def test_active_groups_ordered_from_largest_interval():
+    current = COMBO_TABLE.mask_of(["1D", "4h", "1h", "15m", "3m"])
+    assert COMBO_TABLE.active_groups(current) == ["1D", "4h", "1h", "15m"]
+
+
+def test_upgrade_requires_added_interval_in():
+    current = COMBO_TABLE.mask_of(["4h", "1h", "15m"])
+    pushed = {("4h", "1h"): {"active": True, "max_iv": "4h"}}
+
+    in_all = current
+    assert COMBO_TABLE.match("4h", current, in_all, pushed, ("4h", "1h")) == [
+        (("4h", "1h", "15m"), True),
+    ]
+
+    # 新增的 15m 仅 WARM → 不算升级，按首次命中推送
+    in_no_15m = COMBO_TABLE.mask_of(["4h", "1h"])
+    assert COMBO_TABLE.match("4h", current, in_no_15m, pushed, ("4h", "1h")) == [
+        (("4h", "1h", "15m"), False),
+    ]
@@ -0,0 +1,41 @@
+import httpx
+import pytest
+
+from app.infra import http_pool
+from app.infra.http_pool import PooledHttpClient
+
+
+@pytest.mark.asyncio
+async def test_pooled_client_records_latency_and_errors():
+    client = PooledHttpClient("test", max_connections=2, max_keepalive=1, keepalive_expiry=5, timeout=1, http2=False)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/boom":
+            raise httpx.ConnectError("boom", request=request)
+        return httpx.Response(200, json=[1])
+
+    await client._client.aclose()
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    for _ in range(3):
+        r = await client.get("https://example.test/ok")
+        assert r.json() == [1]
+    with pytest.raises(httpx.ConnectError):
+        await client.get("https://example.test/boom")
+
+    s = client.stats()
+    assert s["requests"] == 4 and s["errors"] == 1
+    assert s["http_versions"] == {"HTTP/1.1": 3}
+    assert 0 <= s["p50_ms"] <= s["p95_ms"] <= s["max_ms"]
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_shared_client_lifecycle():
+    c1 = http_pool.start_binance_client()
+    assert http_pool.binance_client() is c1
+    await http_pool.close_binance_client()
+    assert http_pool.binance_http_stats() is None
+    c2 = http_pool.binance_client()
+    assert c2 is not c1 and not c2.is_closed
+    await http_pool.close_binance_client()
@@ -0,0 +1,54 @@
+import pytest
+
+from app.infra import chart
+from app.infra.image_encoding import EncodeProfile, image_media_type
+from app.infra.kline_cache import array_to_df
+from tests.test_render_pool import synthetic_ohlcv
+
+
+def _panels(n: int = 2):
+    return [(f"BTCUSDT  P{i}", array_to_df(synthetic_ohlcv(400, seed=i)), 150, None) for i in range(n)]
+
+
+@pytest.mark.parametrize("fmt,media_type", [
+    ("png", "image/png"),
+    ("png_optimized", "image/png"),
+    ("png_palette", "image/png"),
+    ("jpeg", "image/jpeg"),
+    ("webp", "image/webp"),
+])
+def test_formats_encode_with_matching_media_type(fmt, media_type):
+    image = chart._render_figure(_panels(1), profile=EncodeProfile(format=fmt, tight=False))
+    assert image.media_type == media_type == image_media_type(image.data)
+    assert image.encode_ms > 0
+    # 固定边距：尺寸即 figsize × dpi
+    assert (image.width, image.height) == (14 * 150, chart._PANEL_HEIGHT * 150)
+
+
+def test_max_dimensions_and_target_bytes():
+    image = chart._render_figure(_panels(2), profile=EncodeProfile(tight=False, max_width=1000))
+    assert image.width == 1000
+
+    full = chart._render_figure(_panels(2), profile=EncodeProfile(format="png"))
+    target = len(full.data) // 3
+    small = chart._render_figure(_panels(2), profile=EncodeProfile(format="png_palette", target_bytes=target))
+    assert len(small.data) <= target
+    lossy = chart._render_figure(_panels(2), profile=EncodeProfile(format="jpeg", quality=95, target_bytes=target))
+    assert len(lossy.data) <= target
+
+
+def test_topic_profiles_inherit_default(monkeypatch):
+    monkeypatch.setattr(chart.settings, "CHART_ENCODE_PROFILES", {
+        "default": {"format": "png_palette", "tight": False},
+        "Entry": {"format": "webp", "quality": 70},
+        "nope": {"format": "jpeg"},
+    })
+    monkeypatch.setattr(chart.settings, "TG_TOPIC_ENTRY", 42)
+    default, by_topic = chart._load_encode_profiles()
+    assert default == EncodeProfile(format="png_palette", tight=False)
+    assert by_topic == {42: EncodeProfile(format="webp", tight=False, quality=70)}
+
+    with pytest.raises(ValueError):
+        EncodeProfile.from_dict({"format": "gif"})
+    with pytest.raises(ValueError):
+        EncodeProfile.from_dict({"colours": 16})
@@ -0,0 +1,66 @@
+import numpy as np
+
+from app.infra.indicator_store import EMA_PERIODS, MIN_SEED_BARS, IndicatorStore
+from app.infra.indicators import ema
+
+from tests.test_render_pool import synthetic_ohlcv
+
+_SEC = 3600
+_BAR_MS = _SEC * 1000
+
+
+def _full(ohlcv: np.ndarray) -> np.ndarray:
+    return np.column_stack([ema(ohlcv[:, 4], p) for p in EMA_PERIODS])
+
+
+def test_incremental_matches_full_recompute():
+    data = synthetic_ohlcv(900)
+    store = IndicatorStore()
+    # 前 700 根已收盘（末根未收盘）
+    now = data[700, 0] + 1000
+    store.seed("BTCUSDT", "1h", data[:701], _SEC, now)
+    assert store.stats()["seeded"] == 1
+
+    # 又收盘 150 根后：只拉显示长度 + 新增K线（含未收盘末根）+ 重叠
+    now = data[850, 0] + 1000
+    limit = store.window_limit("BTCUSDT", "1h", 100, _SEC, now)
+    assert limit == 100 + 151 + 2
+    window = data[851 - limit:851]
+    emas = store.try_incremental("BTCUSDT", "1h", window, _SEC, now)
+    assert emas is not None and emas.shape == (limit, len(EMA_PERIODS))
+
+    # 已收盘部分与全量计算一致（未收盘末根同样按递推临时计算）
+    ref = _full(data[:851])[851 - limit:]
+    np.testing.assert_allclose(emas[-100:], ref[-100:], rtol=1e-9)
+    assert store.stats()["incremental"] == 1
+
+
+def test_no_overlap_and_seed_threshold():
+    data = synthetic_ohlcv(MIN_SEED_BARS + 10)
+    store = IndicatorStore()
+    now = data[MIN_SEED_BARS - 2, 0] + _BAR_MS + 1
+    store.seed("ETHUSDT", "1h", data[:MIN_SEED_BARS - 1], _SEC, now)
+    assert store.window_limit("ETHUSDT", "1h", 100, _SEC, now) is None  # 已收盘不足，未建档
+
+    now = data[-1, 0] + _BAR_MS + 1
+    store.seed("ETHUSDT", "1h", data, _SEC, now)
+    # 窗口与已建档末根无重叠：返回 None，由调用方重新建档
+    later = synthetic_ohlcv(50, seed=3)
+    later[:, 0] = data[-1, 0] + (np.arange(50) + 5) * _BAR_MS
+    assert store.try_incremental("ETHUSDT", "1h", later, _SEC, later[-1, 0] + _BAR_MS) is None
+
+
+def test_save_load_roundtrip(tmp_path):
+    path = str(tmp_path / "state.npz")
+    data = synthetic_ohlcv(800)
+    store = IndicatorStore(path)
+    now = data[700, 0] + 1000
+    store.seed("BTCUSDT", "4h", data[:701], _SEC, now)
+    store.save()
+
+    restored = IndicatorStore(path)
+    assert restored.stats()["keys"] == 1
+    now = data[799, 0] + 1000
+    limit = restored.window_limit("BTCUSDT", "4h", 50, _SEC, now)
+    emas = restored.try_incremental("BTCUSDT", "4h", data[800 - limit:], _SEC, now)
+    np.testing.assert_allclose(emas[-50:], _full(data)[-50:], rtol=1e-9)
@@ -0,0 +1,40 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.infra.indicators import ema
+
+
+def reference_ema(prices, period):
+    """原 _compute_ema 的纯 Python 实现（对照基准）。"""
+    result = [math.nan] * len(prices)
+    if len(prices) < period:
+        return result
+    k = 2.0 / (period + 1)
+    e = sum(prices[:period]) / period
+    result[period - 1] = e
+    for i in range(period, len(prices)):
+        e = prices[i] * k + e * (1.0 - k)
+        result[i] = e
+    return result
+
+
+@pytest.mark.parametrize("period", [1, 2, 21, 55, 100, 200])
+@pytest.mark.parametrize("n", [0, 5, 200, 201, 1500])
+def test_ema_matches_reference(period, n):
+    rng = np.random.default_rng(period * 10007 + n)
+    prices = (30000 + np.cumsum(rng.normal(0, 50, n))).tolist()
+
+    got = ema(np.array(prices), period)
+    want = np.array(reference_ema(prices, period), dtype=np.float64)
+
+    assert got.shape == want.shape
+    assert np.array_equal(np.isnan(got), np.isnan(want))
+    np.testing.assert_allclose(got, want, rtol=1e-11, equal_nan=True)
+
+
+def test_ema_seed_position():
+    out = ema(np.arange(1.0, 11.0), 4)
+    assert np.isnan(out[:3]).all()
+    assert out[3] == pytest.approx(2.5)
@@ -0,0 +1,48 @@
+import httpx
+import pytest
+
+from app import main
+from app.services.interval_relevance import (
+    INTERVAL_CONSUMERS,
+    is_interval_relevant,
+    prunable_alerts,
+)
+
+
+def test_rule_intervals_are_relevant():
+    for iv in ("1D", "4h", "1h", "15m", "3m"):
+        assert is_interval_relevant(iv)
+    assert "resonance" in INTERVAL_CONSUMERS["3m"]
+    assert "ema55" in INTERVAL_CONSUMERS["15m"]
+    assert "ema21" in INTERVAL_CONSUMERS["15m"]   # 1h EMA21 额外检查 15m
+
+
+def test_unused_intervals_are_prunable():
+    for iv in ("30s", "5m", "1W"):
+        assert not is_interval_relevant(iv)
+
+    universe = {
+        "BTCUSDT": ["1W", "1D", "4h", "1h", "15m", "5m", "3m", "30s"],
+        "AAPL": ["1D", "4h", "1h"],
+    }
+    assert prunable_alerts(universe) == {
+        "1W": ["BTCUSDT"],
+        "5m": ["BTCUSDT"],
+        "30s": ["BTCUSDT"],
+    }
+
+
+@pytest.mark.asyncio
+async def test_pruned_webhook_skips_symbols_outside_universe():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+        outside = await client.post(
+            "/webhook/tradingview", json={"symbol": "NOTLISTEDUSDT.P", "interval": "5", "value": "85", "ts": 1.0},
+        )
+        inside = await client.post(
+            "/webhook/tradingview", json={"symbol": "BTCUSDT.P", "interval": "5", "value": "85", "ts": 1.0},
+        )
+
+    assert outside.json() == {"ok": True, "ignored": True}
+    assert not any(symbol == "NOTLISTEDUSDT" for symbol, _ in main.state.cache)
+    assert inside.json() == {"ok": True, "pruned": True}
+    assert ("BTCUSDT", "5m") in main.state.cache
@@ -0,0 +1,118 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.infra.kline_cache import KlineCache, array_to_df, decode_klines, klines_to_array
+
+_BAR_MS = 3600 * 1000
+
+
+def _row(open_ms: int, close: float) -> list:
+    return [open_ms, "1", "2", "0.5", str(close), "10", open_ms + _BAR_MS - 1, "0", 1, "0", "0", "0"]
+
+
+class _FakeBinance:
+    """按 limit / startTime 返回 [0, now] 内的 1h K线（末根为未收盘K线）。"""
+
+    def __init__(self):
+        self.now_ms = 0
+        self.calls = []
+
+    async def fetch(self, symbol, interval, limit, start_time):
+        self.calls.append((limit, start_time))
+        last_open = self.now_ms // _BAR_MS * _BAR_MS
+        opens = list(range(0, last_open + 1, _BAR_MS))
+        if start_time is not None:
+            opens = [o for o in opens if o >= start_time][:limit]
+        else:
+            opens = opens[-limit:]
+        # close 随时间变化，模拟未收盘K线的价格更新
+        return [_row(o, o / _BAR_MS + self.now_ms / 1e9) for o in opens]
+
+
+@pytest.mark.asyncio
+async def test_incremental_refresh_and_bar_aligned_ttl():
+    api = _FakeBinance()
+    cache = KlineCache(max_bytes=10 ** 7, live_ttl=10, fetch=api.fetch)
+
+    api.now_ms = 100 * _BAR_MS + 1000
+    first = await cache.get("BTCUSDT", "1h", 3600, 50, now_ms=api.now_ms)
+    assert len(first) == 50 and api.calls == [(50, None)]
+
+    # live_ttl 内：不发请求
+    again = await cache.get("BTCUSDT", "1h", 3600, 50, now_ms=api.now_ms + 5000)
+    assert (again == first).all() and len(api.calls) == 1
+
+    # 跨过收盘时间（即使仍在 live_ttl 内）：只从末根K线增量拉取
+    api.now_ms = 101 * _BAR_MS + 500
+    fresh = await cache.get("BTCUSDT", "1h", 3600, 50, now_ms=api.now_ms)
+    assert api.calls[-1] == (3, 100 * _BAR_MS)
+    assert fresh[-1, 0] == 101 * _BAR_MS and len(fresh) == 50
+    assert list(fresh[:, 0]) == [o * _BAR_MS for o in range(52, 102)]
+
+    s = cache.stats()
+    assert (s["hits"], s["partial"], s["misses"]) == (1, 1, 1)
+    assert s["bytes_saved"] > 0
+
+    df = array_to_df(fresh)
+    assert list(df.columns) == ["Open", "High", "Low", "Close", "Volume"]
+    assert df.index.name == "Open_time" and str(df.index.tz) == "UTC"
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_under_budget():
+    api = _FakeBinance()
+    api.now_ms = 10 * _BAR_MS
+    # 每个 key 10 根 × 6 列 × 8 字节 = 480 字节，预算只够两个
+    cache = KlineCache(max_bytes=1000, live_ttl=10, fetch=api.fetch)
+    for sym in ("A", "B"):
+        await cache.get(sym, "1h", 3600, 10, now_ms=api.now_ms)
+    await cache.get("A", "1h", 3600, 10, now_ms=api.now_ms)  # A 变为最近使用
+    await cache.get("C", "1h", 3600, 10, now_ms=api.now_ms)
+
+    assert cache.evictions == 1
+    n = len(api.calls)
+    await cache.get("A", "1h", 3600, 10, now_ms=api.now_ms)
+    assert len(api.calls) == n  # A 仍在缓存
+    await cache.get("B", "1h", 3600, 10, now_ms=api.now_ms)
+    assert len(api.calls) == n + 1  # B 已被淘汰
+
+
+@pytest.mark.filterwarnings("error::DeprecationWarning")
+def test_decode_klines_matches_json_path():
+    rows = [_row(o * _BAR_MS, 100.25 + o) for o in range(5)]
+    rows[2][1] = "0.00001234"
+    for body in (json.dumps(rows).encode(), json.dumps(rows, separators=(",", ":")).encode()):
+        got = decode_klines(body)
+        assert got.shape == (5, 6) and got.flags.c_contiguous
+        np.testing.assert_array_equal(got, klines_to_array(rows))
+
+    assert decode_klines(b"[]").shape == (0, 6)
+    assert decode_klines(b'{"code":-1121,"msg":"Invalid symbol."}') is None
+    # 字段数变化时退回 JSON 解析
+    short = [r[:7] for r in rows]
+    np.testing.assert_array_equal(decode_klines(json.dumps(short).encode()), klines_to_array(short))
+    # 总字段数恰为 12 的倍数但行数不符：同样退回 JSON 解析
+    halves = [r[:6] for r in rows[:2]]
+    np.testing.assert_array_equal(decode_klines(json.dumps(halves).encode()), klines_to_array(halves))
+    assert decode_klines(b"[[1,2,3") is None
+
+
+@pytest.mark.asyncio
+async def test_stale_fallback_not_counted_as_hit():
+    api = _FakeBinance()
+    cache = KlineCache(max_bytes=10 ** 7, live_ttl=10, fetch=api.fetch)
+    api.now_ms = 100 * _BAR_MS + 1000
+    await cache.get("BTCUSDT", "1h", 3600, 50, now_ms=api.now_ms)
+
+    async def failing(symbol, interval, limit, start_time):
+        return None
+
+    cache._fetch = failing
+    old = await cache.get("BTCUSDT", "1h", 3600, 50, now_ms=api.now_ms + _BAR_MS)
+    assert len(old) == 50
+
+    s = cache.stats()
+    assert (s["hits"], s["misses"], s["stale"]) == (0, 1, 1)
+    assert s["hit_rate"] == 0.0
@@ -0,0 +1,71 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.infra import chart
+from app.infra.binance_weight import background_priority
+
+
+class _SlowClient:
+    def __init__(self):
+        self.calls = 0
+
+    async def get(self, url, params):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        row = [params["limit"], "1.0", "2.0", "0.5", "1.5", "10.0", 0, "15.0", 3, "5.0", "7.5", "0"]
+        return httpx.Response(200, json=[row], request=httpx.Request("GET", url))
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_fetches_share_one_request(monkeypatch):
+    client = _SlowClient()
+    monkeypatch.setattr(chart, "binance_client", lambda: client)
+    before = chart.kline_fetch_stats()
+
+    results = await asyncio.gather(
+        *[chart._fetch_klines("BTCUSDT", "1h", 500) for _ in range(5)],
+        chart._fetch_klines("BTCUSDT", "1h", 600),
+    )
+    assert client.calls == 2
+    assert all(r is results[0] for r in results[:5])
+    assert results[0][0, 0] == 500 and results[5][0, 0] == 600
+
+    after = chart.kline_fetch_stats()
+    assert after["requests"] - before["requests"] == 6
+    assert after["coalesced"] - before["coalesced"] == 4
+    assert not chart._inflight_klines
+
+    # 请求完成后不再复用旧结果
+    await chart._fetch_klines("BTCUSDT", "1h", 500)
+    assert client.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_fetch(monkeypatch):
+    client = _SlowClient()
+    monkeypatch.setattr(chart, "binance_client", lambda: client)
+
+    first = asyncio.ensure_future(chart._fetch_klines("ETHUSDT", "4h", 100))
+    await asyncio.sleep(0)
+    second = asyncio.ensure_future(chart._fetch_klines("ETHUSDT", "4h", 100))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert (await second)[0, 0] == 100
+    assert client.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_push_fetch_does_not_join_background_fetch(monkeypatch):
+    client = _SlowClient()
+    monkeypatch.setattr(chart, "binance_client", lambda: client)
+
+    with background_priority():
+        background = asyncio.ensure_future(chart._fetch_klines("SOLUSDT", "1h", 200))
+    await asyncio.sleep(0)
+    push = asyncio.ensure_future(chart._fetch_klines("SOLUSDT", "1h", 200))
+
+    await asyncio.gather(background, push)
+    assert client.calls == 2
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.infra.kline_cache import KlineCache
+from app.infra.kline_stream import KlineStream, StreamSub
+
+pytest.importorskip("websockets")
+from websockets.asyncio.server import serve  # noqa: E402
+
+_SEC = 60
+_BAR_MS = _SEC * 1000
+
+
+def _bar_open(now_ms: float) -> int:
+    return int(now_ms // _BAR_MS * _BAR_MS)
+
+
+class _StandInBinance:
+    """本地替身：组合流 websocket + klines REST（1m K线，末根为未收盘K线）。"""
+
+    def __init__(self):
+        self.clients = set()
+        self.paths = []
+        self.rest_calls = []
+        self.shift_ms = -2 * _BAR_MS   # 行情时间偏移：置 0 模拟断线期间又走了 2 根
+        self._server = None
+
+    async def start(self) -> str:
+        self._server = await serve(self._handler, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"ws://127.0.0.1:{port}/stream"
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handler(self, ws):
+        self.paths.append(ws.request.path)
+        self.clients.add(ws)
+        try:
+            await ws.wait_closed()
+        finally:
+            self.clients.discard(ws)
+
+    async def push(self, stream: str, open_ms: float, close: float):
+        msg = json.dumps({"stream": stream, "data": {"e": "kline", "k": {
+            "t": open_ms, "o": "1", "h": "2", "l": "0.5", "c": str(close), "v": "10", "x": False,
+        }}})
+        for ws in list(self.clients):
+            await ws.send(msg)
+
+    async def drop(self):
+        for ws in list(self.clients):
+            await ws.close()
+
+    async def fetch(self, symbol, interval, limit, start_time):
+        self.rest_calls.append((limit, start_time))
+        last_open = _bar_open(time.time() * 1000) + self.shift_ms
+        opens = [last_open - i * _BAR_MS for i in range(300)][::-1]
+        opens = [o for o in opens if o >= start_time][:limit] if start_time is not None else opens[-limit:]
+        return [[o, "1", "2", "0.5", "100", "10", o + _BAR_MS - 1, "0", 1, "0", "0", "0"] for o in opens]
+
+
+async def _until(cond, timeout: float = 3.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "等待超时"
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_stream_keeps_cache_live_and_backfills_after_reconnect():
+    api = _StandInBinance()
+    url = await api.start()
+    cache = KlineCache(max_bytes=10 ** 7, live_ttl=10, fetch=api.fetch)
+    sub = StreamSub("BTCUSDT", "1m", _SEC, 100, "BTCUSDT")
+    stream = KlineStream(url, cache, lambda: [sub], reconnect_delay=0.05)
+    task = asyncio.create_task(stream.run_forever())
+    try:
+        # 连上后经 REST 预热
+        await _until(lambda: api.clients and stream.backfilled == 1)
+        assert api.paths == ["/stream?streams=btcusdt@kline_1m"]
+        assert api.rest_calls == [(100, None)]
+
+        # 推流更新末根K线：读取不发请求
+        open_ms = _bar_open(time.time() * 1000) + api.shift_ms
+        await api.push(sub.stream, open_ms, 123.0)
+        await _until(lambda: stream.messages == 1)
+        data = await cache.get("BTCUSDT", "1m", _SEC, 100)
+        assert data[-1, 0] == open_ms and data[-1, 4] == 123.0
+        assert len(api.rest_calls) == 1
+
+        # 断线期间行情继续走：重连后从末根增量回补
+        api.shift_ms = 0
+        await api.drop()
+        await _until(lambda: stream.reconnects >= 1 and stream.connected == 1 and stream.backfilled == 2)
+        assert api.rest_calls[-1][1] == open_ms
+        data = await cache.get("BTCUSDT", "1m", _SEC, 100)
+        assert data[-1, 0] >= open_ms + 2 * _BAR_MS and len(data) == 100
+        assert len(api.rest_calls) == 2
+
+        # 不连续的推流触发回补，而不是写入
+        await api.push(sub.stream, open_ms + 10 * _BAR_MS, 1.0)
+        await _until(lambda: cache.stream_gaps == 1)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await api.close()
@@ -0,0 +1,50 @@
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.infra.ohlcv_archive import OhlcvArchive
+from app.services import market_briefing_service as mb
+
+_DAY = datetime.date(2026, 3, 13)   # 周五
+
+
+def _bar(d: datetime.date, close: float) -> list:
+    open_ms = datetime.datetime(d.year, d.month, d.day, 4, tzinfo=datetime.timezone.utc).timestamp() * 1000
+    return [open_ms, close, close, close, close, 1.0]
+
+
+def _archive(tmp_path, close: float, written_et: datetime.time) -> OhlcvArchive:
+    archive = OhlcvArchive(str(tmp_path))
+    archive.append("yfinance", "SPY", "1d", np.array([_bar(_DAY - datetime.timedelta(days=1), 500.0), _bar(_DAY, close)]))
+    ts = datetime.datetime.combine(_DAY, written_et, tzinfo=mb.EASTERN).timestamp()
+    os.utime(archive._path("yfinance", "SPY", "1d"), (ts, ts))
+    return archive
+
+
+def _fake_download(close: float, calls: list):
+    def download(symbols, start, end):
+        calls.append(list(symbols))
+        index = pd.DatetimeIndex([pd.Timestamp(_DAY).tz_localize("America/New_York")])
+        columns = pd.MultiIndex.from_product([["Open", "High", "Low", "Close", "Volume"], symbols])
+        return pd.DataFrame([[close] * len(columns)], index=index, columns=columns)
+    return download
+
+
+def test_intraday_archived_bar_is_redownloaded(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(mb, "_download_closes", _fake_download(510.0, calls))
+    archive = _archive(tmp_path, close=505.0, written_et=datetime.time(12, 0))   # 盘中写入
+
+    assert mb._archived_closes(archive, ["SPY"], _DAY) == {"SPY": 510.0}
+    assert calls == [["SPY"]]
+
+
+def test_archived_bar_written_after_close_is_used(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(mb, "_download_closes", _fake_download(510.0, calls))
+    archive = _archive(tmp_path, close=505.0, written_et=datetime.time(20, 0))
+
+    assert mb._archived_closes(archive, ["SPY"], _DAY) == {"SPY": 505.0}
+    assert calls == []
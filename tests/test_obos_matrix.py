@@ -0,0 +1,135 @@
+import random
+
+import pytest
+
+from app.config import settings
+from app.domain.models import LevelState, Side
+from app.infra.store import AppState
+
+_SYMBOLS = [f"S{i}USDT" for i in range(70)]  # 超过初始容量，覆盖扩容
+_INTERVALS = ["1W", "1D", "4h", "1h", "15m", "5m", "3m", "30s", "1m"]
+
+
+def _cell_state(state: AppState, symbol: str, iv: str, side: Side, now_ts: float) -> LevelState:
+    rec = state.cache.get((symbol, iv))
+    if rec is None:
+        return LevelState.OUT
+    if rec.in_oversold if side == Side.OVERSOLD else rec.in_overbought:
+        return LevelState.IN
+    if state.is_warm(symbol, iv, side, now_ts=now_ts):
+        return LevelState.WARM
+    return LevelState.OUT
+
+
+def _random_state():
+    rng = random.Random(7)
+    state = AppState(
+        cooldown_seconds=0,
+        warm_k_map=settings.WARM_K_MAP,
+        interval_seconds=settings.INTERVAL_SECONDS,
+    )
+    ts = 0.0
+    for _ in range(4000):
+        ts += rng.randint(0, 600)
+        state.update_interval(
+            rng.choice(_SYMBOLS), rng.choice(_INTERVALS),
+            rng.uniform(-80, 80), 40, -40, now_ts=ts,
+        )
+    state.clear_zone_on_missed_heartbeat(_SYMBOLS[0], "1h", ts)
+    return state, ts
+
+
+def test_snapshot_matches_per_cell_classification():
+    state, now_ts = _random_state()
+    universe = {s: _INTERVALS[: 3 + i % 6] for i, s in enumerate(_SYMBOLS)}
+    universe["NEWUSDT"] = ["4h", "1h"]  # 尚无任何数据
+
+    snap = state.obos_matrix.snapshot(now_ts, universe)
+    assert snap.symbols == sorted(universe)
+    for symbol in snap.symbols:
+        for iv in _INTERVALS:
+            for side in (Side.OVERSOLD, Side.OVERBOUGHT):
+                expected = (
+                    _cell_state(state, symbol, iv, side, now_ts)
+                    if iv in universe[symbol] else LevelState.OUT
+                )
+                assert snap.state_of(symbol, iv, side) == expected, (symbol, iv, side)
+
+
+def test_combo_hits_match_per_symbol_check():
+    state, now_ts = _random_state()
+    snap = state.obos_matrix.snapshot(now_ts)
+    combos = [("4h", "1h"), ("1D", "4h", "1h"), ("15m", "3m")]
+    for side in (Side.OVERSOLD, Side.OVERBOUGHT):
+        hits = snap.combo_hits(combos, side)
+        for combo in combos:
+            expected = [
+                s for s in snap.symbols
+                if all(_cell_state(state, s, iv, side, now_ts) != LevelState.OUT for iv in combo)
+            ]
+            assert hits[combo] == expected
+
+
+def test_near_triggers_one_interval_missing():
+    from app.services.matrix_service import find_near_triggers
+
+    state = AppState(
+        cooldown_seconds=0,
+        warm_k_map=settings.WARM_K_MAP,
+        interval_seconds=settings.INTERVAL_SECONDS,
+    )
+    universe = {"BTCUSDT": ["1D", "4h", "1h"], "ETHUSDT": ["1D", "4h", "1h"]}
+    for iv in ("1D", "4h"):
+        state.update_interval("BTCUSDT", iv, -50, 40, -40, now_ts=0)
+    state.update_interval("BTCUSDT", "1h", -35, 40, -40, now_ts=0)
+    state.update_interval("ETHUSDT", "1D", -50, 40, -40, now_ts=0)
+    state.update_interval("ETHUSDT", "1h", -10, 40, -40, now_ts=0)
+
+    snap = state.obos_matrix.snapshot(10, universe)
+    near = find_near_triggers(snap)
+    btc = [n for n in near if n.symbol == "BTCUSDT" and n.side == Side.OVERSOLD]
+    assert btc and all(n.missing == "1h" and n.distance == 5 for n in btc)
+    assert ("1D", "4h", "1h") in {n.combo for n in btc}
+    # 距离排序：BTC 缺 1h 差 5，排在 ETH 之前
+    assert near[0].symbol == "BTCUSDT"
+
+    close = find_near_triggers(snap, max_distance=5)
+    assert {n.symbol for n in close} == {"BTCUSDT"}
+    assert all(n.distance <= 5 for n in close)
+
+
+def test_near_triggers_skip_untracked_and_missing_data(monkeypatch):
+    from app.services import matrix_service
+    from app.services.matrix_service import find_near_triggers, near_trigger_symbols
+
+    state = AppState(
+        cooldown_seconds=0,
+        warm_k_map=settings.WARM_K_MAP,
+        interval_seconds=settings.INTERVAL_SECONDS,
+    )
+    # 不跟踪 1D：含 1D 的组合永远不会成立
+    universe = {"ASTERUSDT": ["4h", "1h", "15m", "3m"]}
+    for iv in ("4h", "1h"):
+        state.update_interval("ASTERUSDT", iv, -50, 40, -40, now_ts=0)
+    state.update_interval("ASTERUSDT", "15m", -30, 40, -40, now_ts=0)
+
+    near = find_near_triggers(state.obos_matrix.snapshot(10, universe))
+    assert near
+    assert all("1D" not in n.combo for n in near)
+    # 3m 无数据：不作为临近触发返回
+    assert all(n.missing != "3m" for n in near)
+    assert all(n.distance < float("inf") for n in near)
+
+    monkeypatch.setattr(matrix_service, "get_universe", lambda: universe)
+    assert "1D" not in near_trigger_symbols(state, now_ts=10).get("ASTERUSDT", set())
+
+
+def test_near_distance_argument_rejects_non_finite_and_negative():
+    from app.services.tg_command_handler import _parse_near_distance
+
+    assert _parse_near_distance(None) is None
+    assert _parse_near_distance("5") == 5.0
+    assert _parse_near_distance("0") == 0.0
+    for bad in ("NAN", "INF", "-INF", "-1", "ABC"):
+        with pytest.raises(ValueError):
+            _parse_near_distance(bad)
@@ -0,0 +1,99 @@
+import time
+
+import numpy as np
+import pytest
+
+from app.infra import chart
+from app.infra.kline_cache import KlineCache, array_to_df
+from app.infra.ohlcv_archive import OhlcvArchive, resample_ohlcv
+
+from tests.test_render_pool import synthetic_ohlcv
+
+_H = 3600 * 1000
+
+
+def test_append_overwrites_forming_bar_and_merges_backfill(tmp_path):
+    archive = OhlcvArchive(str(tmp_path))
+    data = synthetic_ohlcv(100)
+    archive.append("binance", "BTCUSDT", "1h", data[:60])
+    view = archive.read("binance", "BTCUSDT", "1h")
+
+    # 末根更新 + 追加：写新文件后原子替换，已读出的数组不变
+    tail = data[59:80].copy()
+    tail[0, 4] = 1.0
+    archive.append("binance", "BTCUSDT", "1h", tail)
+    got = archive.read("binance", "BTCUSDT", "1h")
+    assert len(got) == 80 and got[59, 4] == 1.0 and archive.rewrites == 0
+    assert view[59, 4] == data[59, 4]
+
+    # 与更早K线重叠：合并后原子替换，旧映射仍可读
+    archive.append("binance", "BTCUSDT", "1h", data[10:20] * [1, 2, 2, 2, 2, 2])
+    got = archive.read("binance", "BTCUSDT", "1h", limit=75)
+    assert archive.rewrites == 1 and len(got) == 75
+    assert (got[5:15, 4] == data[10:20, 4] * 2).all()
+    assert (np.diff(archive.read("binance", "BTCUSDT", "1h")[:, 0]) > 0).all()
+    assert view[0, 0] == data[0, 0]
+
+
+def test_resample_matches_pandas():
+    data = synthetic_ohlcv(300, bar_ms=_H)
+    data = np.delete(data, [5, 6, 7, 8, 40], axis=0)   # 含整桶缺失
+    ref = array_to_df(data).resample("4h").agg({
+        "Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum",
+    }).dropna(subset=["Open", "Close"])
+    got = resample_ohlcv(data, 4 * _H)
+    assert len(got) == len(ref)
+    np.testing.assert_allclose(got[:, 1:], ref.to_numpy())
+
+
+def test_yfinance_served_from_archive(tmp_path, monkeypatch):
+    calls = []
+    now_ms = time.time() * 1000
+    history = synthetic_ohlcv(4000, bar_ms=_H)
+    history[:, 0] = (now_ms // _H - 3999 + np.arange(4000)) * _H
+
+    def fake_download(yf_symbol, yf_interval, start_ms):
+        calls.append(start_ms)
+        return history[history[:, 0] >= start_ms]
+
+    monkeypatch.setattr(chart, "_yf_download", fake_download)
+    chart.register_ohlcv_archive(OhlcvArchive(str(tmp_path)))
+    try:
+        first = chart._yfinance_fetch_sync("AAPL", "1h", 300)
+        assert len(calls) == 1 and len(first) == 300
+
+        # TTL 内且归档覆盖足够：不下载（4h 由归档 1h 聚合）
+        again = chart._yfinance_fetch_sync("AAPL", "4h", 50)
+        assert len(calls) == 1 and len(again) == 50
+
+        # TTL 过期：只从归档末根增量下载
+        monkeypatch.setattr(chart.settings, "OHLCV_ARCHIVE_YF_TTL", 0.0)
+        chart._yfinance_fetch_sync("AAPL", "1h", 300)
+        assert calls[-1] == history[-1, 0]
+    finally:
+        chart.register_ohlcv_archive(None)
+
+
+@pytest.mark.asyncio
+async def test_kline_cache_restores_from_archive(tmp_path):
+    archive = OhlcvArchive(str(tmp_path))
+    now_ms = 500 * _H + 1000
+    calls = []
+
+    async def fetch(symbol, interval, limit, start_time):
+        calls.append((limit, start_time))
+        opens = list(range(0, 500 * _H + 1, _H))
+        opens = opens[-limit:] if start_time is None else [o for o in opens if o >= start_time][:limit]
+        return [[o, "1", "2", "0.5", "1.5", "10", o + _H - 1, "0", 1, "0", "0", "0"] for o in opens]
+
+    first = KlineCache(max_bytes=10 ** 7, live_ttl=10, fetch=fetch)
+    first.archive = archive
+    await first.get("BTCUSDT", "1h", 3600, 200, now_ms=now_ms)
+    assert calls == [(200, None)]
+
+    # 新进程：从归档恢复，只增量拉取末根
+    restarted = KlineCache(max_bytes=10 ** 7, live_ttl=10, fetch=fetch)
+    restarted.archive = archive
+    data = await restarted.get("BTCUSDT", "1h", 3600, 200, now_ms=now_ms + 60_000)
+    assert calls[-1] == (2, 500 * _H) and len(data) == 200
+    assert restarted.stats()["archive_loads"] == 1
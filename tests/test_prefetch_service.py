@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.infra.store import AppState
+from app.services import prefetch_service
+from app.services.prefetch_service import BarClosePrefetcher, prefetch_targets
+
+_UNIVERSE = {s: ["1D", "4h", "1h", "15m"] for s in ("AUSDT", "BUSDT", "CUSDT", "DUSDT")}
+
+
+def _state(now_ts: float) -> AppState:
+    state = AppState(
+        cooldown_seconds=0,
+        warm_k_map=settings.WARM_K_MAP,
+        interval_seconds=settings.INTERVAL_SECONDS,
+    )
+    state.update_interval("AUSDT", "4h", -60, 40, -40, now_ts=now_ts)   # IN
+    state.update_interval("AUSDT", "1h", -60, 40, -40, now_ts=now_ts)
+    state.update_interval("BUSDT", "1D", 60, 40, -40, now_ts=now_ts)
+    state.update_interval("CUSDT", "15m", 60, 40, -40, now_ts=now_ts)   # 只有 15m：不预取
+    state.update_interval("DUSDT", "1h", 60, 40, -40, now_ts=now_ts - 10)
+    state.update_interval("DUSDT", "1h", 0, 40, -40, now_ts=now_ts)     # 刚退出 → WARM
+    return state
+
+
+def test_targets_cover_in_and_warm_on_1h_and_above():
+    now_ts = 1_000_000.0
+    snap = _state(now_ts).obos_matrix.snapshot(now_ts, _UNIVERSE)
+    targets = prefetch_targets(snap, max_symbols=10)
+
+    assert list(targets) == ["AUSDT", "BUSDT", "DUSDT"]  # 活跃周期多的在前
+    assert targets["AUSDT"] == ["1D", "4h", "1h", "15m", "3m"]
+    assert targets["BUSDT"] == ["1D", "4h", "1h"]
+    assert targets["DUSDT"] == ["4h", "1h", "15m", "3m"]
+    assert list(prefetch_targets(snap, max_symbols=1)) == ["AUSDT"]
+
+
+@pytest.mark.asyncio
+async def test_prefetch_caps_concurrency(monkeypatch):
+    now_ts = 1_000_000.0
+    monkeypatch.setattr(prefetch_service, "take_snapshot", lambda state, ts=None: state.obos_matrix.snapshot(now_ts, _UNIVERSE))
+    monkeypatch.setattr(settings, "PREFETCH_CONCURRENCY", 2)
+    running, peak, loaded = 0, 0, []
+
+    async def fake_prefetch(symbol, iv):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        loaded.append((symbol, iv))
+        return iv != "3m"
+
+    monkeypatch.setattr(prefetch_service, "prefetch_panel", fake_prefetch)
+    svc = BarClosePrefetcher(_state(now_ts))
+    n = await svc.prefetch(["3m", "15m", "1h"])
+
+    assert peak == 2
+    # 只预取刚收盘周期的子图：AUSDT / DUSDT 的 1h+15m+3m，BUSDT 的 1h
+    assert sorted(loaded) == sorted(
+        [(s, iv) for s in ("AUSDT", "DUSDT") for iv in ("1h", "15m", "3m")] + [("BUSDT", "1h")]
+    )
+    assert n == 5
+    assert (svc.runs, svc.panels, svc.failures) == (1, 5, 2)
+
+    loaded.clear()
+    await svc.prefetch(["3m", "15m"])
+    assert {iv for _, iv in loaded} == {"15m", "3m"}
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from app.infra import chart
+from app.infra.quality_ladder import QUALITY_LADDER, choose_quality_level, reduce_panels
+from app.infra.render_pool import RenderPool
+from app.infra.render_scheduler import RenderScheduler
+from app.infra.stats import MessageStats
+from tests.test_analysis_queue import _FakeTg
+
+_LAT = [6000.0, 10000.0, 14000.0]
+
+
+def _names(*levels):
+    return [QUALITY_LADDER[i].name for i in levels]
+
+
+def test_level_from_queue_and_latency():
+    assert choose_quality_level(0, 4, 0.0, _LAT) == 0
+    # 排队数不超过并发上限：满画质
+    assert _names(*(choose_quality_level(d, 4, 0.0, _LAT) for d in (1, 4, 5, 8, 9, 16, 17, 32, 33))) == [
+        "full", "full", "fewer_panels", "fewer_panels", "low_dpi", "low_dpi", "single_panel", "single_panel", "text",
+    ]
+    assert _names(*(choose_quality_level(0, 4, ms, _LAT) for ms in (5000, 7000, 11000, 60000))) == [
+        "full", "fewer_panels", "low_dpi", "single_panel",
+    ]
+    assert choose_quality_level(1, 4, 11000, _LAT) == 2
+
+
+def test_reduce_panels_keeps_push_interval():
+    ivs = ["4h", "1h", "15m", "3m"]
+    assert reduce_panels(ivs, "15m", None) == ivs
+    assert reduce_panels(ivs, "15m", 2) == ["1h", "15m"]
+    assert reduce_panels(ivs, "4h", 2) == ["4h", "1h"]
+    assert reduce_panels(ivs, "15m", 1) == ["15m"]
+    assert reduce_panels(ivs, "30s", 1) == ["4h"]
+    assert reduce_panels(ivs, "15m", 0) == []
+
+
+@pytest.mark.asyncio
+async def test_send_with_chart_degrades_under_load_and_recovers(monkeypatch):
+    calls = []
+
+    async def fake_chart(symbol, intervals, profile=None, **_):
+        calls.append((list(intervals), profile.dpi))
+        return b"\x89PNG\r\n\x1a\n"
+
+    sched = RenderScheduler(max_concurrent=1)
+    pool = RenderPool(workers=1)
+    stats = MessageStats()
+    tg = _FakeTg()
+    monkeypatch.setattr(chart, "_render_scheduler", sched)
+    monkeypatch.setattr(chart, "_render_pool", pool)
+    monkeypatch.setattr(chart, "_msg_stats", stats)
+    monkeypatch.setattr(chart, "generate_multi_chart", fake_chart)
+
+    await chart.send_with_chart(tg, "a", "chat", 3, "BTCUSDT", "15m")
+    assert calls[-1] == (["4h", "1h", "15m", "3m"], 150)
+
+    # 最近渲染耗时高：降到低 dpi 的两个子图
+    pool._recent.extend([(time.monotonic(), 6000.0)] * 3)
+    await chart.send_with_chart(tg, "b", "chat", 3, "BTCUSDT", "15m")
+    assert calls[-1] == (["1h", "15m"], 100)
+
+    # 排队严重：只发文字
+    monkeypatch.setattr(RenderScheduler, "depth", property(lambda self: 9))
+    await chart.send_with_chart(tg, "c", "chat", 3, "BTCUSDT", "15m")
+    assert len(calls) == 2 and tg.sent[-1][0] == "text"
+
+    # 负载回落后恢复
+    monkeypatch.setattr(RenderScheduler, "depth", property(lambda self: 0))
+    pool._recent.clear()
+    await chart.send_with_chart(tg, "d", "chat", 3, "BTCUSDT", "15m")
+    assert calls[-1] == (["4h", "1h", "15m", "3m"], 150)
+    assert stats.get_chart_quality_stats() == {"full": 2, "low_dpi": 1, "text": 1}
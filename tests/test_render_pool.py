@@ -0,0 +1,215 @@
+import asyncio
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+
+from app.infra import chart
+from app.infra.image_encoding import EncodedImage
+from app.infra.render_pool import PanelJob, RenderJob, RenderPool, run_render_job
+
+_PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+
+
+def synthetic_ohlcv(n: int, bar_ms: int = 3600_000, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) + rng.random(n)
+    low = np.minimum(open_, close) - rng.random(n)
+    opens_ms = 1_700_000_000_000 + np.arange(n) * bar_ms
+    return np.column_stack([opens_ms, open_, high, low, close, rng.random(n) * 1000])
+
+
+def _job(n_panels: int) -> RenderJob:
+    return RenderJob(
+        panels=[
+            PanelJob(symbol="BTCUSDT", label=f"P{i}", ohlcv=synthetic_ohlcv(400, seed=i), display_n=150)
+            for i in range(n_panels)
+        ],
+        zone_bot=95.0, zone_top=97.0, zone_role="S",
+    )
+
+
+def test_inline_render_skips_broken_panel():
+    job = _job(2)
+    job.panels.append(PanelJob(symbol="BTCUSDT", label="bad", ohlcv=np.empty((0, 6)), display_n=150))
+    image = run_render_job(job)
+    assert image is not None and image.data.startswith(_PNG_MAGIC)
+
+
+def test_fallback_panels_keep_supplied_emas(monkeypatch):
+    # IndicatorStore 只给显示长度的短窗口 + 已建档的 EMA：逐个子图重试时必须沿用这些 EMA
+    panels = []
+    for i in range(2):
+        ohlcv = synthetic_ohlcv(150, seed=i)
+        emas = np.column_stack([ohlcv[:, 4] + k for k in range(4)])
+        panels.append(PanelJob(symbol="BTCUSDT", label=f"P{i}", ohlcv=ohlcv, display_n=150, emas=emas))
+    original = chart._render_figure
+    drawn = []
+
+    def flaky_render(panel_list, **kwargs):
+        if len(panel_list) > 1:
+            raise RuntimeError("boom")
+        drawn.append(panel_list[0][3])
+        return original(panel_list, **kwargs)
+
+    monkeypatch.setattr(chart, "_render_figure", flaky_render)
+    image = run_render_job(RenderJob(panels=panels))
+
+    assert image is not None and image.data.startswith(_PNG_MAGIC)
+    assert len(drawn) == 2
+    assert all(got is p.emas for got, p in zip(drawn, panels))
+
+
+@pytest.mark.asyncio
+async def test_process_pool_renders_and_reports_metrics(app_env):
+    pool = RenderPool(workers=1)
+    await pool.start()
+    try:
+        image = await pool.render(_job(2))
+        assert image is not None and image.data.startswith(_PNG_MAGIC)
+        s = pool.stats()
+        assert s["jobs"] == 1 and s["depth"] == 0 and s["max_depth"] == 1
+        assert s["render_p50_ms"] > 0
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_generate_multi_chart_uses_registered_pool(monkeypatch):
+    submitted = []
+
+    class _Pool:
+        async def render(self, job):
+            submitted.append(job)
+            return EncodedImage(b"png", "image/png", 1, 1, 1.0)
+
+    async def fake_load(symbol, iv, chart_title=None):
+        return PanelJob(symbol=symbol, label=iv, ohlcv=synthetic_ohlcv(10), chart_title=chart_title, interval=iv)
+
+    monkeypatch.setattr(chart, "_load_panel", fake_load)
+    chart.register_render_pool(_Pool())
+    try:
+        assert await chart.generate_multi_chart("BTCUSDT", ["1D", "4h", "1h"]) == b"png"
+    finally:
+        chart.register_render_pool(None)
+    assert len(submitted) == 1 and [p.label for p in submitted[0].panels] == ["1D", "4h", "1h"]
+
+
+@pytest.mark.asyncio
+async def test_png_cache_reuses_render_until_new_bar_closes(monkeypatch):
+    from app.infra.png_cache import PngCache
+    from app.infra.stats import MessageStats
+
+    renders = []
+    bar_ms = 3600_000
+    data = {"ohlcv": synthetic_ohlcv(10, bar_ms)}
+
+    async def fake_render(job):
+        renders.append(job)
+        return EncodedImage(b"png%d" % len(renders), "image/png", 1, 1, 1.0)
+
+    async def fake_load(symbol, iv, chart_title=None):
+        return PanelJob(symbol=symbol, label=iv, ohlcv=data["ohlcv"], chart_title=chart_title, interval=iv)
+
+    last_open = data["ohlcv"][-1, 0]
+    now = {"ms": last_open + bar_ms / 2}  # 末根未收盘
+    monkeypatch.setattr(chart.time, "time", lambda: now["ms"] / 1000)
+    monkeypatch.setattr(chart, "_render", fake_render)
+    monkeypatch.setattr(chart, "_load_panel", fake_load)
+    monkeypatch.setattr(chart, "_png_cache", PngCache(max_bytes=1024))
+    stats = MessageStats()
+    monkeypatch.setattr(chart, "_msg_stats", stats)
+
+    a = await chart.generate_multi_chart("BTCUSDT", ["1h"], zone_bot=1.0, zone_top=2.0)
+    b = await chart.generate_multi_chart("BTCUSDT", ["1h"], zone_bot=1.0, zone_top=2.0)
+    assert a == b == b"png1"
+
+    # 叠加参数不同：重新渲染
+    await chart.generate_multi_chart("BTCUSDT", ["1h"], zone_bot=1.5, zone_top=2.0)
+    assert len(renders) == 2
+
+    # 末根收盘后 key 变化
+    now["ms"] = last_open + bar_ms + 1
+    c = await chart.generate_multi_chart("BTCUSDT", ["1h"], zone_bot=1.0, zone_top=2.0)
+    assert c == b"png3"
+
+    cs = stats.get_chart_cache_stats()
+    assert (cs.hits, cs.misses) == (1, 3)
+
+
+@pytest.mark.asyncio
+async def test_multi_chart_renders_ready_panels_at_soft_deadline(monkeypatch):
+    submitted = []
+    cancelled = []
+
+    async def fake_render(job):
+        submitted.append(job)
+        return EncodedImage(b"png", "image/png", 1, 1, 1.0)
+
+    async def fake_load(symbol, iv, chart_title=None):
+        if iv == "15m":
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(iv)
+                raise
+        if iv == "3m":
+            return None
+        return PanelJob(symbol=symbol, label=iv, ohlcv=synthetic_ohlcv(10), chart_title=chart_title, interval=iv)
+
+    monkeypatch.setattr(chart, "_render", fake_render)
+    monkeypatch.setattr(chart, "_load_panel", fake_load)
+    monkeypatch.setattr(chart, "_msg_stats", None)
+    png = await chart.generate_multi_chart("ETHUSDT", ["4h", "1h", "15m", "3m"], soft_deadline=0.05)
+    assert png == b"png" and cancelled == ["15m"]
+    panels = submitted[0].panels
+    assert [p.label for p in panels] == ["4h", "1h"]
+    assert panels[0].chart_title.endswith("[缺: 15m 超时, 3m 无数据]")
+    assert "缺" not in panels[1].chart_title
+
+
+class _BreakingExecutor(Executor):
+    """submit 的任务一直挂起，break_all() 时全部以 BrokenProcessPool 结束。"""
+
+    def __init__(self):
+        self.futures = []
+        self.shutdowns = 0
+
+    def submit(self, fn, *args, **kwargs):
+        fut = Future()
+        self.futures.append(fut)
+        return fut
+
+    def break_all(self):
+        for fut in self.futures:
+            fut.set_exception(BrokenProcessPool("worker died"))
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.shutdowns += 1
+
+
+@pytest.mark.asyncio
+async def test_broken_pool_is_rebuilt_once_for_all_inflight_jobs(monkeypatch):
+    created = []
+
+    def new_executor(self):
+        created.append(_BreakingExecutor())
+        return created[-1]
+
+    monkeypatch.setattr(RenderPool, "_new_executor", new_executor)
+    pool = RenderPool(workers=2)
+    pool._executor = pool._new_executor()
+    broken = created[0]
+
+    jobs = [asyncio.ensure_future(pool.render(_job(1))) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    broken.break_all()
+    results = await asyncio.gather(*jobs, return_exceptions=True)
+
+    assert all(isinstance(r, BrokenProcessPool) for r in results)
+    assert len(created) == 2 and pool._executor is created[1]
+    assert broken.shutdowns == 1 and created[1].shutdowns == 0
+    assert pool.failures == 3
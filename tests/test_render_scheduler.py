@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from app.infra import chart
+from app.infra.render_scheduler import RenderDeadlineMissed, RenderScheduler
+from tests.test_analysis_queue import _FakeTg
+
+
+@pytest.mark.asyncio
+async def test_priority_order_and_deadline_drop():
+    sched = RenderScheduler(max_concurrent=1)
+    gate = asyncio.Event()
+    order = []
+
+    async def job(name, wait=None):
+        order.append(name)
+        if wait is not None:
+            await wait.wait()
+        return name
+
+    blocker = asyncio.create_task(sched.run(0, 1.0, lambda: job("blocker", gate)))
+    await asyncio.sleep(0)
+    low = asyncio.create_task(sched.run(4, 1.0, lambda: job("3m")))
+    stale = asyncio.create_task(sched.run(3, 0.02, lambda: job("15m")))
+    high = asyncio.create_task(sched.run(0, 1.0, lambda: job("1D")))
+    await asyncio.sleep(0.05)
+    assert sched.stats()["depth"] == 2
+    with pytest.raises(RenderDeadlineMissed):
+        await stale
+
+    gate.set()
+    assert await asyncio.gather(blocker, low, high) == ["blocker", "3m", "1D"]
+    assert order == ["blocker", "1D", "3m"]
+    s = sched.stats()
+    assert s["jobs"] == 3 and s["dropped"] == 1 and s["dropped_by_priority"] == {3: 1}
+    assert s["running"] == 0 and s["depth"] == 0 and s["max_depth"] == 3
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_slot():
+    sched = RenderScheduler(max_concurrent=1)
+    gate = asyncio.Event()
+    blocker = asyncio.create_task(sched.run(0, 1.0, gate.wait))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(sched.run(0, 1.0, lambda: asyncio.sleep(0)))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    gate.set()
+    await blocker
+    await asyncio.gather(waiter, return_exceptions=True)
+    assert sched.running == 0
+    assert await sched.run(0, 0.1, lambda: asyncio.sleep(0, "ok")) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_send_with_chart_sends_text_when_render_cannot_start(monkeypatch):
+    async def never_render(*_, **__):
+        raise AssertionError("不应开始出图")
+
+    sched = RenderScheduler(max_concurrent=0)
+    tg = _FakeTg()
+    monkeypatch.setattr(chart, "_render_scheduler", sched)
+    monkeypatch.setattr(chart, "generate_multi_chart", never_render)
+    monkeypatch.setitem(chart.settings.CHART_RENDER_DEADLINE_SEC, "3m", 0.01)
+    await chart.send_with_chart(tg, "推送", "chat", 9, "BTCUSDT", "3m")
+    assert tg.sent[0][0] == "text" and "排队超时" in tg.sent[0][1]
+    assert sched.stats()["dropped"] == 1
+
+
+def test_priority_from_interval_and_topic(monkeypatch):
+    monkeypatch.setattr(chart.settings, "TG_TOPIC_ENTRY", 55)
+    assert chart._render_priority("1D", 1) < chart._render_priority("4h", 1) < chart._render_priority("15m", 1)
+    assert chart._render_priority("15m", 55) < chart._render_priority("15m", 1)
@@ -0,0 +1,68 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.config import settings
+from app.domain.models import IntervalSignal, Side, Transition, TvEvent
+from app.infra.store import AppState
+from app.services import resonance_service
+from app.services.resonance_service import ResonanceService
+
+
+def _state() -> AppState:
+    return AppState(
+        cooldown_seconds=0,
+        warm_k_map=settings.WARM_K_MAP,
+        interval_seconds=settings.INTERVAL_SECONDS,
+    )
+
+
+def test_update_interval_returns_transition():
+    state = _state()
+
+    t = state.update_interval("BTCUSDT", "1h", -50, 40, -40, now_ts=0)
+    assert t.oversold == Transition.ENTER_IN
+    assert t.overbought == Transition.NONE
+
+    t = state.update_interval("BTCUSDT", "1h", -45, 40, -40, now_ts=3600)
+    assert not t.changed
+
+    t = state.update_interval("BTCUSDT", "1h", -10, 40, -40, now_ts=7200)
+    assert t.for_side(Side.OVERSOLD) == Transition.EXIT_WARM
+
+
+def test_needs_resonance_eval_until_warm_expiry():
+    state = _state()
+    allowed = ["4h", "1h"]
+
+    assert state.needs_resonance_eval("BTCUSDT", Side.OVERSOLD, allowed, False, 0)
+    state.record_resonance_eval("BTCUSDT", Side.OVERSOLD, allowed, next_warm_expiry=7200)
+
+    assert not state.needs_resonance_eval("BTCUSDT", Side.OVERSOLD, allowed, False, 3600)
+    assert state.needs_resonance_eval("BTCUSDT", Side.OVERSOLD, allowed, True, 3600)
+    assert state.needs_resonance_eval("BTCUSDT", Side.OVERSOLD, allowed, False, 7200)
+    assert state.needs_resonance_eval("BTCUSDT", Side.OVERSOLD, ["4h"], False, 3600)
+    assert state.resonance_eval_counts == {"evaluated": 4, "skipped": 1}
+
+
+@pytest.mark.asyncio
+async def test_handle_event_skips_unchanged_side(monkeypatch):
+    monkeypatch.setattr(resonance_service, "get_universe", lambda: {"BTCUSDT": ["4h", "1h"]})
+    monkeypatch.setattr(resonance_service, "get_us_stock_symbols", lambda: [])
+    send = AsyncMock(return_value=1)
+    monkeypatch.setattr(resonance_service, "send_with_chart", send)
+
+    state = _state()
+    svc = ResonanceService(state=state, tg=MagicMock(), exhaustion_svc=MagicMock())
+
+    def ev(ts, iv, value):
+        return TvEvent(symbol="BTCUSDT", ts=ts, signals=[IntervalSignal(iv, (value,))])
+
+    await svc.handle_event(ev(0, "4h", -50))
+    await svc.handle_event(ev(10, "1h", -50))
+    assert send.await_count == 1
+
+    # 数值变化但未跨越阈值：两个方向都跳过
+    before = dict(state.resonance_eval_counts)
+    await svc.handle_event(ev(20, "1h", -60))
+    assert state.resonance_eval_counts["skipped"] == before["skipped"] + 2
+    assert send.await_count == 1
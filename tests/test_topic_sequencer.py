@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from app.infra import chart
+from app.infra.topic_sequencer import TopicSequencer
+from tests.test_analysis_queue import _FakeTg
+
+
+@pytest.mark.asyncio
+async def test_sequencer_skips_abandoned_tickets():
+    seqr = TopicSequencer()
+    order = []
+
+    async def push(name, delay, abandon=False):
+        seq = seqr.ticket()
+        try:
+            await asyncio.sleep(delay)
+            if abandon:
+                raise asyncio.CancelledError
+            await seqr.wait_turn(seq)
+            order.append(name)
+        finally:
+            seqr.done(seq)
+
+    results = await asyncio.gather(
+        push("a", 0.05), push("b", 0.0, abandon=True), push("c", 0.0), push("d", 0.02),
+        return_exceptions=True,
+    )
+    assert isinstance(results[1], asyncio.CancelledError)
+    assert order == ["a", "c", "d"]
+    assert seqr.backlog == 0 and seqr.max_backlog == 4
+
+
+@pytest.mark.asyncio
+async def test_send_with_chart_renders_concurrently_and_delivers_in_order(monkeypatch):
+    started = []
+    release = {"A": asyncio.Event(), "B": asyncio.Event()}
+
+    async def fake_chart(symbol, intervals, **_):
+        started.append(symbol)
+        await release[symbol].wait()
+        return b"\x89PNG\r\n\x1a\n"
+
+    tg = _FakeTg()
+    monkeypatch.setattr(chart, "generate_multi_chart", fake_chart)
+    monkeypatch.setattr(chart, "_topic_sequencers", {})
+    first = asyncio.create_task(chart.send_with_chart(tg, "A", "chat", 7, "A", "1h"))
+    second = asyncio.create_task(chart.send_with_chart(tg, "B", "chat", 7, "B", "1h"))
+    await asyncio.sleep(0.01)
+    assert started == ["A", "B"]   # 两条推送同时出图
+
+    # 后进入的先渲染完：仍等前一条发送后才发送
+    release["B"].set()
+    await asyncio.sleep(0.01)
+    assert tg.sent == [] and not second.done()
+    release["A"].set()
+    a_id, b_id = await asyncio.gather(first, second)
+    assert [s[1] for s in tg.sent] == ["A", "B"] and a_id < b_id